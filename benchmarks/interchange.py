@@ -0,0 +1,134 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compare the interchange format of models to pickle, SBML, and cobrapy JSON.
+
+Models are sent to the workers in one of these forms. For the corpus models
+scaled up by the given factors (see ``suite.scaled``), the benchmark reports
+the size of every form as is and zstd compressed like in the storage, and the
+median times to serialize and to load it. The interchange format is also
+loaded from a memory-mapped file.
+
+Usage: python benchmarks/interchange.py [--scale N,...] [--repeat N]
+    [MODEL ...]
+"""
+
+import argparse
+import io
+import logging
+import mmap
+import os
+import pickle
+import statistics
+import tempfile
+import time
+
+import cobra
+import zstandard
+
+from memote_webservice import interchange
+from suite import CORPUS, scaled
+
+
+def _sbml_dumps(model):
+    stream = io.StringIO()
+    cobra.io.write_sbml_model(model, stream)
+    return stream.getvalue().encode("utf-8")
+
+
+def _sbml_loads(data):
+    return cobra.io.read_sbml_model(io.StringIO(data.decode("utf-8")))
+
+
+def _mapped(data):
+    """Return a function loading the data from a memory-mapped file."""
+    file_ = tempfile.NamedTemporaryFile()
+    file_.write(data)
+    file_.flush()
+
+    def load(_):
+        with open(file_.name, "rb") as mapped_file:
+            with mmap.mmap(mapped_file.fileno(), 0,
+                           access=mmap.ACCESS_READ) as buffer:
+                return interchange.loads(buffer)
+
+    load.file = file_
+    return load
+
+
+FORMATS = {
+    "pickle": (lambda model: pickle.dumps(model, pickle.HIGHEST_PROTOCOL),
+               pickle.loads),
+    "sbml": (_sbml_dumps, _sbml_loads),
+    "json": (lambda model: cobra.io.to_json(model).encode("utf-8"),
+             lambda data: cobra.io.from_json(data.decode("utf-8"))),
+    "interchange": (interchange.dumps, interchange.loads),
+}
+
+
+def median_time(function, argument, repeat):
+    """Return the result and the median seconds of calling a function."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(argument)
+        times.append(time.perf_counter() - start)
+    return result, statistics.median(times)
+
+
+def measure(model, repeat):
+    """Return the sizes and times per format of a model."""
+    compressor = zstandard.ZstdCompressor(level=9)
+    rows = {}
+    for name, (dumps, loads) in FORMATS.items():
+        data, dump_time = median_time(dumps, model, repeat)
+        _, load_time = median_time(loads, data, repeat)
+        rows[name] = (len(data), len(compressor.compress(data)), dump_time,
+                      load_time)
+        if name == "interchange":
+            load = _mapped(data)
+            _, mapped_time = median_time(load, None, repeat)
+            load.file.close()
+            rows["interchange (mmap)"] = (len(data), None, None, mapped_time)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scale", default="1,10,100",
+                        help="comma separated factors to scale models by")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("models", nargs="*", default=CORPUS)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    print(f"{'model':>24} {'format':>20} {'bytes':>10} {'zstd':>10} "
+          f"{'dump s':>8} {'load s':>8}")
+    for path in args.models:
+        model = cobra.io.read_sbml_model(path)
+        for factor in map(int, args.scale.split(",")):
+            current = scaled(model, factor)
+            label = f"{os.path.basename(path)} x{factor} " \
+                    f"({len(current.reactions)})"
+            for name, (size, compressed, dump_time, load_time) in \
+                    measure(current, args.repeat).items():
+                compressed = "" if compressed is None else compressed
+                dump_time = "" if dump_time is None else f"{dump_time:.3f}"
+                print(f"{label:>24} {name:>20} {size:>10} {compressed:>10} "
+                      f"{dump_time:>8} {load_time:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compare polling the status of many jobs one by one and in a single request.
+
+A dashboard showing many jobs polls all of them. The benchmark times getting
+the status of every job with one ``GET /status/<uuid>`` after the other over
+a keep-alive connection and with one ``POST /status`` against a running
+deployment, and reports the median of the repetitions. Without given UUIDs it
+polls unknown, thus pending, jobs.
+
+Usage: python benchmarks/status_bulk.py [--url URL] [--jobs N] [--repeat N]
+    [UUID ...]
+"""
+
+import argparse
+import http.client
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+from uuid import uuid4
+
+
+def request(connection, method, path, body=None):
+    """Send a request and return the decoded JSON response."""
+    headers = {"Content-Type": "application/json"} if body else {}
+    connection.request(method, path, body=body, headers=headers)
+    response = connection.getresponse()
+    content = response.read()
+    if response.status != 200:
+        raise RuntimeError(f"{method} {path}: {response.status} {content}")
+    return json.loads(content)
+
+
+def one_by_one(connection, prefix, uuids):
+    """Get the status of every job with a request of its own."""
+    return [request(connection, "GET", f"{prefix}/status/{uuid}")
+            for uuid in uuids]
+
+
+def bulk(connection, prefix, uuids):
+    """Get the status of all jobs with a single request."""
+    return request(connection, "POST", f"{prefix}/status",
+                   json.dumps({"uuids": uuids}))["jobs"]
+
+
+def measure(url, uuids, repeat):
+    """Return the times of polling all jobs one by one and at once."""
+    parts = urlsplit(url)
+    prefix = parts.path.rstrip("/")
+    connection = http.client.HTTPConnection(parts.hostname, parts.port or 80)
+    timings = {}
+    for poll in (one_by_one, bulk):
+        # Warm up the connection and the server.
+        poll(connection, prefix, uuids)
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            poll(connection, prefix, uuids)
+            times.append(time.perf_counter() - start)
+        timings[poll.__name__] = times
+    connection.close()
+    return timings
+
+
+def main():
+    """Run the benchmark and print a summary as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("uuids", nargs="*", metavar="UUID")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    uuids = args.uuids or [str(uuid4()) for _ in range(args.jobs)]
+    timings = measure(args.url, uuids, args.repeat)
+    summary = {
+        name: {"median": statistics.median(values), "times": values}
+        for name, values in timings.items()
+    }
+    summary["jobs"] = len(uuids)
+    summary["speedup"] = summary["one_by_one"]["median"] / \
+        summary["bulk"]["median"]
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
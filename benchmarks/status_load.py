@@ -0,0 +1,111 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+r"""
+Compare the throughput and latency of polling job states across deployments.
+
+Clients poll ``/status`` more than anything else. The benchmark keeps a number
+of concurrent keep-alive connections busy polling the state of one job from
+every given deployment in turn and reports the requests per second and the
+latency percentiles of each. Start the deployments to compare beforehand with
+the same environment and number of worker processes, e.g.,
+
+    ENVIRONMENT=production gunicorn -c gunicorn.py -b :8000 \\
+        memote_webservice.wsgi:app
+    ENVIRONMENT=production uvicorn --workers 3 --port 8001 --no-access-log \\
+        memote_webservice.asgi:app
+
+Usage: python benchmarks/status_load.py [--concurrency N] [--requests N]
+    [--job UUID] gevent=http://localhost:8000 asgi=http://localhost:8001
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+from uuid import uuid4
+
+
+async def poll(host, port, path, count, latencies, errors, headers=()):
+    """Send requests one after the other over a keep-alive connection."""
+    reader, writer = await asyncio.open_connection(host, port)
+    extra = "".join(f"{name}: {value}\r\n" for name, value in headers)
+    request = (f"GET {path} HTTP/1.1\r\nHost: {host}\r\n{extra}"
+               f"Connection: keep-alive\r\n\r\n").encode()
+    try:
+        for _ in range(count):
+            start = time.perf_counter()
+            writer.write(request)
+            head = await reader.readuntil(b"\r\n\r\n")
+            lines = head.decode("latin-1").split("\r\n")
+            headers = dict(line.lower().split(": ", 1)
+                           for line in lines[1:] if line)
+            await reader.readexactly(int(headers["content-length"]))
+            latencies.append(time.perf_counter() - start)
+            if lines[0].split(" ")[1] != "200":
+                errors.append(lines[0])
+    finally:
+        writer.close()
+
+
+async def load(url, path, concurrency, requests, headers=()):
+    """Return the timings of requesting a path with concurrent connections."""
+    parts = urlsplit(url)
+    path = f"{parts.path.rstrip('/')}{path}"
+    latencies = []
+    errors = []
+    # Warm up the connections and workers of the server.
+    await asyncio.gather(*[
+        poll(parts.hostname, parts.port or 80, path, 2, [], [], headers)
+        for _ in range(concurrency)])
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        poll(parts.hostname, parts.port or 80, path, requests // concurrency,
+             latencies, errors, headers)
+        for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "throughput": len(latencies) / elapsed,
+        "median": statistics.median(latencies),
+        "p99": latencies[int(0.99 * (len(latencies) - 1))],
+        "max": latencies[-1],
+    }
+
+
+def main():
+    """Run the benchmark and print a summary as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("targets", nargs="+", metavar="NAME=URL")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument(
+        "--job", default=str(uuid4()),
+        help="the job to poll (default an unknown, thus pending, job)")
+    args = parser.parse_args()
+    summary = {}
+    for target in args.targets:
+        name, url = target.split("=", 1)
+        summary[name] = asyncio.run(load(
+            url, f"/status/{args.job}", args.concurrency, args.requests))
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,384 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark every stage of the web service and the workers end to end.
+
+The suite runs against a deployment with a local redis, e.g., started with
+``make start``, and measures
+
+* ``snapshot``: the wall time from submitting a model of the corpus until its
+  job finished and the memote runtime reported by ``/status``,
+* ``status`` and ``report``: the throughput and latency percentiles of
+  ``/status`` and of the cached JSON ``/report`` of a finished job under
+  concurrent clients, and
+* ``submit``: the throughput and latency of submitting small and large SBML
+  and JSON models, also gzip and bzip2 compressed.
+
+Every submission is made unique such that it is not answered from the result
+cache. Jobs submitted by the submit stage are revoked and purged from the
+queues afterwards, so it should not run against a deployment in use.
+
+The results are printed and optionally saved as a JSON baseline together with
+the options and the machine they were measured with, e.g., in
+``benchmarks/baselines``. Compared to a baseline, every measurement that got
+worse by more than the tolerance is reported and the suite exits with status
+1. Baselines are only comparable between runs on the same machine with the
+same options.
+
+Usage: python benchmarks/suite.py [--url URL] [--stages STAGE,...]
+    [--save PATH] [--baseline PATH] [--tolerance FRACTION]
+"""
+
+import argparse
+import asyncio
+import bz2
+import gzip
+import http.client
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+from uuid import uuid4
+
+import cobra
+from cobra.manipulation import rename_genes
+
+from status_load import load
+
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "tests", "data")
+CORPUS = (os.path.join(DATA_PATH, "EcoliCore.xml"),)
+STAGES = ("snapshot", "status", "report", "submit")
+# Whether a higher or a lower value is better per kind of measurement.
+HIGHER = "higher"
+LOWER = "lower"
+
+
+class Client:
+    """Send requests to the web service over a connection per thread."""
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip("/")
+        self.local = threading.local()
+
+    def request(self, method, path, body=None, headers=None):
+        """Return the status and the decoded JSON body of a response."""
+        if not hasattr(self.local, "connection"):
+            self.local.connection = http.client.HTTPConnection(
+                self.host, self.port, timeout=600)
+        connection = self.local.connection
+        connection.request(method, f"{self.prefix}{path}", body=body,
+                           headers=headers or {})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read() or "null")
+
+    def submit(self, filename, content):
+        """Submit a model file and return the response status and body."""
+        boundary = uuid4().hex
+        body = b"".join([
+            f"--{boundary}\r\n".encode(),
+            f'Content-Disposition: form-data; name="model"; '
+            f'filename="{filename}"\r\n'.encode(),
+            b"Content-Type: application/octet-stream\r\n\r\n",
+            content,
+            f"\r\n--{boundary}--\r\n".encode(),
+        ])
+        return self.request("POST", "/submit", body, {
+            "Content-Type": f"multipart/form-data; boundary={boundary}"})
+
+
+def percentile(values, fraction):
+    """Return the value below which the given fraction of values falls."""
+    values = sorted(values)
+    return values[int(fraction * (len(values) - 1))]
+
+
+def scaled(model, factor):
+    """Return a model of ``factor`` disjoint copies of the given model."""
+    large = model.copy()
+    for index in range(1, factor):
+        copy = model.copy()
+        for metabolite in copy.metabolites:
+            metabolite.id = f"{metabolite.id}_{index}"
+        for reaction in copy.reactions:
+            reaction.id = f"{reaction.id}_{index}"
+        rename_genes(copy, {gene.id: f"{gene.id}_{index}"
+                            for gene in copy.genes})
+        copy.repair()
+        large.merge(copy, inplace=True, objective="left")
+    return large
+
+
+def variants(path, factor):
+    """
+    Return functions creating unique uploads of a model per format.
+
+    Each function returns a new file name and content on every call.
+    """
+    model = cobra.io.read_sbml_model(path)
+    large = scaled(model, factor)
+    uploads = {}
+    for size, current in (("small", model), ("large", large)):
+        data = cobra.io.model_to_dict(current)
+        uploads[f"{size}.sbml"] = _unique_sbml(_sbml(current))
+        uploads[f"{size}.json"] = _unique_json(data)
+    uploads["small.sbml.gz"] = _compressed(
+        uploads["small.sbml"], ".gz", gzip.compress)
+    uploads["small.sbml.bz2"] = _compressed(
+        uploads["small.sbml"], ".bz2", bz2.compress)
+    uploads["large.sbml.gz"] = _compressed(
+        uploads["large.sbml"], ".gz", gzip.compress)
+    return uploads
+
+
+def _sbml(model):
+    """Return a model as SBML document."""
+    path = os.path.join(os.path.dirname(__file__), f".{uuid4()}.xml")
+    try:
+        cobra.io.write_sbml_model(model, path)
+        with open(path, "rb") as file_:
+            return file_.read()
+    finally:
+        os.remove(path)
+
+
+def _unique_sbml(sbml):
+    def upload():
+        # A trailing comment changes the checksum but not the model.
+        return "model.xml", sbml + f"\n<!-- {uuid4()} -->\n".encode()
+    return upload
+
+
+def _unique_json(data):
+    def upload():
+        return "model.json", json.dumps(
+            {**data, "notes": {"benchmark": str(uuid4())}}).encode()
+    return upload
+
+
+def _compressed(unique, suffix, compress):
+    def upload():
+        filename, content = unique()
+        return filename + suffix, compress(content)
+    return upload
+
+
+def wait(client, job, timeout=3600, interval=0.5):
+    """Poll a job until it finished and return its last status."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        _, status = client.request("GET", f"/status/{job}")
+        if status["finished"] in (True, "True"):
+            return status
+        time.sleep(interval)
+    raise TimeoutError(f"Job {job} did not finish within {timeout} seconds.")
+
+
+def snapshot(client, corpus, repeat):
+    """Measure testing every model of the corpus end to end."""
+    results = {}
+    job = None
+    for path in corpus:
+        name = os.path.splitext(os.path.basename(path))[0]
+        with open(path, "rb") as file_:
+            unique = _unique_sbml(file_.read())
+        walls, runtimes = [], []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            code, body = client.submit(*unique())
+            if code != 202:
+                raise RuntimeError(f"Submitting {path} failed: {body}")
+            status = wait(client, body["uuid"])
+            walls.append(time.perf_counter() - start)
+            if status["status"] != "SUCCESS":
+                raise RuntimeError(f"Testing {path} failed: {status}")
+            runtimes.append(status["timings"]["total"])
+            job = body["uuid"]
+        results[f"snapshot.{name}.wall"] = (statistics.median(walls), LOWER)
+        results[f"snapshot.{name}.memote"] = (
+            statistics.median(runtimes), LOWER)
+    return results, job
+
+
+def concurrent(url, name, path, concurrency, requests, headers=()):
+    """Measure requesting a path with concurrent clients."""
+    summary = asyncio.run(load(url, path, concurrency, requests, headers))
+    if summary["errors"]:
+        raise RuntimeError(f"{summary['errors']} requests of {path} failed.")
+    return {
+        f"{name}.throughput": (summary["throughput"], HIGHER),
+        f"{name}.median": (summary["median"], LOWER),
+        f"{name}.p99": (summary["p99"], LOWER),
+    }
+
+
+def submit(client, uploads, count, concurrency):
+    """Measure submitting unique uploads of every variant."""
+    results = {}
+    submitted = []
+    for variant, unique in uploads.items():
+        files = [unique() for _ in range(count)]
+
+        def send(upload):
+            start = time.perf_counter()
+            code, body = client.submit(*upload)
+            if code != 202:
+                raise RuntimeError(f"Submitting {variant} failed: {body}")
+            submitted.append(body["uuid"])
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            latencies = list(executor.map(send, files))
+        elapsed = time.perf_counter() - start
+        results[f"submit.{variant}.throughput"] = (count / elapsed, HIGHER)
+        results[f"submit.{variant}.median"] = (
+            statistics.median(latencies), LOWER)
+        results[f"submit.{variant}.p99"] = (percentile(latencies, 0.99), LOWER)
+    _withdraw(submitted)
+    return results
+
+
+def _withdraw(job_ids):
+    """Revoke jobs and remove them and everything else from the queues."""
+    # Only this stage needs the configuration of the service, e.g., its redis,
+    # such that other benchmarks can reuse the models of the suite.
+    from memote_webservice import scheduling
+    from memote_webservice.celery import celery_app
+
+    celery_app.control.revoke(job_ids, terminate=True)
+    celery_app.control.purge()
+    for job_id in job_ids:
+        scheduling.dequeue(job_id)
+
+
+def metadata(args):
+    """Describe the run such that baselines can be told apart."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+            text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "date": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "url": args.url,
+        "stages": args.stages,
+        "corpus": [os.path.basename(path) for path in args.corpus],
+        "repeat": args.repeat,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "submissions": args.submissions,
+        "scale": args.scale,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return the measurements that regressed compared to a baseline."""
+    regressions = {}
+    for name, (value, better) in results.items():
+        if name not in baseline:
+            continue
+        expected = baseline[name]["value"]
+        if better == LOWER:
+            regressed = value > expected * (1 + tolerance)
+        else:
+            regressed = value < expected * (1 - tolerance)
+        if regressed:
+            regressions[name] = {"baseline": expected, "value": value}
+    return regressions
+
+
+def main():
+    """Run the benchmark stages and print, save, or compare the results."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--stages", default=",".join(STAGES),
+                        help="comma separated stages to run in order")
+    parser.add_argument("--corpus", nargs="+", default=CORPUS,
+                        help="SBML models to test end to end")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="jobs per model of the corpus")
+    parser.add_argument("--job", help="a finished job for the report stage "
+                                      "(default the last job tested)")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--submissions", type=int, default=10,
+                        help="submissions per upload variant")
+    parser.add_argument("--scale", type=int, default=10,
+                        help="copies of the first model in large uploads")
+    parser.add_argument("--save", help="write the results to a JSON file")
+    parser.add_argument("--baseline", help="compare to a saved JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+    stages = args.stages.split(",")
+    client = Client(args.url)
+    results = {}
+    job = args.job
+    if "snapshot" in stages:
+        measured, job = snapshot(client, args.corpus, args.repeat)
+        results.update(measured)
+    if "status" in stages:
+        results.update(concurrent(
+            args.url, "status", f"/status/{job or uuid4()}",
+            args.concurrency, args.requests))
+    if "report" in stages:
+        if job is None:
+            parser.error("The report stage requires a finished --job.")
+        results.update(concurrent(
+            args.url, "report", f"/report/{job}", args.concurrency,
+            args.requests, [("Accept-Encoding", "gzip")]))
+    if "submit" in stages:
+        results.update(submit(
+            client, variants(args.corpus[0], args.scale), args.submissions,
+            min(args.concurrency, args.submissions)))
+    output = {
+        "meta": metadata(args),
+        "results": {name: {"value": value, "better": better}
+                    for name, (value, better) in results.items()},
+    }
+    print(json.dumps(output, indent=2))
+    if args.save:
+        with open(args.save, "w") as file_:
+            json.dump(output, file_, indent=2)
+            file_.write("\n")
+    if args.baseline:
+        with open(args.baseline) as file_:
+            baseline = json.load(file_)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for name, values in regressions.items():
+            print(f"Regression of {name}: {values['value']:.4g} compared to "
+                  f"{values['baseline']:.4g}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
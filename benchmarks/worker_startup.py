@@ -0,0 +1,92 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Compare the fixed cost of a job in cold and pre-warmed worker processes.
+
+A job process is forked from the main worker process. The benchmark forks
+processes from a parent that has only imported the tasks module, as a worker
+does by default, and from a parent that was pre-warmed, and measures the time
+each forked process takes to become ready to test a model.
+
+Usage: python benchmarks/worker_startup.py [--repeat N]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import time
+
+import cobra
+import pytest
+from memote.suite import TEST_DIRECTORY
+
+import memote_webservice.tasks  # noqa: F401
+from memote_webservice.prewarm import prewarm
+
+
+def startup():
+    """Do what every job does before the first test runs."""
+    cobra.Model("benchmark")
+    pytest.main([
+        "--collect-only",
+        "-p", "no:terminal",
+        "-p", "no:cacheprovider",
+        TEST_DIRECTORY,
+    ])
+
+
+def time_forked_startup():
+    """Measure the startup of a process forked from the current one."""
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        start = time.perf_counter()
+        startup()
+        os.write(write_end, str(time.perf_counter() - start).encode())
+        os._exit(0)
+    os.waitpid(pid, 0)
+    os.close(write_end)
+    with os.fdopen(read_end) as handle:
+        return float(handle.read())
+
+
+def measure(repeat):
+    """Return the startup times of cold and pre-warmed job processes."""
+    cold = [time_forked_startup() for _ in range(repeat)]
+    prewarm()
+    warm = [time_forked_startup() for _ in range(repeat)]
+    return {"cold": cold, "prewarmed": warm}
+
+
+def main():
+    """Run the benchmark and print a summary as JSON."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    timings = measure(args.repeat)
+    summary = {
+        name: {"median": statistics.median(values), "times": values}
+        for name, values in timings.items()
+    }
+    summary["saved"] = summary["cold"]["median"] - \
+        summary["prewarmed"]["median"]
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
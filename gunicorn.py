@@ -32,6 +32,10 @@ _config = os.environ["ENVIRONMENT"]
 
 bind = "0.0.0.0:8000"
 worker_class = "gevent"
+# Streams of job events wait cooperatively on redis and thus only hold one of
+# the connections of a gevent worker. All other requests of a worker share a
+# pool of `REDIS_MAX_CONNECTIONS` connections to redis (see `redis.py`).
+worker_connections = int(os.environ.get("WORKER_CONNECTIONS", 1000))
 timeout = 600  # Allow upload of large models. Also set in ingress.yml.
 accesslog = "-"
 access_log_format = '''%(t)s "%(r)s" %(s)s %(b)s %(L)s "%(f)s"'''
@@ -39,10 +43,11 @@ access_log_format = '''%(t)s "%(r)s" %(s)s %(b)s %(L)s "%(f)s"'''
 
 if _config == "production":
     # Our resource policy is that each web service is granted at least a single
-    # vCPU when available. The number of workers is then a guess that having two
-    # workers I/O bound and a third processing a request will utilize available
-    # resources well, but that guess needs to be tested and benchmarked.
-    workers = 3
+    # vCPU when available. The default number of workers is then a guess that
+    # having two workers I/O bound and a third processing a request will
+    # utilize available resources well. Compare numbers of workers with
+    # `benchmarks/suite.py`.
+    workers = int(os.environ.get("WEB_CONCURRENCY", 3))
     preload_app = True
 else:
     # FIXME: The number of workers is up for debate. At least for testing more
@@ -24,7 +24,7 @@ from flask_cors import CORS
 from raven.contrib.flask import Sentry
 from werkzeug.middleware.proxy_fix import ProxyFix
 
-from . import errorhandlers
+from . import errorhandlers, metrics
 
 
 LOGGER = logging.getLogger(__name__)
@@ -63,6 +63,9 @@ def init_app(application):
     # Register error handlers
     errorhandlers.init_app(application)
 
+    # Time requests and serve metrics.
+    metrics.init_app(application)
+
     # Please keep in mind that it is a security issue to use such a middleware
     # in a non-proxy setup because it will blindly trust the incoming headers
     # which might be forged by malicious clients.
@@ -0,0 +1,357 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Prepare the application for use by an ASGI server (uvicorn).
+
+This is an optional alternative to ``wsgi.py`` without monkey-patching. Job
+states, which clients poll most, are read with native async redis access and
+streams of job events wait for redis messages without holding a thread. All
+other requests, including submissions and reports, are handled by the
+Flask application in a pool of threads such that the API and its OpenAPI
+documentation are the same. Request bodies, such as model uploads, are
+received asynchronously before a thread handles the request, and response
+bodies are sent asynchronously, so slow clients do not hold a thread.
+
+Serve it with an ASGI server, e.g.,
+``uvicorn --workers 3 memote_webservice.asgi:app``.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+import redis.asyncio
+
+from memote_webservice import events, jobs, scheduling
+from memote_webservice.app import app as flask_app
+from memote_webservice.app import init_app
+from memote_webservice.redis import MAX_CONNECTIONS, POOL_TIMEOUT
+from memote_webservice.resources.status import describe
+from memote_webservice.schemas import StatusResponse
+
+
+__all__ = ("app",)
+
+LOGGER = logging.getLogger(__name__)
+
+STATUS_PATH = re.compile(r"/status/([^/]+)")
+EVENTS_PATH = re.compile(r"/status/([^/]+)/events")
+# Request bodies up to this size are kept in memory, larger ones are spooled
+# to a temporary file.
+SPOOL_SIZE = 1024 * 1024
+
+init_app(flask_app)
+
+redis_client = redis.asyncio.Redis(
+    connection_pool=redis.asyncio.BlockingConnectionPool.from_url(
+        os.environ["REDIS_URL"], max_connections=MAX_CONNECTIONS,
+        timeout=POOL_TIMEOUT))
+# Subscriptions hold a connection for as long as a client follows a job and
+# thus do not take connections from the bounded pool.
+pubsub_client = redis.asyncio.Redis.from_url(os.environ["REDIS_URL"])
+executor = ThreadPoolExecutor(flask_app.config["ASGI_THREADS"])
+status_schema = StatusResponse()
+
+
+async def app(scope, receive, send):
+    """Route requests to native handlers or else to the Flask application."""
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    path = _path_info(scope)
+    if scope["method"] == "GET":
+        match = STATUS_PATH.fullmatch(path)
+        if match is not None:
+            await _status(scope, send, match.group(1))
+            return
+        match = EVENTS_PATH.fullmatch(path)
+        if match is not None:
+            try:
+                timeout = _timeout(scope)
+            except ValueError:
+                # The Flask application rejects the invalid query.
+                pass
+            else:
+                await _events(scope, receive, send, match.group(1), timeout)
+                return
+    await _wsgi(scope, receive, send, path)
+
+
+async def _lifespan(receive, send):
+    """Release redis connections on shutdown."""
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await redis_client.connection_pool.disconnect()
+            await pubsub_client.connection_pool.disconnect()
+            executor.shutdown(wait=False)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+def _script_name(scope):
+    """Return the prefix under which the API is served, like gunicorn does."""
+    return scope.get("root_path") or os.environ.get("SCRIPT_NAME", "")
+
+
+def _path_info(scope):
+    """Return the path of a request below the script name."""
+    path = scope["path"]
+    script_name = _script_name(scope).rstrip("/")
+    if script_name and path.startswith(script_name):
+        path = path[len(script_name):]
+    return path or "/"
+
+
+async def _record(uuid):
+    """Return the record of a job."""
+    return jobs.decode(await redis_client.hgetall(jobs.JOB_KEY.format(uuid)))
+
+
+async def _describe(task_id, record):
+    """Describe the current state of a job like ``status.status``."""
+    task_ids = [task_id]
+    if "validation" in record:
+        task_ids.append(record["validation"])
+    # Read the states of the job's tasks and its queue position at once.
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.mget([jobs.task_key(task) for task in task_ids])
+        if "queue" in record:
+            pipe.zrank(scheduling.QUEUE_KEY.format(record["queue"]), task_id)
+        values, *position = await pipe.execute()
+    return describe(task_id, record,
+                    *[jobs.decode_meta(value) for value in values],
+                    position=position[0] if position else None)
+
+
+async def _status(scope, send, uuid):
+    """Describe the current state of a job like the ``Status`` resource."""
+    record = await _record(uuid)
+    response = await _describe(record.get("task", uuid), record)
+    body = _jsonify(status_schema.dump(response))
+    headers = [(b"content-type", b"application/json"),
+               (b"content-length", str(len(body)).encode())]
+    headers.extend(_cors(scope))
+    await send({"type": "http.response.start", "status": 200,
+                "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+def _timeout(scope):
+    """Return the timeout of an events request or raise a ``ValueError``."""
+    query = parse_qs(scope["query_string"].decode("latin-1"))
+    if "timeout" not in query:
+        return None
+    return float(query["timeout"][-1])
+
+
+async def _disconnected(receive):
+    """Wait until the client disconnects."""
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _events(scope, receive, send, uuid, timeout):
+    """
+    Stream the events of a job like the ``Events`` resource.
+
+    Like ``events.follow``, the channel is subscribed before the current state
+    is read. A disconnected client is noticed at the latest with the next
+    heartbeat.
+    """
+    loop = asyncio.get_running_loop()
+    config = flask_app.config
+    timeout = config["EVENTS_TIMEOUT"] if timeout is None else \
+        min(timeout, config["EVENTS_TIMEOUT"])
+    heartbeat = config["EVENTS_HEARTBEAT"]
+    deadline = loop.time() + timeout
+    disconnected = asyncio.ensure_future(_disconnected(receive))
+    pubsub = pubsub_client.pubsub(ignore_subscribe_messages=True)
+    try:
+        record = await _record(uuid)
+        task_id = record.get("task", uuid)
+        await pubsub.subscribe(events.EVENTS_KEY.format(task_id))
+        event = await _describe(task_id, record)
+        headers = [(b"content-type", b"text/event-stream; charset=utf-8"),
+                   (b"cache-control", b"no-cache"),
+                   # Prevent nginx from buffering the stream.
+                   (b"x-accel-buffering", b"no")]
+        headers.extend(_cors(scope))
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": headers})
+        await send({"type": "http.response.body", "more_body": True,
+                    "body": _event(event)})
+        last = loop.time()
+        while not event["finished"] and not disconnected.done():
+            now = loop.time()
+            if now >= deadline:
+                break
+            if now - last >= heartbeat:
+                last = now
+                await send({"type": "http.response.body", "body": b":\n\n",
+                            "more_body": True})
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True,
+                timeout=min(deadline, last + heartbeat) - now)
+            if message is not None:
+                last = loop.time()
+                event = json.loads(message["data"])
+                await send({"type": "http.response.body", "more_body": True,
+                            "body": _event(event)})
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        disconnected.cancel()
+        await pubsub.reset()
+
+
+def _event(event):
+    """Format a server-sent event like the ``Events`` resource."""
+    return f"event: status\ndata: {json.dumps(event)}\n\n".encode()
+
+
+def _jsonify(data):
+    """Serialize data to the JSON that Flask's ``jsonify`` would return."""
+    config = flask_app.config
+    if config["JSONIFY_PRETTYPRINT_REGULAR"] or flask_app.debug:
+        options = {"indent": 2, "separators": (", ", ": ")}
+    else:
+        options = {"separators": (",", ":")}
+    body = json.dumps(data, sort_keys=config["JSON_SORT_KEYS"], **options)
+    return f"{body}\n".encode()
+
+
+def _cors(scope):
+    """Return the CORS headers that the Flask application would add."""
+    origin = dict(scope["headers"]).get(b"origin")
+    if origin is None:
+        return []
+    origins = flask_app.config["CORS_ORIGINS"]
+    if "*" in origins:
+        return [(b"access-control-allow-origin", b"*")]
+    if origin.decode("latin-1") in origins:
+        return [(b"access-control-allow-origin", origin), (b"vary", b"Origin")]
+    return []
+
+
+async def _receive_body(receive, limit):
+    """
+    Receive a request body into a spooled temporary file.
+
+    Receiving stops one byte beyond the limit such that the Flask application
+    rejects the request as too large.
+    """
+    body = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    length = 0
+    more_body = True
+    while more_body and (limit is None or length <= limit):
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunk = message.get("body", b"")
+        body.write(chunk)
+        length += len(chunk)
+        more_body = message.get("more_body", False)
+    body.seek(0)
+    return body, length
+
+
+def _environ(scope, path, body, length):
+    """Return the WSGI environment of a request."""
+    server_name, server_port = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": _script_name(scope).rstrip("/"),
+        "PATH_INFO": path.encode("utf8").decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+        "CONTENT_LENGTH": str(length),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"] = scope["client"][0]
+    for name, value in scope["headers"]:
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        # The body was received in full and its length is known.
+        if name in ("CONTENT_LENGTH", "TRANSFER_ENCODING"):
+            continue
+        if name != "CONTENT_TYPE":
+            name = f"HTTP_{name}"
+        if name in environ:
+            value = f"{environ[name]},{value}"
+        environ[name] = value
+    return environ
+
+
+async def _wsgi(scope, receive, send, path):
+    """Handle a request by the Flask application in a thread."""
+    loop = asyncio.get_running_loop()
+    body, length = await _receive_body(
+        receive, flask_app.config["MAX_CONTENT_LENGTH"])
+    environ = _environ(scope, path, body, length)
+    response = {}
+
+    def start_response(status, headers, exc_info=None):
+        response["status"] = int(status.split(" ", 1)[0])
+        response["headers"] = [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in headers]
+
+    def next_chunk(chunks):
+        # Empty chunks do not need to be sent.
+        for chunk in chunks:
+            if chunk:
+                return chunk
+        return None
+
+    try:
+        result = await loop.run_in_executor(
+            executor, flask_app, environ, start_response)
+        try:
+            chunks = iter(result)
+            # Streamed responses may block between chunks and are thus
+            # iterated in the thread pool, too.
+            chunk = await loop.run_in_executor(executor, next_chunk, chunks)
+            await send({"type": "http.response.start",
+                        "status": response["status"],
+                        "headers": response["headers"]})
+            while chunk is not None:
+                await send({"type": "http.response.body", "body": chunk,
+                            "more_body": True})
+                chunk = await loop.run_in_executor(
+                    executor, next_chunk, chunks)
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            if hasattr(result, "close"):
+                await loop.run_in_executor(executor, result.close)
+    finally:
+        body.close()
@@ -0,0 +1,50 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Keep a record of batch submissions.
+
+A batch is the parent of the jobs created from the models of one submission.
+Its record lists every submitted file by name together with either the ID of
+its job or the reason why it was rejected.
+"""
+
+import json
+import logging
+
+from memote_webservice.celery import celery_app
+from memote_webservice.redis import redis_client
+
+
+__all__ = ("register", "get")
+
+LOGGER = logging.getLogger(__name__)
+
+BATCH_KEY = "memote:batch:{}"
+
+
+def register(batch_id, entries):
+    """Record the entries of a batch and let them expire with results."""
+    redis_client.set(BATCH_KEY.format(batch_id), json.dumps(entries),
+                     ex=celery_app.conf.result_expires)
+
+
+def get(batch_id):
+    """Return the entries of a batch or ``None`` if it is unknown."""
+    entries = redis_client.get(BATCH_KEY.format(batch_id))
+    if entries is None:
+        return None
+    return json.loads(entries)
@@ -0,0 +1,89 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Provide a content-addressed cache of memote results.
+
+The cache key is a digest of the decompressed model together with everything
+else that determines the report, i.e., the memote and cobrapy versions and the
+report configuration. Identical submissions thus map to the job that already
+computed (or is computing) their result.
+"""
+
+import hashlib
+import json
+import logging
+from functools import lru_cache
+
+import cobra
+import memote
+from celery import states
+from celery.result import AsyncResult
+
+from memote_webservice.celery import celery_app
+from memote_webservice.redis import redis_client
+
+
+__all__ = ("digest", "lookup", "store")
+
+LOGGER = logging.getLogger(__name__)
+
+CACHE_KEY = "memote:cache:{}"
+
+
+@lru_cache(maxsize=1)
+def _fingerprint():
+    """Identify the software and configuration that produce a report."""
+    config = memote.ReportConfiguration.load()
+    return json.dumps({
+        "memote": memote.__version__,
+        "cobra": cobra.__version__,
+        "configuration": config,
+    }, sort_keys=True, default=str).encode("utf-8")
+
+
+def digest(content_digest):
+    """Compute the cache key from the hex digest of the decompressed model."""
+    checksum = hashlib.sha256(content_digest.encode("ascii"))
+    checksum.update(_fingerprint())
+    return checksum.hexdigest()
+
+
+def lookup(key):
+    """
+    Return the ID of the task that computes the result for a cache key.
+
+    Tasks that did not succeed and are not pending or running anymore are
+    evicted from the cache such that the model is tested anew.
+    """
+    task_id = redis_client.get(CACHE_KEY.format(key))
+    if task_id is None:
+        return None
+    task_id = task_id.decode()
+    result = AsyncResult(id=task_id, app=celery_app)
+    if result.state in states.PROPAGATE_STATES:
+        LOGGER.info(f"Evicting task '{task_id}' in state {result.state} from "
+                    f"the result cache.")
+        redis_client.delete(CACHE_KEY.format(key))
+        return None
+    return task_id
+
+
+def store(key, task_id, timeout):
+    """Remember the task computing the result for a cache key."""
+    if timeout <= 0:
+        return
+    redis_client.set(CACHE_KEY.format(key), task_id, ex=timeout, nx=True)
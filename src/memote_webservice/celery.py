@@ -18,6 +18,7 @@
 import os
 
 from celery import Celery
+from kombu import Queue
 
 
 celery_app = Celery(
@@ -27,14 +28,36 @@ celery_app = Celery(
 
 celery_app.conf.update(
     task_track_started=True,
-    # Time after which a running job will be interrupted.
+    # Time after which a running job will be interrupted unless it was sent
+    # with limits of its own (see `estimates.py`).
     task_time_limit=7200,  # 2 hours
     # Time after which a successful result will be removed.
     result_expires=604800,  # 7 days
     # Always restart workers after finishing. This aims to circumvent cache
     # issues with successive memote runs.
     # See: https://github.com/DD-DeCaF/scrum/issues/875
+    # Set WORKER_PREWARM=1 to avoid paying for imports and test collection in
+    # every restarted process (see `prewarm.py`).
     worker_max_tasks_per_child=1,
+    # Jobs are routed to these queues by `scheduling.route`. Workers fetch
+    # only one job at a time such that priorities decide which job comes next
+    # and prefer interactive jobs without starving bulk jobs (see
+    # `scheduling.WeightedCycle`).
+    task_queues=[Queue('interactive'), Queue('bulk')],
+    task_default_queue='interactive',
+    worker_prefetch_multiplier=1,
+    broker_transport_options={
+        'queue_order_strategy': 'memote_webservice.scheduling:WeightedCycle',
+        'priority_steps': list(range(10)),
+    },
+    # Run `celery -A memote_webservice.tasks beat` once per deployment to
+    # delete stored objects beyond their retention (see `storage.py`).
+    beat_schedule={
+        'sweep-storage': {
+            'task': 'memote_webservice.tasks.sweep_storage',
+            'schedule': 6 * 60 * 60,
+        },
+    },
     task_serializer='pickle',
     result_serializer='pickle',
     accept_content=['pickle'],
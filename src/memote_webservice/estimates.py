@@ -0,0 +1,153 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Estimate the runtime of jobs and derive their limits.
+
+The runtime of a job is predicted from the moving average of runtimes of
+earlier jobs in the same size class (see ``history``). Without such a history,
+it is extrapolated from the runtime of the E. coli core model. Every job gets
+soft and hard time limits and a solver timeout scaled to its model, and every
+finished job records its predicted and actual runtime such that the estimator
+can be checked.
+"""
+
+import json
+import logging
+import statistics
+
+from memote_webservice import history, jobs
+from memote_webservice.redis import redis_client
+
+
+__all__ = ("SOLVER_TIMEOUT", "predict", "limit", "record", "comparisons",
+           "summarize")
+
+LOGGER = logging.getLogger(__name__)
+
+RUNTIMES_KEY = "memote:runtimes"
+COMPARISONS_KEY = "memote:estimates"
+# The number of finished jobs kept for comparing predictions.
+MAX_COMPARISONS = 1000
+# The E. coli core model (95 reactions and 72 metabolites) is tested in about
+# ten seconds and runtimes grow somewhat faster than the model size.
+REFERENCE_COST = 167
+REFERENCE_RUNTIME = 10.0
+EXPONENT = 1.3
+# Solver timeouts grow linearly with model size from the default that suits
+# small models.
+SOLVER_TIMEOUT = 20
+SOLVER_TIMEOUT_COST = 2000
+MAX_SOLVER_TIMEOUT = 300
+# The hard time limit leaves this fraction of the soft limit, but at least
+# the given seconds, for stopping the run.
+GRACE = 0.1
+MIN_GRACE = 30
+
+
+def predict(cost):
+    """Return the predicted runtime in seconds of a job by its model's cost."""
+    runtime = redis_client.hget(RUNTIMES_KEY, history.size_class(cost))
+    if runtime is not None:
+        return float(runtime)
+    return REFERENCE_RUNTIME * (max(cost, 1) / REFERENCE_COST) ** EXPONENT
+
+
+def limit(job_id, cost, factor, minimum, maximum):
+    """
+    Predict the runtime of a job and record the limits derived from it.
+
+    Parameters
+    ----------
+    job_id : str
+        The job to limit.
+    cost : int
+        The number of reactions and metabolites of the model.
+    factor : float
+        The soft time limit as a multiple of the predicted runtime.
+    minimum : int
+        The lower bound of the soft time limit in seconds.
+    maximum : int
+        The upper bound of the hard time limit in seconds.
+
+    Returns
+    -------
+    dict
+        The ``soft_time_limit`` and ``time_limit`` options for sending the
+        job's tasks.
+
+    """
+    predicted = predict(cost)
+    soft = max(minimum, min(factor * predicted, maximum / (1 + GRACE)))
+    limits = {
+        "soft_time_limit": int(soft),
+        "time_limit": int(soft + max(GRACE * soft, MIN_GRACE)),
+    }
+    solver_timeout = min(MAX_SOLVER_TIMEOUT, max(
+        SOLVER_TIMEOUT, int(SOLVER_TIMEOUT * cost / SOLVER_TIMEOUT_COST)))
+    jobs.register(job_id, predicted=predicted, solver_timeout=solver_timeout,
+                  **limits)
+    return limits
+
+
+def record(job_id, actual):
+    """Add the actual runtime of a finished job to the history."""
+    job = jobs.get(job_id)
+    if "predicted" not in job or "cost" not in job:
+        return
+    cost = int(job["cost"])
+    size = history.size_class(cost)
+    previous = redis_client.hget(RUNTIMES_KEY, size)
+    comparison = {
+        "job": job_id,
+        "cost": cost,
+        "size_class": size,
+        "predicted": float(job["predicted"]),
+        "actual": actual,
+    }
+    with redis_client.pipeline() as pipe:
+        pipe.hset(RUNTIMES_KEY, size, history.average(
+            None if previous is None else float(previous), actual))
+        pipe.lpush(COMPARISONS_KEY, json.dumps(comparison))
+        pipe.ltrim(COMPARISONS_KEY, 0, MAX_COMPARISONS - 1)
+        pipe.execute()
+
+
+def comparisons():
+    """Return the predicted and actual runtimes of the latest jobs."""
+    return [json.loads(value)
+            for value in redis_client.lrange(COMPARISONS_KEY, 0, -1)]
+
+
+def summarize(entries):
+    """
+    Summarize the accuracy of predictions per size class.
+
+    The ratio of actual to predicted runtime is one for perfect predictions.
+    """
+    classes = {}
+    for entry in entries:
+        classes.setdefault(entry["size_class"], []).append(entry)
+    return {
+        size: {
+            "jobs": len(group),
+            "median_ratio": statistics.median(
+                entry["actual"] / entry["predicted"] for entry in group),
+            "mean_absolute_error": statistics.mean(
+                abs(entry["actual"] - entry["predicted"]) for entry in group),
+        }
+        for size, group in sorted(classes.items())
+    }
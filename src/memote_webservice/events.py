@@ -0,0 +1,94 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Publish and follow the state transitions of jobs.
+
+Workers publish every transition of a job (``STARTED``, ``PROGRESS``,
+``SUCCESS``, ``FAILURE``, ...) on a redis channel of that job such that clients
+can be notified instead of polling the result backend.
+"""
+
+import json
+import logging
+import time
+
+from celery import states
+
+from memote_webservice.redis import pubsub_client, redis_client
+
+
+__all__ = ("PROGRESS", "publish", "follow")
+
+LOGGER = logging.getLogger(__name__)
+
+EVENTS_KEY = "memote:events:{}"
+# A custom state for events about the progress of a job that is not reflected
+# in the state of its celery task.
+PROGRESS = "PROGRESS"
+
+
+def publish(job_id, status, **info):
+    """Publish a state transition and any further information on a job."""
+    info["status"] = status
+    info["finished"] = status in states.READY_STATES
+    redis_client.publish(EVENTS_KEY.format(job_id), json.dumps(info))
+
+
+def follow(job_id, current, timeout, heartbeat):
+    """
+    Generate the current and all following events of a job.
+
+    The channel is subscribed before the current event is generated such that
+    no transition is missed. Events stop after the job finished or after
+    ``timeout`` seconds. ``None`` is generated when there was no event for
+    ``heartbeat`` seconds. Waiting for messages blocks on the redis socket only,
+    which gevent turns into a cooperative wait.
+
+    Parameters
+    ----------
+    job_id : str
+        The ID of the job (or the task implementing it) to follow.
+    current : callable
+        Return the event describing the current state of the job.
+    timeout : float
+        Seconds after which to stop following the job.
+    heartbeat : float
+        Seconds without events after which to generate ``None``.
+
+    """
+    deadline = time.monotonic() + timeout
+    pubsub = pubsub_client.pubsub(ignore_subscribe_messages=True)
+    try:
+        pubsub.subscribe(EVENTS_KEY.format(job_id))
+        event = current()
+        yield event
+        last = time.monotonic()
+        while not event["finished"]:
+            now = time.monotonic()
+            if now >= deadline:
+                return
+            if now - last >= heartbeat:
+                last = now
+                yield None
+            message = pubsub.get_message(
+                timeout=min(deadline, last + heartbeat) - now)
+            if message is not None:
+                last = time.monotonic()
+                event = json.loads(message["data"])
+                yield event
+    finally:
+        pubsub.close()
@@ -16,7 +16,19 @@
 
 class SBMLValidationError(Exception):
     def __init__(self, code, warnings, errors, *args, **kwargs):
-        super().__init__(self, *args, **kwargs)
+        super().__init__(*args, **kwargs)
         self.code = code
         self.warnings = warnings
         self.errors = errors
+
+    def __reduce__(self):
+        # Allow celery to pickle the error when validating in a worker.
+        return type(self), (self.code, self.warnings, self.errors) + self.args
+
+
+class DecompressionLimitError(Exception):
+    pass
+
+
+class StorageCodecError(Exception):
+    pass
@@ -0,0 +1,72 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Keep a history of test durations by model size.
+
+The cost of a model is its number of reactions and metabolites. Models are
+grouped into size classes by the binary logarithm of their cost. For every
+class, the duration of each memote test is an exponentially weighted moving
+average over the finished jobs.
+"""
+
+import logging
+import math
+
+from memote_webservice.redis import redis_client
+
+
+__all__ = ("cost", "size_class", "expected", "record", "average")
+
+LOGGER = logging.getLogger(__name__)
+
+DURATIONS_KEY = "memote:durations:{}"
+# Weight of the latest duration in the moving average.
+SMOOTHING = 0.3
+
+
+def cost(model):
+    """Return the cost of testing a model."""
+    return len(model.reactions) + len(model.metabolites)
+
+
+def size_class(cost):
+    """Return the size class of a model by its cost."""
+    return int(math.log2(cost + 1))
+
+
+def expected(size):
+    """Return the expected duration in seconds of every test by size class."""
+    durations = redis_client.hgetall(DURATIONS_KEY.format(size))
+    return {test.decode(): float(value) for test, value in durations.items()}
+
+
+def record(size, durations):
+    """Add the test durations of a finished job to the history of its class."""
+    previous = expected(size)
+    averages = {
+        test: average(previous.get(test), duration)
+        for test, duration in durations.items()
+    }
+    if averages:
+        redis_client.hset(DURATIONS_KEY.format(size), mapping=averages)
+
+
+def average(previous, value):
+    """Update a moving average with a new value."""
+    if previous is None:
+        return value
+    return SMOOTHING * value + (1 - SMOOTHING) * previous
@@ -0,0 +1,195 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Re-test revisions of a model incrementally.
+
+Every tested model leaves a fingerprint with its job, i.e., a digest per
+aspect of the model such as the stoichiometry or the metabolite annotations.
+A job submitted as the revision of a parent job compares the fingerprints and
+reruns only those tests that depend on a changed aspect. The results of all
+other tests are carried over from the parent's report and marked as reused.
+
+This module is a pytest plugin, loaded with ``-p
+memote_webservice.incremental``, that deselects the reusable tests of the
+active comparison. Like the progress, that is a module attribute inherited by
+processes forked to run test modules in parallel.
+
+PYTEST_DONT_REWRITE
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+from contextlib import contextmanager
+from operator import attrgetter
+
+import memote
+from celery.result import AsyncResult
+
+from memote_webservice import jobs
+from memote_webservice.celery import celery_app
+from memote_webservice.reporting import load_result
+
+
+__all__ = ("fingerprint", "changes", "reusable", "reusing", "parent",
+           "carry_over")
+
+LOGGER = logging.getLogger(__name__)
+
+# The aspects of a model on which tests of some modules depend exclusively, by
+# test module and test name prefix. All other tests are assumed to depend on
+# every aspect of the model and always rerun.
+DEPENDENCIES = {
+    "test_annotation": (
+        ("test_metabolite_", ("metabolites", "metabolites.annotation")),
+        ("test_reaction_", ("reactions", "reactions.annotation")),
+        ("test_gene_product_", ("genes", "genes.annotation")),
+    ),
+    "test_matrix": (
+        ("test_", ("metabolites", "reactions")),
+    ),
+}
+
+# Strip the parameter from the name of a parametrized test like memote does.
+_PARAMETER = re.compile(r"\[[^\]]*\]$")
+
+# The aspects that changed since the parent of the job under test.
+_changes = None
+
+
+def _digest(values):
+    """Return a digest of JSON serializable values."""
+    return hashlib.sha256(
+        json.dumps(values, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def fingerprint(model):
+    """Return a digest of every aspect of a model and the memote version."""
+    metabolites = sorted(model.metabolites, key=attrgetter("id"))
+    reactions = sorted(model.reactions, key=attrgetter("id"))
+    genes = sorted(model.genes, key=attrgetter("id"))
+
+    def descriptions(entities):
+        return _digest([(entity.id, entity.name, entity.annotation,
+                         entity.notes) for entity in entities])
+
+    return {
+        "memote": memote.__version__,
+        "model": _digest([str(model.objective.expression),
+                          model.objective.direction, model.compartments]),
+        "metabolites": _digest([(met.id, met.compartment)
+                                for met in metabolites]),
+        "metabolites.chemistry": _digest([(met.id, met.formula, met.charge)
+                                          for met in metabolites]),
+        "metabolites.annotation": descriptions(metabolites),
+        "reactions": _digest([
+            (rxn.id, sorted((met.id, coefficient)
+                            for met, coefficient in rxn.metabolites.items()))
+            for rxn in reactions
+        ]),
+        "reactions.constraints": _digest([
+            (rxn.id, rxn.lower_bound, rxn.upper_bound, rxn.gene_reaction_rule,
+             rxn.subsystem) for rxn in reactions
+        ]),
+        "reactions.annotation": descriptions(reactions),
+        "genes": _digest([gene.id for gene in genes]),
+        "genes.annotation": descriptions(genes),
+    }
+
+
+def changes(previous, current):
+    """
+    Return the aspects that differ between two fingerprints.
+
+    Returns ``None`` when the models were tested by different versions of
+    memote such that no result can be reused.
+    """
+    if previous.get("memote") != current["memote"]:
+        return None
+    return {aspect for aspect, digest in current.items()
+            if aspect != "memote" and previous.get(aspect) != digest}
+
+
+def reusable(module, test, changed):
+    """Return whether the result of a test is unaffected by the changes."""
+    for prefix, aspects in DEPENDENCIES.get(module, ()):
+        if test.startswith(prefix):
+            return changed.isdisjoint(aspects)
+    return False
+
+
+@contextmanager
+def reusing(changed):
+    """Deselect the tests unaffected by the changes in pytest sessions."""
+    global _changes
+    _changes = changed
+    try:
+        yield
+    finally:
+        _changes = None
+
+
+def parent(job_id):
+    """
+    Return the task and fingerprint of a parent job with reusable results.
+
+    Returns ``None`` unless the parent job was tested successfully.
+    """
+    task_id, _ = jobs.resolve(job_id)
+    previous = jobs.get(task_id).get("fingerprint")
+    if previous is None or \
+            not AsyncResult(id=task_id, app=celery_app).successful():
+        LOGGER.info(f"Parent job {job_id} has no reusable results.")
+        return None
+    return task_id, json.loads(previous)
+
+
+def carry_over(result, job_id, task_id, changed):
+    """
+    Add the results of a parent job for all tests that did not run.
+
+    Reused results are marked with the parent job and the meta data record the
+    changes since the parent.
+    """
+    previous = load_result(AsyncResult(id=task_id, app=celery_app).result)
+    for test, case in previous.cases.items():
+        if test not in result.cases:
+            result.cases[test] = {**case, "reused_from": job_id}
+    result.meta["parent"] = job_id
+    result.meta["changes"] = sorted(changed)
+    return result
+
+
+def pytest_collection_modifyitems(config, items):
+    """Deselect the tests whose results are reused."""
+    if _changes is None:
+        return
+    kept = []
+    reused = []
+    for item in items:
+        module = os.path.splitext(os.path.basename(item.location[0]))[0]
+        test = _PARAMETER.sub("", item.location[2])
+        if reusable(module, test, _changes):
+            reused.append(item)
+        else:
+            kept.append(item)
+    if reused:
+        config.hook.pytest_deselected(items=reused)
+        items[:] = kept
@@ -0,0 +1,164 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Index stored results for retrieving parts of a report.
+
+The JSON report of a genome-scale model runs to many megabytes, mostly for the
+identifiers listed by tests. The first partial retrieval of a result copies
+the summary and every test case from the stored parts of the result (see
+``reporting.StoredResult``) into a hash such that later retrievals only load
+and page what they select. The identifiers listed by every test stay in the
+storage.
+"""
+
+import json
+import logging
+
+from memote_webservice import storage
+from memote_webservice.celery import celery_app
+from memote_webservice.redis import redis_client
+
+
+__all__ = ("FIELDS", "UnknownSelection", "select")
+
+LOGGER = logging.getLogger(__name__)
+
+INDEX_KEY = "memote:index:{}"
+# The fields of a test case. Only the data is stored separately since it is
+# what makes results large.
+FIELDS = ("title", "summary", "format_type", "result", "metric", "message",
+          "duration", "data")
+
+
+class UnknownSelection(KeyError):
+    """Raised when selecting tests or sections that a report does not have."""
+
+
+def _index(key, parts):
+    """Store the index of a result from its stored parts."""
+    summary = json.loads(storage.load(parts.summary))
+    tests = json.loads(storage.load(parts.tests))
+    mapping = {
+        field: json.dumps(summary[field])
+        for field in ("meta", "score", "sections", "tests")
+    }
+    for test, case in tests["cases"].items():
+        mapping[f"test:{test}"] = json.dumps(case)
+        mapping[f"data:{test}"] = tests["data"][test]
+    with redis_client.pipeline() as pipe:
+        pipe.hset(key, mapping=mapping)
+        pipe.expire(key, celery_app.conf.result_expires)
+        pipe.execute()
+
+
+def _page(data, page, per_page):
+    """Return a page of the identifiers listed by a test and their number."""
+    if isinstance(data, list):
+        start = (page - 1) * per_page
+        return data[start:start + per_page], len(data)
+    if isinstance(data, dict):
+        # Parametrized tests list identifiers per parameter.
+        pages = {
+            param: _page(value, page, per_page)
+            for param, value in data.items()
+        }
+        return ({param: value for param, (value, _) in pages.items()},
+                {param: total for param, (_, total) in pages.items()})
+    return data, None
+
+
+def select(task_id, load, tests=None, sections=None, fields=None, page=1,
+           per_page=1000):
+    """
+    Return the selected tests and fields of a result.
+
+    Parameters
+    ----------
+    task_id : str
+        The task whose result is selected from.
+    load : callable
+        Return the stored parts of the result (see ``reporting.load_parts``)
+        when it is not indexed yet.
+    tests : list, optional
+        The tests to select.
+    sections : list, optional
+        The sections of the report whose tests to select. Without tests and
+        sections, all tests are selected.
+    fields : list, optional
+        The fields of every test case to return (default all, see ``FIELDS``).
+    page : int, optional
+        The page of the identifiers listed by every test.
+    per_page : int, optional
+        The number of identifiers per page.
+
+    Returns
+    -------
+    dict
+        The meta data, the score, and the selected tests of the result. Test
+        cases with paged data state the total number of identifiers as
+        ``data_total``.
+
+    Raises
+    ------
+    UnknownSelection
+        If a test or section is not part of the report.
+
+    """
+    key = INDEX_KEY.format(task_id)
+    if not redis_client.exists(key):
+        LOGGER.debug(f"Indexing the result of task {task_id}.")
+        _index(key, load())
+    meta, score, known, tested = redis_client.hmget(
+        key, ["meta", "score", "sections", "tests"])
+    known = json.loads(known)
+    tested = json.loads(tested)
+    if tests is None and sections is None:
+        selected = tested
+    else:
+        unknown = set(sections or ()) - set(known)
+        unknown.update(set(tests or ()) - set(tested))
+        if unknown:
+            raise UnknownSelection(sorted(unknown))
+        selected = list(tests or ())
+        for section in sections or ():
+            selected.extend(test for test in known[section]
+                            if test in tested and test not in selected)
+    fields = FIELDS if fields is None else fields
+    with_data = "data" in fields
+    values = [[], []]
+    if selected:
+        with redis_client.pipeline(transaction=False) as pipe:
+            pipe.hmget(key, [f"test:{test}" for test in selected])
+            if with_data:
+                pipe.hmget(key, [f"data:{test}" for test in selected])
+            values = pipe.execute()
+    cases = {}
+    for i, test in enumerate(selected):
+        stored = json.loads(values[0][i])
+        case = {field: stored[field] for field in fields if field in stored}
+        if with_data:
+            data = storage.load(values[1][i].decode())
+            case["data"], total = _page(json.loads(data), page, per_page)
+            if total is not None:
+                case["data_total"] = total
+        cases[test] = case
+    return {
+        "meta": json.loads(meta),
+        "score": json.loads(score),
+        "tests": cases,
+        "page": page,
+        "per_page": per_page,
+    }
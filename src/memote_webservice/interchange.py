@@ -0,0 +1,276 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Serialize models to a compact, array-backed interchange format.
+
+Pickling a model pickles the graph of every reaction, metabolite, and gene
+together with the solver state, which is slow and memory-hungry for large
+models. The interchange format instead holds flat arrays:
+
+* the stoichiometric matrix in compressed sparse row form with a row per
+  reaction (``indptr``, ``indices`` of metabolites, and ``data``),
+* the bounds and objective coefficients of the reactions and the charges of
+  the metabolites, and
+* string tables of identifiers, names, formulas, compartments, subsystems,
+  gene-reaction rules, and JSON encoded annotations and notes.
+
+A string table is the concatenated UTF-8 encoded strings with their offsets
+and a mask of missing values. The format starts with ``MAGIC``, the length of
+a JSON header, and the header itself, which holds the model attributes and the
+data type, shape, and offset of every array. Arrays are aligned to eight bytes
+such that they are read from any buffer, e.g., a memory-mapped file, without
+copying.
+"""
+
+import json
+import logging
+import struct
+
+import numpy as np
+from cobra import Gene, Metabolite, Model, Reaction
+from cobra.util.solver import set_objective
+
+
+__all__ = ("MAGIC", "dumps", "loads")
+
+LOGGER = logging.getLogger(__name__)
+
+MAGIC = b"MEMOTEMI"
+VERSION = 1
+ALIGNMENT = 8
+# The magic bytes and the header length.
+PREFIX = struct.Struct("<8sQ")
+# The attributes of the model that are stored in the header.
+MODEL_ATTRIBUTES = ("id", "name", "compartments", "notes", "annotation")
+
+
+def _json(value):
+    """Encode a dictionary, leaving out the common empty ones."""
+    return json.dumps(value) if value else ""
+
+
+def _strings(values):
+    """Return the arrays of a string table."""
+    encoded = [b"" if value is None else value.encode("utf-8")
+               for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return {
+        "offsets": offsets,
+        "data": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+        "missing": np.array([value is None for value in values], dtype=bool),
+    }
+
+
+def _decode(arrays, name):
+    """Return the strings of a table."""
+    offsets = arrays[f"{name}.offsets"].tolist()
+    data = arrays[f"{name}.data"].tobytes()
+    missing = arrays[f"{name}.missing"].tolist()
+    return [None if absent else data[start:end].decode("utf-8")
+            for start, end, absent in zip(offsets, offsets[1:], missing)]
+
+
+def _tables(prefix, **columns):
+    """Return the arrays of string tables by their names."""
+    return {f"{prefix}.{column}.{part}": array
+            for column, values in columns.items()
+            for part, array in _strings(values).items()}
+
+
+def dumps(model):
+    """Serialize a model to the interchange format."""
+    metabolites = model.metabolites
+    reactions = model.reactions
+    genes = model.genes
+    index = {met.id: i for i, met in enumerate(metabolites)}
+    indptr = np.zeros(len(reactions) + 1, dtype=np.int64)
+    np.cumsum([len(rxn.metabolites) for rxn in reactions], out=indptr[1:])
+    # The coefficients are kept in the order of every reaction's definition.
+    arrays = {
+        "stoichiometry.indptr": indptr,
+        "stoichiometry.indices": np.array(
+            [index[met.id] for rxn in reactions for met in rxn.metabolites],
+            dtype=np.int32),
+        "stoichiometry.data": np.array(
+            [coefficient for rxn in reactions
+             for coefficient in rxn.metabolites.values()], dtype=np.float64),
+        "reactions.lower_bound": np.array(
+            [rxn.lower_bound for rxn in reactions], dtype=np.float64),
+        "reactions.upper_bound": np.array(
+            [rxn.upper_bound for rxn in reactions], dtype=np.float64),
+        "reactions.objective_coefficient": np.array(
+            [rxn.objective_coefficient for rxn in reactions],
+            dtype=np.float64),
+        "metabolites.charge": np.array(
+            [np.nan if met.charge is None else met.charge
+             for met in metabolites], dtype=np.float64),
+        **_tables(
+            "metabolites",
+            id=[met.id for met in metabolites],
+            name=[met.name for met in metabolites],
+            formula=[met.formula for met in metabolites],
+            compartment=[met.compartment for met in metabolites],
+            annotation=[_json(met.annotation) for met in metabolites],
+            notes=[_json(met.notes) for met in metabolites],
+        ),
+        **_tables(
+            "reactions",
+            id=[rxn.id for rxn in reactions],
+            name=[rxn.name for rxn in reactions],
+            subsystem=[rxn.subsystem for rxn in reactions],
+            gene_reaction_rule=[rxn.gene_reaction_rule for rxn in reactions],
+            annotation=[_json(rxn.annotation) for rxn in reactions],
+            notes=[_json(rxn.notes) for rxn in reactions],
+        ),
+        **_tables(
+            "genes",
+            id=[gene.id for gene in genes],
+            name=[gene.name for gene in genes],
+            annotation=[_json(gene.annotation) for gene in genes],
+            notes=[_json(gene.notes) for gene in genes],
+        ),
+    }
+    header = {
+        "version": VERSION,
+        "model": {attribute: getattr(model, attribute)
+                  for attribute in MODEL_ATTRIBUTES},
+        "objective_direction": model.objective_direction,
+        "arrays": {},
+    }
+    offset = 0
+    for name, array in arrays.items():
+        offset += -offset % ALIGNMENT
+        header["arrays"][name] = [array.dtype.str, array.shape, offset]
+        offset += array.nbytes
+    encoded = json.dumps(header).encode("utf-8")
+    # The arrays start aligned after the header.
+    encoded += b" " * (-(PREFIX.size + len(encoded)) % ALIGNMENT)
+    parts = [PREFIX.pack(MAGIC, len(encoded)), encoded]
+    position = 0
+    for name, array in arrays.items():
+        padding = header["arrays"][name][2] - position
+        parts.extend((b"\0" * padding, array.tobytes()))
+        position += padding + array.nbytes
+    return b"".join(parts)
+
+
+def _header(buffer):
+    """Return the header and the offset of the arrays in a buffer."""
+    magic, length = PREFIX.unpack_from(buffer)
+    if magic != MAGIC:
+        raise ValueError("Not a model in the interchange format.")
+    header = json.loads(bytes(buffer[PREFIX.size:PREFIX.size + length]))
+    if header["version"] != VERSION:
+        raise ValueError(
+            f"Unsupported interchange format version {header['version']}.")
+    return header, PREFIX.size + length
+
+
+def loads(buffer):
+    """
+    Build a model from the interchange format.
+
+    Parameters
+    ----------
+    buffer : bytes-like
+        The serialized model, e.g., bytes or a memory-mapped file.
+
+    Returns
+    -------
+    cobra.Model
+        The model with a new solver instance.
+
+    Raises
+    ------
+    ValueError
+        If the buffer does not hold a model in the supported version of the
+        interchange format.
+
+    """
+    header, start = _header(buffer)
+    arrays = {
+        name: np.frombuffer(buffer, dtype=np.dtype(dtype),
+                            count=int(np.prod(shape)),
+                            offset=start + offset).reshape(shape)
+        for name, (dtype, shape, offset) in header["arrays"].items()
+    }
+
+    def table(prefix, *columns):
+        return zip(*(_decode(arrays, f"{prefix}.{column}")
+                     for column in columns))
+
+    model = Model()
+    metabolites = []
+    for (id_, name, formula, compartment, annotation, notes), charge in zip(
+            table("metabolites", "id", "name", "formula", "compartment",
+                  "annotation", "notes"),
+            arrays["metabolites.charge"].tolist()):
+        metabolite = Metabolite(
+            id_, formula=formula, name=name, compartment=compartment,
+            charge=None if charge != charge else _integral(charge))
+        metabolite.annotation = json.loads(annotation) if annotation else {}
+        metabolite.notes = json.loads(notes) if notes else {}
+        metabolites.append(metabolite)
+    genes = []
+    for id_, name, annotation, notes in table(
+            "genes", "id", "name", "annotation", "notes"):
+        gene = Gene(id_, name=name)
+        gene.annotation = json.loads(annotation) if annotation else {}
+        gene.notes = json.loads(notes) if notes else {}
+        genes.append(gene)
+    model.genes.extend(genes)
+    indptr = arrays["stoichiometry.indptr"].tolist()
+    indices = arrays["stoichiometry.indices"].tolist()
+    data = arrays["stoichiometry.data"].tolist()
+    reactions = []
+    rules = []
+    for i, (id_, name, subsystem, rule, annotation, notes) in enumerate(table(
+            "reactions", "id", "name", "subsystem", "gene_reaction_rule",
+            "annotation", "notes")):
+        reaction = Reaction(
+            id_, name=name, subsystem=subsystem,
+            lower_bound=arrays["reactions.lower_bound"][i].item(),
+            upper_bound=arrays["reactions.upper_bound"][i].item())
+        reaction.add_metabolites({
+            metabolites[index]: coefficient for index, coefficient in zip(
+                indices[indptr[i]:indptr[i + 1]],
+                data[indptr[i]:indptr[i + 1]])})
+        reaction.annotation = json.loads(annotation) if annotation else {}
+        reaction.notes = json.loads(notes) if notes else {}
+        reactions.append(reaction)
+        rules.append(rule)
+    # Reactions copy metabolites that belong to another model than theirs, so
+    # the metabolites join the model only after they were assigned.
+    model.add_metabolites(metabolites)
+    model.add_reactions(reactions)
+    # Rules of reactions in a model refer to its genes instead of new ones.
+    for reaction, rule in zip(reactions, rules):
+        reaction.gene_reaction_rule = rule
+    set_objective(model, {
+        reaction: coefficient for reaction, coefficient in zip(
+            reactions, arrays["reactions.objective_coefficient"].tolist())
+        if coefficient != 0})
+    model.objective_direction = header["objective_direction"]
+    for attribute, value in header["model"].items():
+        setattr(model, attribute, value)
+    return model
+
+
+def _integral(value):
+    """Return charges that are whole numbers as integers like cobrapy."""
+    return int(value) if value.is_integer() else value
@@ -0,0 +1,136 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Keep a record of submitted jobs.
+
+A job is what a client submits and polls by its UUID. Usually a job is
+implemented by a celery task of the same ID but a job may also point to the
+task of an earlier, identical submission, for example, when its result was
+retrieved from the result cache.
+"""
+
+import logging
+
+from celery import states
+
+from memote_webservice.celery import celery_app
+from memote_webservice.redis import redis_client
+
+
+__all__ = ("register", "setdefault", "increment", "increment_many", "get",
+           "resolve", "resolve_many", "task_metas", "decode", "task_key",
+           "decode_meta")
+
+LOGGER = logging.getLogger(__name__)
+
+JOB_KEY = "memote:job:{}"
+
+
+def register(job_id, **fields):
+    """Record the given fields for a job and let them expire with results."""
+    key = JOB_KEY.format(job_id)
+    with redis_client.pipeline() as pipe:
+        pipe.hset(key, mapping=fields)
+        pipe.expire(key, celery_app.conf.result_expires)
+        pipe.execute()
+
+
+def setdefault(job_id, field, value):
+    """Record a field for a job unless present and return the recorded value."""
+    key = JOB_KEY.format(job_id)
+    with redis_client.pipeline() as pipe:
+        pipe.hsetnx(key, field, value)
+        pipe.expire(key, celery_app.conf.result_expires)
+        pipe.hget(key, field)
+        return pipe.execute()[-1].decode()
+
+
+def increment(job_id, field, amount=1):
+    """Atomically increment a counter of a job and return its new value."""
+    if isinstance(amount, float):
+        return redis_client.hincrbyfloat(JOB_KEY.format(job_id), field, amount)
+    return redis_client.hincrby(JOB_KEY.format(job_id), field, amount)
+
+
+def increment_many(job_id, **amounts):
+    """Increment counters of a job and return the record in one round trip."""
+    key = JOB_KEY.format(job_id)
+    with redis_client.pipeline() as pipe:
+        for field, amount in amounts.items():
+            if isinstance(amount, float):
+                pipe.hincrbyfloat(key, field, amount)
+            else:
+                pipe.hincrby(key, field, amount)
+        pipe.hgetall(key)
+        return decode(pipe.execute()[-1])
+
+
+def get(job_id):
+    """Return the recorded fields of a job (empty if there is no record)."""
+    return decode(redis_client.hgetall(JOB_KEY.format(job_id)))
+
+
+def resolve(job_id):
+    """
+    Return the ID of the celery task implementing a job and the job record.
+
+    Jobs without a record are implemented by a task of the same ID.
+    """
+    record = get(job_id)
+    return record.get("task", job_id), record
+
+
+def resolve_many(job_ids):
+    """Resolve many jobs like ``resolve`` in a single round trip."""
+    with redis_client.pipeline(transaction=False) as pipe:
+        for job_id in job_ids:
+            pipe.hgetall(JOB_KEY.format(job_id))
+        records = [decode(record) for record in pipe.execute()]
+    return [(record.get("task", job_id), record)
+            for job_id, record in zip(job_ids, records)]
+
+
+def task_metas(task_ids):
+    """
+    Return the stored state and result of many tasks in a single round trip.
+
+    Unlike inspecting an ``AsyncResult`` per task, this fetches all values from
+    the result backend at once. Unknown tasks are pending.
+    """
+    if not task_ids:
+        return []
+    # The result backend lives in the same redis and is read through the
+    # bounded pool of the app.
+    values = redis_client.mget([task_key(task_id) for task_id in task_ids])
+    return [decode_meta(value) for value in values]
+
+
+def decode(record):
+    """Decode the fields of a job record as read from redis."""
+    return {key.decode(): value.decode() for key, value in record.items()}
+
+
+def task_key(task_id):
+    """Return the key under which the result backend stores a task's state."""
+    return celery_app.backend.get_key_for_task(task_id)
+
+
+def decode_meta(value):
+    """Decode a task's stored state and result (``None`` is pending)."""
+    if value is None:
+        return {"status": states.PENDING, "result": None}
+    return celery_app.backend.decode_result(value)
@@ -0,0 +1,247 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Decompress and load metabolic models from uploaded files."""
+
+import hashlib
+import logging
+import os
+import posixpath
+import tarfile
+import zipfile
+import zlib
+from bz2 import BZ2File
+from gzip import GzipFile
+
+import memote
+from cobra.io import load_json_model
+
+from memote_webservice.exceptions import (
+    DecompressionLimitError, SBMLValidationError)
+
+
+__all__ = ("JSON_TYPES", "XML_TYPES", "DECOMPRESSION_ERRORS",
+           "decompressed_name", "unpack", "store", "detect_format",
+           "count_entities", "load_model", "load_file")
+
+LOGGER = logging.getLogger(__name__)
+
+JSON_TYPES = {
+    "application/json",
+    "text/json"
+}
+XML_TYPES = {
+    "application/xml",
+    "text/xml"
+}
+# Bytes read from an upload at once. This bounds the memory needed per upload
+# independent of the model size.
+CHUNK_SIZE = 64 * 1024
+# Errors raised while reading a corrupt compressed stream. A damaged deflate
+# stream raises `zlib.error` rather than an `OSError` from within `GzipFile`.
+DECOMPRESSION_ERRORS = (OSError, EOFError, zlib.error)
+TAR_EXTENSIONS = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2")
+# Byte strings that occur once per reaction and per metabolite in a stored
+# model by format.
+ENTITY_MARKERS = {
+    "sbml": (b"<reaction ", b"<species "),
+    "json": (b'"lower_bound"', b'"compartment"'),
+}
+
+
+def decompressed_name(filename):
+    """Return the filename without a gzip or bzip2 extension."""
+    if filename.endswith(".gz"):
+        return filename[:-3]
+    elif filename.endswith(".bz2"):
+        return filename[:-4]
+    return filename
+
+
+def unpack(filename, stream):
+    """
+    Generate the name and content stream of every file in an archive.
+
+    Tar archives, optionally compressed, are read as a stream in one pass. Zip
+    archives need a seekable stream. Any other file is generated as is. Every
+    content stream must be consumed before advancing to the next file.
+    Directories and hidden files, such as macOS resource forks, are skipped.
+    """
+    extension = filename.lower()
+    if extension.endswith(TAR_EXTENSIONS):
+        LOGGER.debug("Unpacking tar archive.")
+        with tarfile.open(fileobj=stream, mode="r|*") as archive:
+            for member in archive:
+                if member.isfile() and not _hidden(member.name):
+                    yield member.name, archive.extractfile(member)
+    elif extension.endswith(".zip"):
+        LOGGER.debug("Unpacking zip archive.")
+        with zipfile.ZipFile(_seekable(stream)) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and not _hidden(info.filename):
+                    with archive.open(info) as member:
+                        yield info.filename, member
+    else:
+        yield filename, stream
+
+
+def _seekable(stream):
+    """Return the given stream or a file beneath it that can seek."""
+    # Werkzeug spools uploads to a `SpooledTemporaryFile`, which lacks the
+    # `seekable` method that zipfile requires before Python 3.11.
+    if not hasattr(stream, "seekable"):
+        return stream._file
+    return stream
+
+
+def _hidden(name):
+    """Return whether any part of an archive member name is hidden."""
+    return any(part.startswith(".") or part == "__MACOSX"
+               for part in posixpath.normpath(name).split("/"))
+
+
+def _open(filename, stream):
+    """Wrap the stream such that reading from it decompresses its content."""
+    if filename.endswith(".gz"):
+        LOGGER.debug("Unpacking gzip compressed file.")
+        return GzipFile(fileobj=stream, mode="rb")
+    elif filename.endswith(".bz2"):
+        LOGGER.debug("Unpacking bzip2 compressed file.")
+        return BZ2File(stream, mode="rb")
+    return stream
+
+
+def store(filename, stream, path, max_length=None):
+    """
+    Decompress a stream chunk by chunk into the file at path.
+
+    Parameters
+    ----------
+    filename : str
+        The name of the uploaded file whose extension determines the
+        compression.
+    stream : file-like
+        The uploaded content.
+    path : str
+        Where to write the decompressed content.
+    max_length : int, optional
+        The maximum decompressed size in bytes.
+
+    Returns
+    -------
+    str
+        The SHA-256 hex digest of the decompressed content.
+
+    Raises
+    ------
+    DecompressionLimitError
+        If the decompressed content exceeds ``max_length``.
+
+    """
+    checksum = hashlib.sha256()
+    length = 0
+    source = _open(filename, stream)
+    try:
+        with open(path, "wb") as file_:
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                length += len(chunk)
+                if max_length is not None and length > max_length:
+                    raise DecompressionLimitError(
+                        f"The decompressed model exceeds the limit of "
+                        f"{max_length} bytes.")
+                checksum.update(chunk)
+                file_.write(chunk)
+    except Exception:
+        # Do not leave partial content behind.
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    finally:
+        if source is not stream:
+            source.close()
+    return checksum.hexdigest()
+
+
+def detect_format(filename, mimetype):
+    """Return 'json', 'sbml', or ``None`` for an unhandled model format."""
+    if mimetype in JSON_TYPES or filename.endswith("json"):
+        return "json"
+    elif mimetype in XML_TYPES or filename.endswith("xml") or \
+            filename.endswith("sbml"):
+        return "sbml"
+    return None
+
+
+def count_entities(path, model_format):
+    """
+    Estimate the number of reactions and metabolites of a stored model.
+
+    This scans the file for markers of both instead of parsing it and is thus
+    cheap enough for the web process even for large models.
+    """
+    markers = ENTITY_MARKERS[model_format]
+    overlap = max(len(marker) for marker in markers) - 1
+    count = 0
+    tail = b""
+    with open(path, "rb") as file_:
+        for chunk in iter(lambda: file_.read(CHUNK_SIZE), b""):
+            # Markers split between chunks are found in the joined tail.
+            window = tail + chunk
+            count += sum(window.count(marker) for marker in markers)
+            tail = window[-overlap:]
+            count -= sum(tail.count(marker) for marker in markers)
+    return count + sum(tail.count(marker) for marker in markers)
+
+
+def load_model(path, model_format):
+    """
+    Load a model from a decompressed file in the given format.
+
+    Returns the model and the validation notifications, a dictionary with
+    lists of warnings and errors.
+
+    Raises
+    ------
+    SBMLValidationError
+        If memote's SBML validation fails to produce a model.
+
+    """
+    if model_format == "json":
+        LOGGER.debug("Loading model from JSON using cobrapy.")
+        return load_json_model(path), {"warnings": [], "errors": []}
+    LOGGER.debug("Loading model from SBML using memote.")
+    model, sbml_ver, notifications = memote.validate_model(path)
+    if model is None:
+        LOGGER.info("SBML validation failure")
+        raise SBMLValidationError(
+            400,
+            notifications['warnings'],
+            notifications['errors'],
+            "The model failed SBML validation.",
+        )
+    return model, notifications
+
+
+def load_file(path, mimetype=None):
+    """
+    Load a model from a stored upload.
+
+    Returns the model and the validation notifications like ``load_model``.
+    """
+    model_format = detect_format(path.lower(), mimetype)
+    if model_format is None:
+        raise ValueError(f"Unhandled model format of file '{path}'.")
+    return load_model(path, model_format)
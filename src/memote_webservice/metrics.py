@@ -0,0 +1,204 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Expose Prometheus metrics of the web service and the workers.
+
+The web service serves its metrics on ``/metrics`` and every worker on the
+port ``WORKER_METRICS_PORT``. Both run several processes whose metrics are
+aggregated from files in ``PROMETHEUS_MULTIPROC_DIR`` (by default a temporary
+directory created by the process that forks the others). Celery replaces a
+pool process after every job; processes are identified by their slot in the
+pool rather than by their PID such that the number of files stays bounded
+while the values of a slot accumulate. The same holds for the pools that test
+modules in parallel within a pool process, whose slots are appended to the
+slot of their pool process.
+"""
+
+import atexit
+import logging
+import os
+import resource
+import shutil
+import tempfile
+import time
+
+from billiard.process import current_process
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest,
+    multiprocess, start_http_server, values)
+from prometheus_client.core import GaugeMetricFamily
+
+from memote_webservice import scheduling
+
+
+__all__ = ("init_app", "elapsed", "start_exporter", "peak_rss",
+           "remember_pool_process", "REQUEST_DURATION",
+           "SUBMIT_DURATION", "JOB_WAIT", "JOB_DURATION", "TEST_DURATION",
+           "PEAK_RSS", "RESULT_SIZE", "PARSE_CACHE")
+
+LOGGER = logging.getLogger(__name__)
+
+
+# The PID and identifier of the closest pool process among this process and
+# its ancestors.
+_pool_process = None
+
+
+def _process_identifier():
+    """Identify pool processes by their parent and slot, others by PID."""
+    index = getattr(current_process(), "index", None)
+    if index is None:
+        return str(os.getpid())
+    if _pool_process is not None and _pool_process[0] != os.getpid():
+        # The parent of a pool within a pool process is replaced after every
+        # job, too.
+        return f"{_pool_process[1]}-{index}"
+    return f"{os.getppid()}-{index}"
+
+
+def remember_pool_process():
+    """Let the pools of this pool process identify by its slot."""
+    global _pool_process
+    _pool_process = (os.getpid(), _process_identifier())
+
+
+def _remove(directory, pid):
+    """Remove a temporary directory when the process that created it exits."""
+    if os.getpid() == pid:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+DIRECTORY = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+if not DIRECTORY:
+    DIRECTORY = tempfile.mkdtemp(prefix="memote-metrics-")
+    atexit.register(_remove, DIRECTORY, os.getpid())
+# Processes forked from this one share the directory. prometheus_client 0.8
+# reads the lower case variable.
+os.environ["PROMETHEUS_MULTIPROC_DIR"] = DIRECTORY
+os.environ["prometheus_multiproc_dir"] = DIRECTORY
+values.ValueClass = values.MultiProcessValue(_process_identifier)
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+GIB = 2 ** 30
+
+REQUEST_DURATION = Histogram(
+    "memote_request_duration_seconds",
+    "Time to respond to a request per resource.",
+    ["resource", "method", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60,
+             5 * MINUTE))
+SUBMIT_DURATION = Histogram(
+    "memote_submit_duration_seconds",
+    "Time to receive, decompress, and parse or count a submitted model.",
+    ["step"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 5 * MINUTE))
+JOB_WAIT = Histogram(
+    "memote_job_wait_seconds",
+    "Time from routing a job to a queue until its first task started.",
+    ["queue"],
+    buckets=(1, 5, 15, 30, MINUTE, 5 * MINUTE, 15 * MINUTE, 30 * MINUTE, HOUR,
+             3 * HOUR, 12 * HOUR))
+JOB_DURATION = Histogram(
+    "memote_job_duration_seconds",
+    "Wall time of testing a model per size class of models.",
+    ["size"],
+    buckets=(5, 15, 30, MINUTE, 2 * MINUTE, 5 * MINUTE, 10 * MINUTE,
+             30 * MINUTE, HOUR, 2 * HOUR, 6 * HOUR))
+TEST_DURATION = Histogram(
+    "memote_test_duration_seconds",
+    "Duration of a memote test including all of its parameters.",
+    ["test"],
+    buckets=(0.001, 0.01, 0.1, 0.5, 1, 5, 10, 30, MINUTE, 5 * MINUTE,
+             30 * MINUTE))
+PEAK_RSS = Histogram(
+    "memote_task_peak_rss_bytes",
+    "Peak resident memory of the processes running a task.",
+    ["task"],
+    buckets=(GIB / 8, GIB / 4, GIB / 2, 0.75 * GIB, GIB, 1.5 * GIB, 2 * GIB,
+             3 * GIB, 4 * GIB, 8 * GIB))
+RESULT_SIZE = Histogram(
+    "memote_result_size_bytes",
+    "Size of the JSON results of jobs before compression.",
+    buckets=(2 ** 17, 2 ** 18, 2 ** 19, 2 ** 20, 2 ** 21, 2 ** 22, 2 ** 23,
+             2 ** 24, 2 ** 25, 2 ** 26, 2 ** 27))
+PARSE_CACHE = Counter(
+    "memote_parse_cache_total",
+    "Uploads loaded from the cache of parsed models or parsed anew.",
+    ["result"])
+
+
+class QueueCollector:
+    """Collect the number of jobs waiting in every queue when scraped."""
+
+    def collect(self):
+        depth = GaugeMetricFamily(
+            "memote_queue_depth", "Number of jobs waiting in a queue.",
+            labels=["queue"])
+        for queue, count in scheduling.depths().items():
+            depth.add_metric([queue], count)
+        yield depth
+
+
+def _registry():
+    """Return a registry of the metrics of all processes."""
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=DIRECTORY)
+    return registry
+
+
+def init_app(app):
+    """Time every request and serve the metrics of the web service."""
+    registry = _registry()
+    registry.register(QueueCollector())
+
+    @app.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def observe_request(response):
+        if "request_start" in g:
+            REQUEST_DURATION.labels(
+                request.endpoint or "unknown", request.method,
+                response.status_code,
+            ).observe(time.perf_counter() - g.request_start)
+        return response
+
+    def metrics():
+        return Response(generate_latest(registry),
+                        content_type=CONTENT_TYPE_LATEST)
+
+    app.add_url_rule("/metrics", view_func=metrics)
+
+
+def elapsed():
+    """Return the seconds since the current request started."""
+    return time.perf_counter() - g.request_start
+
+
+def start_exporter(port):
+    """Serve the metrics of a worker's processes on the given port."""
+    start_http_server(port, registry=_registry())
+    LOGGER.info(f"Serving worker metrics on port {port}.")
+
+
+def peak_rss():
+    """Return the peak resident memory in bytes of this process or a child."""
+    # The parallel test processes of a job are waited-for children.
+    return 1024 * max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                      resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
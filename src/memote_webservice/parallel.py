@@ -0,0 +1,156 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Run memote's test modules separately and merge their results.
+
+Every test module runs in its own pytest session, either in a process forked
+from the job process such that the model is inherited rather than pickled, or
+as a celery task of its own. The partial results are merged in the order in
+which a serial run would have produced them.
+"""
+
+import logging
+import os
+import time
+from glob import glob
+
+import memote
+from billiard import get_context
+from memote.suite import TEST_DIRECTORY
+
+
+__all__ = ("test_modules", "module_name", "module_path", "test_module",
+           "test_model", "merge")
+
+LOGGER = logging.getLogger(__name__)
+
+# Modules that dominate the run time on large models are scheduled first such
+# that they do not end up last on an otherwise idle pool.
+EXPENSIVE_MODULES = (
+    "test_consistency",
+    "test_biomass",
+    "test_essentiality",
+    "test_growth",
+    "test_matrix",
+)
+
+# The model is inherited by forked processes through this module attribute.
+_model = None
+
+
+def test_modules():
+    """Return the paths of memote's test modules in collection order."""
+    return sorted(glob(os.path.join(TEST_DIRECTORY, "test_*.py")))
+
+
+def module_name(path):
+    """Return the module name of a test module path."""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def module_path(name):
+    """Return the path of a test module by its name."""
+    return os.path.join(TEST_DIRECTORY, f"{name}.py")
+
+
+def _schedule(modules):
+    """Order modules such that the expensive ones start first."""
+    def rank(path):
+        name = module_name(path)
+        if name in EXPENSIVE_MODULES:
+            return EXPENSIVE_MODULES.index(name)
+        return len(EXPENSIVE_MODULES)
+    return sorted(modules, key=rank)
+
+
+def test_module(model, path, pytest_args, solver_timeout):
+    """
+    Run a single test module against the model.
+
+    Returns the result and the wall time in seconds.
+    """
+    start = time.perf_counter()
+    ignored = [
+        f"--ignore={other}" for other in test_modules() if other != path]
+    _, result = memote.test_model(
+        model, results=True, pytest_args=list(pytest_args) + ignored,
+        solver_timeout=solver_timeout)
+    return result, time.perf_counter() - start
+
+
+def _test_module(path, pytest_args, solver_timeout):
+    """Run a single test module against the inherited model."""
+    result, duration = test_module(_model, path, pytest_args, solver_timeout)
+    return path, result, duration
+
+
+def test_model(model, processes, pytest_args, solver_timeout):
+    """
+    Test a model running memote's test modules in parallel.
+
+    Parameters
+    ----------
+    model : cobra.Model
+        The metabolic model under investigation.
+    processes : int
+        The number of processes to run test modules in.
+    pytest_args : list
+        Arguments for every pytest session.
+    solver_timeout : int
+        Timeout in seconds to set on the mathematical optimization solver.
+
+    Returns
+    -------
+    memote.MemoteResult
+        The merged results of all test modules.
+    dict
+        The wall time in seconds per test module.
+
+    """
+    global _model
+    modules = test_modules()
+    _model = model
+    try:
+        # Every module gets a fresh process so that no state carries over
+        # between pytest sessions. Unlike `multiprocessing`, billiard allows
+        # the daemonic processes of celery's pool to have children.
+        with get_context("fork").Pool(processes, maxtasksperchild=1) as pool:
+            jobs = [
+                pool.apply_async(
+                    _test_module, (path, pytest_args, solver_timeout))
+                for path in _schedule(modules)
+            ]
+            outcomes = [job.get() for job in jobs]
+    finally:
+        _model = None
+    results = {path: result for path, result, _ in outcomes}
+    timings = {module_name(path): duration for path, _, duration in outcomes}
+    return merge([results[path] for path in modules]), timings
+
+
+def merge(results):
+    """
+    Merge the results of separate test modules into one result.
+
+    The results must be given in module collection order. The metadata of the
+    first result is kept.
+    """
+    merged = memote.MemoteResult()
+    merged.meta.update(results[0]["meta"])
+    for result in results:
+        merged.cases.update(result["tests"])
+    return merged
@@ -0,0 +1,161 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Provide a cache of parsed models keyed by the content of their uploads.
+
+Parsing an SBML upload runs libSBML's consistency checks before cobrapy builds
+the model and takes seconds for large models. Every task of a job, retries,
+and later submissions of the same file would repeat it. Instead, the first
+parse stores the model as zstd compressed cobrapy JSON together with the
+validation notifications, which loads several times faster.
+
+The key is a digest of the decompressed upload, its format, and the versions
+of the libraries that parse it. The cache is bounded by ``PARSE_CACHE_SIZE``,
+the total size of the serialized models in bytes before compression (default
+1 GiB, ``0`` disables the cache), and evicts the least recently used models
+first. Models are kept in the storage and their last use in redis.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from functools import lru_cache
+
+import cobra
+import libsbml
+import memote
+from cobra.io import model_from_dict, model_to_dict
+
+from memote_webservice import metrics, storage
+from memote_webservice.redis import redis_client
+
+
+__all__ = ("SIZE", "digest", "get", "put", "load")
+
+LOGGER = logging.getLogger(__name__)
+
+SIZE = int(os.environ.get("PARSE_CACHE_SIZE", 2 ** 30))
+# Keys of the cache ordered by their last use.
+INDEX_KEY = "memote:parsed"
+# The stored object and its size per key.
+ENTRY_KEY = "memote:parsed:{}"
+TOTAL_KEY = "memote:parsed:size"
+
+
+@lru_cache(maxsize=1)
+def _versions():
+    """Identify the software that parses and validates a model."""
+    return {
+        "memote": memote.__version__,
+        "cobra": cobra.__version__,
+        "libsbml": libsbml.getLibSBMLDottedVersion(),
+    }
+
+
+def digest(checksum, model_format):
+    """Compute the cache key from the hex digest of the decompressed upload."""
+    return hashlib.sha256(json.dumps(
+        [checksum, model_format, _versions()]).encode("utf-8")).hexdigest()
+
+
+def get(key):
+    """Return the cached model and notifications for a key or ``None``."""
+    name = redis_client.hget(ENTRY_KEY.format(key), "object")
+    if name is None:
+        return None
+    try:
+        content = json.loads(storage.load(name.decode()))
+    except KeyError:
+        # The retention sweep deleted the object before it was evicted.
+        LOGGER.warning(f"Parsed model '{key}' is missing from the storage.")
+        _remove(key)
+        return None
+    redis_client.zadd(INDEX_KEY, {key: time.time()}, xx=True)
+    model = model_from_dict(content["model"])
+    # cobrapy's JSON only has the objective coefficients.
+    model.objective_direction = content["direction"]
+    return model, content["notifications"]
+
+
+def put(key, model, notifications):
+    """Cache a parsed model and evict the least recently used ones."""
+    data = json.dumps({
+        "key": key,
+        "model": model_to_dict(model),
+        "direction": model.objective_direction,
+        "notifications": notifications,
+    }).encode("utf-8")
+    if len(data) > SIZE:
+        return
+    name = storage.save(storage.PARSED, data)
+    entry = ENTRY_KEY.format(key)
+    # A concurrent parse of the same upload may have cached it already.
+    if not redis_client.hsetnx(entry, "object", name):
+        return
+    with redis_client.pipeline() as pipe:
+        pipe.hset(entry, "size", len(data))
+        pipe.zadd(INDEX_KEY, {key: time.time()})
+        pipe.incrby(TOTAL_KEY, len(data))
+        _, _, total = pipe.execute()
+    while total > SIZE:
+        oldest = redis_client.zrange(INDEX_KEY, 0, 0)
+        if not oldest:
+            break
+        total = _remove(oldest[0].decode())
+
+
+def _remove(key):
+    """Evict a key and return the total size of the remaining models."""
+    # Only the process that removes the key from the index deletes its model.
+    if redis_client.zrem(INDEX_KEY, key):
+        entry = redis_client.hgetall(ENTRY_KEY.format(key))
+        redis_client.delete(ENTRY_KEY.format(key))
+        if entry:
+            storage.storage.delete(entry[b"object"].decode())
+            return redis_client.decrby(TOTAL_KEY, int(entry[b"size"]))
+    return int(redis_client.get(TOTAL_KEY) or 0)
+
+
+def load(checksum, model_format, parse):
+    """
+    Return the model and notifications of an upload from the cache.
+
+    Parameters
+    ----------
+    checksum : str
+        The SHA-256 hex digest of the decompressed upload.
+    model_format : str
+        The format of the upload, 'sbml' or 'json'.
+    parse : callable
+        Parses the upload on a cache miss and returns the model and the
+        notifications like ``loading.load_model``.
+
+    """
+    if SIZE <= 0:
+        return parse()
+    key = digest(checksum, model_format)
+    cached = get(key)
+    if cached is not None:
+        metrics.PARSE_CACHE.labels("hit").inc()
+        LOGGER.debug(f"Loaded parsed model '{key}' from the cache.")
+        return cached
+    metrics.PARSE_CACHE.labels("miss").inc()
+    model, notifications = parse()
+    put(key, model, notifications)
+    return model, notifications
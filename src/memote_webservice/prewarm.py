@@ -0,0 +1,58 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Pre-warm the main worker process.
+
+The prefork pool forks a fresh process for every job (see
+``worker_max_tasks_per_child`` in ``celery.py``) from the main worker
+process. Whatever that process has imported and initialized is inherited by
+the forked processes for free, whereas anything done in a forked process is
+lost after a single job. Pre-warming thus moves the fixed cost of every job,
+loading the solver interfaces and collecting memote's test suite, into the
+main process once while every job still starts from a clean state.
+"""
+
+import logging
+
+import cobra
+import memote
+import pytest
+from memote.suite import TEST_DIRECTORY
+
+
+__all__ = ("prewarm",)
+
+LOGGER = logging.getLogger(__name__)
+
+
+def prewarm():
+    """Import and initialize everything that a memote run needs."""
+    LOGGER.info("Pre-warming the worker process.")
+    # Creating a model imports the optlang interface of the default solver.
+    cobra.Model("prewarm")
+    memote.ReportConfiguration.load()
+    # Collecting the test suite imports (and assertion-rewrites) its modules
+    # without running any test against a model, which could leave state
+    # behind.
+    code = pytest.main([
+        "--collect-only",
+        "-p", "no:terminal",
+        "-p", "no:cacheprovider",
+        TEST_DIRECTORY,
+    ])
+    if code != 0:
+        LOGGER.warning(f"Collecting memote's test suite exited with {code}.")
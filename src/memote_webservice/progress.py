@@ -0,0 +1,158 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Report the progress of memote runs.
+
+This module is a pytest plugin, loaded with ``-p memote_webservice.progress``,
+that forwards the collection and completion of tests to the active
+``Progress``. Since that is a module attribute, processes forked to run test
+modules in parallel inherit it. Counters are kept with the job record such that
+all parts of a job add up to the same progress. Jobs whose test modules run as
+concurrent tasks estimate their ETA from the share of finished modules. When
+the soft time limit of a job expires during a test, the plugin stops the
+session instead of letting the remaining tests run into the hard time limit.
+
+PYTEST_DONT_REWRITE
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from celery.exceptions import SoftTimeLimitExceeded
+
+from memote_webservice import jobs
+
+
+__all__ = ("Progress", "reporting")
+
+LOGGER = logging.getLogger(__name__)
+
+# Strip the parameter from the name of a parametrized test like memote does.
+_PARAMETER = re.compile(r"\[[^\]]*\]$")
+
+# The progress that receives events of the running pytest session.
+_progress = None
+
+
+class Progress:
+    """Count the finished tests of a job and report them with an ETA."""
+
+    def __init__(self, job_id, update, expected, processes=1, predicted=None):
+        """
+        Start counting the progress of a job.
+
+        Parameters
+        ----------
+        job_id : str
+            The job whose tests are run.
+        update : callable
+            Receives a dictionary of tests done, total, the current test,
+            elapsed seconds, and the ETA in seconds after every test.
+        expected : dict
+            Expected duration in seconds of every test (see ``history``).
+        processes : int, optional
+            Number of processes among which the tests are distributed.
+        predicted : float, optional
+            The predicted runtime of the job in seconds from which the ETA is
+            estimated without expected test durations.
+
+        """
+        self._job_id = job_id
+        self._update = update
+        self._expected = expected
+        self._processes = processes
+        self._predicted = predicted
+        self._shares = {}
+        # Whether the session was stopped since the soft time limit expired.
+        self.stopped = False
+        self._started = jobs.setdefault(job_id, "started", time.time())
+
+    def collected(self, names):
+        """Add the collected tests to the total of the job."""
+        counts = Counter(_PARAMETER.sub("", name) for name in names)
+        # Parametrized tests share the expected duration of their test.
+        self._shares = {
+            name: self._expected.get(name, 0.0) / count
+            for name, count in counts.items()
+        }
+        jobs.increment(self._job_id, "tests_total", len(names))
+
+    def finished(self, name):
+        """Count a finished test and report the progress."""
+        name = _PARAMETER.sub("", name)
+        record = jobs.increment_many(
+            self._job_id, tests_done=1,
+            expected_done=self._shares.get(name, 0.0))
+        progress = {
+            "done": int(record["tests_done"]),
+            "total": int(record["tests_total"]),
+            "current": name,
+            "elapsed": time.time() - float(self._started),
+            "eta": None,
+        }
+        groups = int(record.get("groups_total", 0))
+        groups_done = int(record.get("groups_done", 0))
+        if groups and groups_done:
+            # The elapsed time covers modules that run at once, so the
+            # remaining modules take proportionally as long.
+            progress["eta"] = \
+                progress["elapsed"] * (groups - groups_done) / groups_done
+        elif self._expected and not groups:
+            remaining = sum(self._expected.values()) - \
+                float(record["expected_done"])
+            progress["eta"] = max(remaining, 0.0) / self._processes
+        elif self._predicted is not None:
+            progress["eta"] = max(self._predicted - progress["elapsed"], 0.0)
+        try:
+            self._update(progress)
+        except Exception as error:
+            # Progress must never break a memote run.
+            LOGGER.warning(f"Failed to report progress: {error}")
+
+
+@contextmanager
+def reporting(progress):
+    """Let the given progress receive the events of pytest sessions."""
+    global _progress
+    _progress = progress
+    try:
+        yield progress
+    finally:
+        _progress = None
+
+
+def pytest_collection_finish(session):
+    """Report the collected tests."""
+    if _progress is not None:
+        _progress.collected([item.location[2] for item in session.items])
+
+
+def pytest_runtest_logfinish(nodeid, location):
+    """Report a finished test."""
+    if _progress is not None:
+        _progress.finished(location[2])
+
+
+def pytest_exception_interact(node, call, report):
+    """Stop the session when the soft time limit of the job expired."""
+    if _progress is not None and \
+            call.excinfo.errisinstance(SoftTimeLimitExceeded):
+        _progress.stopped = True
+        node.session.shouldstop = "The soft time limit of the job expired."
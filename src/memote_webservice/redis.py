@@ -0,0 +1,39 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Instantiate the redis clients shared by the app and workers."""
+
+import os
+
+from redis import BlockingConnectionPool, Redis
+
+
+__all__ = ("redis_client", "pubsub_client")
+
+# A gevent worker serves many requests at once, each of which may take a
+# connection from the pool. The pool is bounded such that the connections to
+# redis do not grow with the number of concurrent requests; requests beyond
+# the limit wait up to the timeout in seconds for a free connection. Size it
+# together with gunicorn's `WORKER_CONNECTIONS`.
+MAX_CONNECTIONS = int(os.environ.get("REDIS_MAX_CONNECTIONS", 50))
+POOL_TIMEOUT = float(os.environ.get("REDIS_POOL_TIMEOUT", 10))
+
+redis_client = Redis(connection_pool=BlockingConnectionPool.from_url(
+    os.environ['REDIS_URL'], max_connections=MAX_CONNECTIONS,
+    timeout=POOL_TIMEOUT))
+# Subscriptions hold a connection for as long as a client follows a job and
+# thus do not take connections from the bounded pool.
+pubsub_client = Redis.from_url(os.environ['REDIS_URL'])
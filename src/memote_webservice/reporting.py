@@ -0,0 +1,382 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Render memote reports from stored task results."""
+
+import gzip
+import hashlib
+import json
+import logging
+from collections import namedtuple
+from datetime import datetime
+from numbers import Number
+
+import memote
+from celery import states
+from werkzeug.http import http_date
+
+from memote_webservice import jobs, metrics, storage
+from memote_webservice.celery import celery_app
+from memote_webservice.redis import redis_client
+
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+__all__ = ("RenderedReport", "StoredReport", "StoredResult", "store_report",
+           "store_parts", "load_parts", "load_summary", "load_report",
+           "load_result", "migrate", "deltas", "ENCODINGS", "rendered", "body")
+
+LOGGER = logging.getLogger(__name__)
+
+RENDERED_KEY = "memote:rendered:{}:{}"
+# Content encodings in which rendered reports are stored in order of
+# preference. Brotli is used when the optional package is installed.
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+# The maximum quality of 11 takes seconds on an HTML report for little gain.
+BROTLI_QUALITY = 9
+
+
+class RenderedReport(memote.Report):
+    """Provide the report interface for an already rendered JSON report."""
+
+    def __init__(self, json, report_type="snapshot", **kwargs):
+        """Wrap the JSON rendering of a report of the given type."""
+        super().__init__(result=None, configuration=None, **kwargs)
+        self._json = json
+        self._report_type = report_type
+
+    def render_json(self, pretty=False):
+        """Return the stored JSON rendering."""
+        return self._json
+
+
+# The result of a task that points to its JSON report in the storage as
+# stored before results were stored in parts (see ``StoredResult``).
+StoredReport = namedtuple("StoredReport", ["key"])
+# The result of a task that points to the parts of its report in the storage:
+# the complete JSON report, the summary of the meta data, the score, and the
+# tests per section, the test cases without the identifiers that they list and
+# the keys of those identifiers, and the name of the tested model, if stored.
+StoredResult = namedtuple("StoredResult", ["report", "summary", "tests",
+                                           "model"])
+
+
+def _sections(cards):
+    """Return the tests of every card of a report configuration."""
+    sections = {
+        section: card.get("cases", [])
+        for section, card in cards["scored"]["sections"].items()
+    }
+    sections.update(
+        (section, card.get("cases", []))
+        for section, card in cards.items() if section != "scored")
+    return sections
+
+
+def _save(value):
+    return storage.save(storage.RESULTS, json.dumps(value).encode("utf-8"))
+
+
+def store_parts(data, model=None):
+    """
+    Store a JSON report in parts and return the task result.
+
+    Parameters
+    ----------
+    data : bytes
+        The JSON rendering of a report.
+    model : str, optional
+        The name of the stored model that was tested.
+
+    Returns
+    -------
+    StoredResult
+        The keys of the stored parts.
+
+    """
+    result = json.loads(data)
+    cases = {}
+    keys = {}
+    for test, case in result["tests"].items():
+        case = dict(case)
+        # The identifiers listed by a test are what makes reports large.
+        keys[test] = storage.save(storage.DATA, json.dumps(
+            case.pop("data", None)).encode("utf-8"))
+        cases[test] = case
+    return StoredResult(
+        report=storage.save(storage.RESULTS, data),
+        summary=_save({
+            "meta": result["meta"],
+            "score": result.get("score"),
+            "sections": _sections(result["cards"]),
+            "tests": list(result["tests"]),
+        }),
+        tests=_save({"cases": cases, "data": keys}),
+        model=model,
+    )
+
+
+def store_report(report, model=None):
+    """Store a report in parts and return the task result."""
+    data = report.render_json().encode("utf-8")
+    metrics.RESULT_SIZE.observe(len(data))
+    return store_parts(data, model)
+
+
+def load_parts(value):
+    """
+    Return the stored parts of any of the result types stored by tasks.
+
+    Results of earlier versions are stored in parts anew on every call until
+    they are migrated (see ``tasks.migrate_results``).
+    """
+    if isinstance(value, StoredResult):
+        return value
+    return store_parts(load_report(value).render_json().encode("utf-8"))
+
+
+def load_summary(value):
+    """Return the summary part of a result and its storage key."""
+    key = load_parts(value).summary
+    return json.loads(storage.load(key)), key
+
+
+def load_report(value):
+    """Return a report from any of the result types stored by tasks."""
+    if isinstance(value, StoredResult):
+        return RenderedReport(storage.load(value.report).decode("utf-8"))
+    if isinstance(value, StoredReport):
+        return RenderedReport(storage.load(value.key).decode("utf-8"))
+    if isinstance(value, bytes):
+        # Compressed JSON reports kept in the result backend before reports
+        # were stored (see ``store_report``).
+        return RenderedReport(gzip.decompress(value).decode("utf-8"))
+    try:
+        _, report = value
+    except TypeError:
+        # Expected for results generated before the result type changed.
+        # When those results expire (about 2 weeks from 2019-03-27
+        # assuming this commit is deployed today), this handler can be
+        # removed.
+        report = value
+    return report
+
+
+def load_result(value):
+    """Return the test results from any of the result types stored by tasks."""
+    return memote.MemoteResult(json.loads(load_report(value).render_json()))
+
+
+def _earlier(value):
+    """Return whether a task result is a report not stored in parts."""
+    if isinstance(value, StoredResult):
+        return False
+    if isinstance(value, tuple) and len(value) == 2:
+        # A pickled (model, report) tuple.
+        value = value[1]
+    return isinstance(value, (StoredReport, bytes, memote.Report))
+
+
+def migrate():
+    """
+    Store the reports of earlier versions in the result backend in parts.
+
+    Every result is rewritten in place keeping its date and expiry. Results of
+    tasks other than reports, e.g., of validations, are left alone.
+
+    Returns
+    -------
+    int
+        The number of migrated results.
+
+    """
+    migrated = 0
+    for key in redis_client.scan_iter(match=jobs.task_key("*"), count=1000):
+        value, ttl = redis_client.pipeline().get(key).pttl(key).execute()
+        if value is None:
+            continue
+        meta = jobs.decode_meta(value)
+        if meta["status"] != states.SUCCESS or not _earlier(meta["result"]):
+            continue
+        meta["result"] = load_parts(meta["result"])
+        # `SET ... KEEPTTL` requires redis 6, so the remaining time to live
+        # is set explicitly. A negative one means that the key has none.
+        redis_client.set(key, celery_app.backend.encode(meta), xx=True,
+                         px=ttl if ttl > 0 else None)
+        migrated += 1
+    LOGGER.info(f"Stored {migrated} results of earlier versions in parts.")
+    return migrated
+
+
+def _pair(first, second):
+    """Compare two values and their difference where it is defined."""
+    numbers = all(isinstance(value, Number) and not isinstance(value, bool)
+                  for value in (first, second))
+    return {
+        "a": first,
+        "b": second,
+        "delta": second - first if numbers else None,
+    }
+
+
+def _score(metric):
+    """Return the unweighted score of a (parametrized) test metric."""
+    if isinstance(metric, dict):
+        if not metric:
+            return None
+        return sum(1.0 - value for value in metric.values()) / len(metric)
+    return None if metric is None else 1.0 - metric
+
+
+def deltas(result, first, second):
+    """
+    Compare two models test by test in the result of a memote diff report.
+
+    Parameters
+    ----------
+    result : dict
+        The result of a ``memote.DiffReport`` of exactly two models.
+    first, second : str
+        The names of the models in the diff report.
+
+    Returns
+    -------
+    dict
+        The total and section scores and every test's result, metric, and
+        unweighted score of both models (``a`` and ``b``) and the delta from
+        the first to the second. Tests whose result or metric differ are listed
+        as ``changed``.
+
+    """
+    def side(entries):
+        entries = {entry["model"]: entry for entry in entries}
+        return entries.get(first, {}), entries.get(second, {})
+
+    scores = result["score"]
+    a, b = side(scores["total_score"]["diff"])
+    sections = {}
+    for section in scores["sections"]["diff"]:
+        sections.setdefault(section["section"], []).append(section)
+    comparison = {
+        "score": {
+            "total": _pair(a.get("total_score"), b.get("total_score")),
+            "sections": {
+                section: _pair(*(entry.get("score")
+                                 for entry in side(entries)))
+                for section, entries in sections.items()
+            },
+        },
+        "tests": {},
+        "changed": [],
+    }
+    for test, case in sorted(result["tests"].items()):
+        diff = case["diff"]
+        if isinstance(diff, dict):
+            # Parametrized tests have a result and metric per parameter.
+            sides = {param: side(entries) for param, entries in diff.items()}
+            metrics, results = (
+                tuple({param: pair[i][field] for param, pair in sides.items()
+                       if field in pair[i]} for i in (0, 1))
+                for field in ("metric", "result")
+            )
+            metric = {param: _pair(a.get("metric"), b.get("metric"))
+                      for param, (a, b) in sides.items()}
+            outcome = {param: _pair(a.get("result"), b.get("result"))
+                       for param, (a, b) in sides.items()}
+        else:
+            a, b = side(diff)
+            metrics = (a.get("metric"), b.get("metric"))
+            results = (a.get("result"), b.get("result"))
+            metric = _pair(*metrics)
+            outcome = _pair(*results)
+        comparison["tests"][test] = {
+            "title": case["title"],
+            "result": outcome,
+            "metric": metric,
+            "score": _pair(*(_score(value) for value in metrics)),
+        }
+        if metrics[0] != metrics[1] or results[0] != results[1]:
+            comparison["changed"].append(test)
+    return comparison
+
+
+def _compress(body, encoding):
+    """Compress a rendered report with the given content encoding."""
+    if encoding == "br":
+        return brotli.compress(
+            body, mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY)
+    return gzip.compress(body)
+
+
+def rendered(name, mime_type, render, date_done=None):
+    """
+    Return a report rendering that is stored compressed once per task.
+
+    Parameters
+    ----------
+    name : str
+        The task whose result is rendered or another unique name of the
+        rendering, e.g., of a comparison of several results.
+    mime_type : str
+        The format of the rendering.
+    render : callable
+        Return the rendering as a string when it is not stored yet.
+    date_done : datetime.datetime, optional
+        When the result was produced, for the ``Last-Modified`` header.
+
+    Returns
+    -------
+    dict
+        The storage key of the compressed body per content encoding (see
+        ``body``), the strong entity tag of the uncompressed rendering
+        (``etag``), and the HTTP date of its last modification
+        (``last_modified``), all as bytes.
+
+    """
+    key = RENDERED_KEY.format(name, mime_type)
+    stored = redis_client.hgetall(key)
+    if stored:
+        return {field.decode(): value for field, value in stored.items()}
+    body = render().encode("utf-8")
+    if not isinstance(date_done, datetime):
+        date_done = datetime.utcnow()
+    rendering = {
+        "etag": hashlib.sha256(body).hexdigest().encode(),
+        "last_modified": http_date(date_done).encode(),
+    }
+    for encoding in ENCODINGS:
+        rendering[encoding] = storage.save(
+            storage.RENDERINGS, _compress(body, encoding),
+            compress=False).encode()
+    with redis_client.pipeline() as pipe:
+        pipe.hset(key, mapping=rendering)
+        pipe.expire(key, celery_app.conf.result_expires)
+        pipe.execute()
+    return rendering
+
+
+def body(rendering, encoding):
+    """Return the body of a rendering in the given content encoding."""
+    value = rendering[encoding]
+    if not value.startswith(storage.RENDERINGS.encode()):
+        # Renderings stored before the storage was introduced hold the body
+        # itself. They expire with their results.
+        return value
+    return storage.load(value.decode(), decompress=False)
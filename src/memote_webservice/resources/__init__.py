@@ -17,9 +17,14 @@
 
 from flask_apispec.extension import FlaskApiSpec
 
+from memote_webservice.resources.batch import Batch, BatchStatus
+from memote_webservice.resources.diff import Diff
+from memote_webservice.resources.estimates import Estimates
+from memote_webservice.resources.events import Events
 from memote_webservice.resources.report import Report
-from memote_webservice.resources.status import Status
+from memote_webservice.resources.status import Status, Statuses
 from memote_webservice.resources.submit import Submit
+from memote_webservice.resources.summary import Summaries, Summary
 
 
 def init_app(app):
@@ -30,5 +35,13 @@ def init_app(app):
 
     docs = FlaskApiSpec(app)
     register('/submit', Submit)
+    register('/status', Statuses)
     register('/status/<string:uuid>', Status)
+    register('/status/<string:uuid>/events', Events)
     register('/report/<string:uuid>', Report)
+    register('/summary', Summaries)
+    register('/summary/<string:uuid>', Summary)
+    register('/batch', Batch)
+    register('/batch/<string:uuid>', BatchStatus)
+    register('/estimates', Estimates)
+    register('/diff/<string:uuid_a>/<string:uuid_b>', Diff)
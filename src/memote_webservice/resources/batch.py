@@ -0,0 +1,179 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Provide resources to submit many models at once and follow them."""
+
+import logging
+import os
+import posixpath
+import tarfile
+import zipfile
+from collections import Counter
+from uuid import uuid4
+
+from celery import states
+from flask import abort, current_app
+from flask_apispec import MethodResource, doc, marshal_with, use_kwargs
+from werkzeug.utils import secure_filename
+
+from memote_webservice import batches, jobs, loading
+from memote_webservice.exceptions import DecompressionLimitError
+from memote_webservice.resources.submit import Submission
+from memote_webservice.schemas import (
+    BatchRequest, BatchResponse, BatchStatusResponse)
+
+
+__all__ = ("Batch", "BatchStatus")
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Batch(Submission, MethodResource):
+    """Submit many metabolic models for testing at once."""
+
+    @doc(description="Submit every model in the uploaded files for testing by "
+                     "memote. Files may be models or tar or zip archives of "
+                     "models. Models are validated by the workers and files "
+                     "that cannot be submitted are reported without failing "
+                     "the batch.")
+    @use_kwargs(BatchRequest, locations=('files',))
+    @marshal_with(BatchResponse, code=202)
+    def post(self, models):
+        limit = current_app.config["BATCH_MAX_MODELS"]
+        entries = []
+        excess = None
+        try:
+            for file_storage in models:
+                excess = self._unpack(file_storage, entries, limit)
+                if excess is not None:
+                    break
+        finally:
+            # Files beyond the limit are not even unpacked.
+            for file_storage in models:
+                file_storage.close()
+        if excess is not None:
+            entries.append({
+                "name": excess,
+                "error": f"The batch exceeds the limit of {limit} models.",
+            })
+        batch_id = str(uuid4())
+        batches.register(batch_id, entries)
+        LOGGER.info(f"Batch ID {batch_id} was queued with {len(entries)} "
+                    f"files.")
+        return {"uuid": batch_id, "models": entries}, 202
+
+    def _unpack(self, file_storage, entries, limit):
+        """
+        Submit the models in an uploaded file and add an entry for each.
+
+        Returns the name of the first model beyond the limit, if any.
+        """
+        if len(entries) >= limit:
+            return file_storage.filename
+        try:
+            for name, stream in loading.unpack(
+                    file_storage.filename, file_storage.stream):
+                if len(entries) >= limit:
+                    return name
+                entries.append(self._submit_file(name, stream))
+        except (tarfile.TarError, zipfile.BadZipFile,
+                *loading.DECOMPRESSION_ERRORS) as err:
+            LOGGER.warning(f"Failed to unpack '{file_storage.filename}': "
+                           f"{str(err)}")
+            entries.append({
+                "name": file_storage.filename,
+                "error": f"Failed to unpack file: {str(err)}",
+            })
+        return None
+
+    def _submit_file(self, name, stream):
+        """Store and submit a single model file of a batch."""
+        filename = loading.decompressed_name(posixpath.basename(name))
+        model_format = loading.detect_format(filename.lower(), None)
+        if model_format is None:
+            return {"name": name, "error": "Unhandled model format."}
+        path = os.path.join(current_app.config["MODEL_DIRECTORY"],
+                            f"{str(uuid4())}_{secure_filename(filename)}")
+        try:
+            checksum = loading.store(
+                name.lower(), stream, path,
+                current_app.config["MAX_DECOMPRESSED_LENGTH"])
+        except (*loading.DECOMPRESSION_ERRORS,
+                DecompressionLimitError) as err:
+            return {"name": name,
+                    "error": f"Failed to decompress file: {str(err)}"}
+        try:
+            job_id = self._cached(checksum, path)
+            if job_id is None:
+                # Validating every model in the workers keeps the web workers
+                # from loading them one by one.
+                job_id = str(uuid4())
+                upload = self._save(path, checksum)
+                routing = self._route(
+                    job_id, loading.count_entities(path, model_format),
+                    bulk=True)
+                with self._sending(job_id):
+                    self._submit_deferred(job_id, upload, None, routing)
+                self._remember(checksum, job_id)
+        finally:
+            os.remove(path)
+        return {"name": name, "uuid": job_id}
+
+
+class BatchStatus(MethodResource):
+    """Summarize the state of all jobs of a batch."""
+
+    @doc(description="Return the aggregate state of a batch and a summary of "
+                     "every submitted file.")
+    @marshal_with(BatchStatusResponse, code=200)
+    @marshal_with(None, code=404)
+    def get(self, uuid):
+        entries = batches.get(uuid)
+        if entries is None:
+            abort(404, f"Batch {uuid} does not exist or has expired.")
+        job_ids = [entry["uuid"] for entry in entries if "uuid" in entry]
+        resolved = jobs.resolve_many(job_ids)
+        metas = jobs.task_metas([task_id for task_id, _ in resolved])
+        summaries = {
+            job_id: self._summary(record, meta)
+            for job_id, (_, record), meta in zip(job_ids, resolved, metas)
+        }
+        models = []
+        for entry in entries:
+            if "uuid" in entry:
+                models.append({"name": entry["name"], "uuid": entry["uuid"],
+                               **summaries[entry["uuid"]]})
+            else:
+                models.append({"name": entry["name"], "status": "REJECTED",
+                               "finished": True, "error": entry["error"]})
+        return {
+            "total": len(models),
+            "finished": sum(model["finished"] for model in models),
+            "counts": Counter(model["status"] for model in models),
+            "models": models,
+        }
+
+    @staticmethod
+    def _summary(record, meta):
+        """Summarize the state of a single job."""
+        summary = {
+            "status": meta["status"],
+            "finished": meta["status"] in states.READY_STATES,
+            "cached": "cached" in record,
+        }
+        if meta["status"] == states.FAILURE:
+            summary["error"] = type(meta["result"]).__name__
+        return summary
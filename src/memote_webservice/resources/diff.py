@@ -0,0 +1,87 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Provide a resource for comparing the test results of two jobs."""
+
+import json
+import logging
+
+import memote
+from celery.result import AsyncResult
+from flask import abort
+from flask_apispec import MethodResource, doc, marshal_with
+
+from memote_webservice import jobs
+from memote_webservice.celery import celery_app
+from memote_webservice.reporting import deltas, load_result, rendered
+from memote_webservice.resources.report import (
+    accepted_mime_type, send_rendering)
+
+
+__all__ = ("Diff",)
+
+LOGGER = logging.getLogger(__name__)
+
+DIFF_NAME = "diff:{}:{}"
+
+
+class Diff(MethodResource):
+    """Compare the results of two jobs without testing anything again."""
+
+    @doc(description="Compare the reports of two finished jobs test by test. "
+                     "Return the score, metric, and result deltas as JSON or "
+                     "memote's side by side diff report as HTML based on "
+                     "Accept headers.")
+    @marshal_with(None, code=200)
+    @marshal_with(None, code=304)
+    @marshal_with(None, code=400)
+    @marshal_with(None, code=404)
+    def get(self, uuid_a, uuid_b):
+        if uuid_a == uuid_b:
+            abort(400, "A job can only be compared to another job.")
+        results = []
+        for uuid, (task_id, _) in zip(
+                (uuid_a, uuid_b), jobs.resolve_many([uuid_a, uuid_b])):
+            result = AsyncResult(id=task_id, app=celery_app)
+            if not result.successful():
+                msg = f"Job '{uuid}' has no report ({result.state})."
+                LOGGER.info(msg)
+                abort(404, msg)
+            results.append((task_id, result))
+        mime_type = accepted_mime_type()
+        (task_a, result_a), (task_b, result_b) = results
+
+        def render():
+            # Only the stored results are compared; no model is loaded.
+            report = memote.DiffReport(
+                {uuid_a: load_result(result_a.get()),
+                 uuid_b: load_result(result_b.get())},
+                memote.ReportConfiguration.load())
+            if mime_type == 'text/html':
+                return report.render_html()
+            return json.dumps({
+                "a": uuid_a,
+                "b": uuid_b,
+                **deltas(report.result, uuid_a, uuid_b),
+            })
+
+        # Comparisons are stored per pair of tasks like reports per task.
+        date_done = max(
+            filter(None, (result_a.date_done, result_b.date_done)),
+            default=None)
+        return send_rendering(
+            rendered(DIFF_NAME.format(task_a, task_b), mime_type, render,
+                     date_done),
+            mime_type)
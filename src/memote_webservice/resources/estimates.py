@@ -0,0 +1,40 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Provide a resource for checking runtime estimates."""
+
+import logging
+
+from flask_apispec import MethodResource, doc, marshal_with
+
+from memote_webservice import estimates
+from memote_webservice.schemas import EstimatesResponse
+
+
+__all__ = ("Estimates",)
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Estimates(MethodResource):
+    """Compare predicted and actual runtimes of finished jobs."""
+
+    @doc(description="Return the predicted and actual runtimes of the latest "
+                     "finished jobs and how well they agree per size class.")
+    @marshal_with(EstimatesResponse, code=200)
+    def get(self):
+        entries = estimates.comparisons()
+        return {"summary": estimates.summarize(entries), "jobs": entries}
@@ -0,0 +1,69 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Provide a resource for following the state of a job."""
+
+import json
+import logging
+
+from flask import Response, current_app, stream_with_context
+from flask_apispec import MethodResource, doc, use_kwargs
+
+from memote_webservice import events, jobs
+from memote_webservice.resources.status import status
+from memote_webservice.schemas import EventsRequest
+
+
+__all__ = ("Events",)
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Events(MethodResource):
+    """Push the state transitions of a job instead of polling its status."""
+
+    @doc(description="Stream the current and all following states of a job as "
+                     "server-sent events until it is finished or the timeout "
+                     "expired. The first event has the format of the status; "
+                     "later ones only carry the status, whether the job is "
+                     "finished, and any progress information. Clients such as "
+                     "an `EventSource` simply reconnect after a timeout.",
+         produces=["text/event-stream"])
+    @use_kwargs(EventsRequest, locations=("query",))
+    def get(self, uuid, timeout=None):
+        task_id, record = jobs.resolve(uuid)
+        limit = current_app.config["EVENTS_TIMEOUT"]
+        timeout = limit if timeout is None else min(timeout, limit)
+        stream = events.follow(
+            task_id, lambda: status(task_id, record), timeout,
+            current_app.config["EVENTS_HEARTBEAT"])
+        return Response(
+            stream_with_context(self._format(stream)),
+            mimetype="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache",
+                # Prevent nginx from buffering the stream.
+                "X-Accel-Buffering": "no",
+            })
+
+    @staticmethod
+    def _format(stream):
+        """Format events as server-sent events and heartbeats as comments."""
+        for event in stream:
+            if event is None:
+                yield ":\n\n"
+            else:
+                yield f"event: status\ndata: {json.dumps(event)}\n\n"
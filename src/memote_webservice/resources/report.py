@@ -15,16 +15,23 @@
 
 """Provide a resource for retrieving test results."""
 
+import gzip
 import logging
+from datetime import datetime
 
 from celery.result import AsyncResult
-from flask import jsonify, make_response, render_template, request
-from flask_apispec import MethodResource, doc, marshal_with
+from flask import (
+    abort, current_app, jsonify, make_response, render_template, request)
+from flask_apispec import MethodResource, doc, marshal_with, use_kwargs
 
+from memote_webservice import indexing, jobs
 from memote_webservice.celery import celery_app
+from memote_webservice.reporting import (
+    ENCODINGS, body, load_parts, load_report, load_summary, rendered)
+from memote_webservice.schemas import ReportRequest
 
 
-__all__ = ("Report",)
+__all__ = ("Report", "accepted_mime_type", "send_rendering")
 
 LOGGER = logging.getLogger(__name__)
 
@@ -33,11 +40,29 @@ class Report(MethodResource):
     """Provide endpoints for metabolic model testing."""
 
     @doc(description="Return a snapshot report as JSON or HTML based on Accept "
-                     "headers.")
+                     "headers. Reports are compressed according to "
+                     "Accept-Encoding and support conditional requests. "
+                     "Selecting tests, sections, fields, or a page instead "
+                     "returns only the meta data, the score, and the selected "
+                     "parts of the report as JSON. A summary returns only the "
+                     "meta data, the score, and the tests per section.")
+    @use_kwargs(ReportRequest, locations=("query",))
     @marshal_with(None, code=200)
+    @marshal_with(None, code=304)
+    @marshal_with(None, code=400)
     @marshal_with(None, code=404)
-    def get(self, uuid):
-        result = AsyncResult(id=uuid, app=celery_app)
+    def get(self, uuid, summary=False, **selection):
+        task_id, record = jobs.resolve(uuid)
+        response = self._respond(
+            uuid, task_id, AsyncResult(id=task_id, app=celery_app), selection,
+            summary)
+        if "cached" in record:
+            response.headers["X-Memote-Cache"] = "hit"
+            response.headers["X-Memote-Source"] = task_id
+        return response
+
+    @staticmethod
+    def _respond(uuid, task_id, result, selection=None, summary=False):
         if not result.ready():
             LOGGER.info(f"Result {uuid} is pending; assuming it is expired.")
             return make_response(render_template('404.html'), 404)
@@ -48,23 +73,76 @@ class Report(MethodResource):
                 'exception': type(exception).__name__,
                 'message': str(exception),
             })
+        elif summary:
+            return Report._summary(result)
+        elif selection:
+            return Report._select(task_id, result, **selection)
         else:
-            try:
-                _, report = result.get()
-            except TypeError:
-                # Expected for results generated before the result type changed.
-                # When those results expire (about 2 weeks from 2019-03-27
-                # assuming this commit is deployed today), this handler can be
-                # removed.
-                report = result.get()
-
-            mime_type = request.accept_mimetypes.best_match([
-                'text/html',
-                'application/json',
-            ])
-            if mime_type == 'text/html':
-                LOGGER.debug("Rendering HTML report based on mime type.")
-                return make_response(report.render_html())
-            else:
-                LOGGER.debug("Rendering JSON report based on mime type.")
-                return make_response(report.render_json())
+            mime_type = accepted_mime_type()
+
+            def render():
+                report = load_report(result.get())
+                if mime_type == 'text/html':
+                    LOGGER.debug("Rendering HTML report based on mime type.")
+                    return report.render_html()
+                else:
+                    LOGGER.debug("Rendering JSON report based on mime type.")
+                    return report.render_json()
+
+            return send_rendering(
+                rendered(task_id, mime_type, render, result.date_done),
+                mime_type)
+
+    @staticmethod
+    def _summary(result):
+        """Return the summary part of a result."""
+        summary, key = load_summary(result.get())
+        response = jsonify(summary)
+        # Stored parts are named by the digest of their content.
+        response.set_etag(key.rsplit("/", 1)[-1])
+        if isinstance(result.date_done, datetime):
+            response.last_modified = result.date_done
+        return response.make_conditional(request)
+
+    @staticmethod
+    def _select(task_id, result, tests=None, sections=None, include=None,
+                page=1, per_page=None):
+        """Return the selected parts of a report from its indexed result."""
+        limit = current_app.config["REPORT_PAGE_SIZE"]
+        per_page = limit if per_page is None else min(per_page, limit)
+        try:
+            return jsonify(indexing.select(
+                task_id, lambda: load_parts(result.get()), tests, sections,
+                include, page, per_page))
+        except indexing.UnknownSelection as error:
+            msg = f"The report has no tests or sections {error}."
+            LOGGER.info(msg)
+            abort(400, msg)
+
+
+def accepted_mime_type():
+    """Return the accepted report format, HTML or else JSON."""
+    mime_type = request.accept_mimetypes.best_match([
+        'text/html',
+        'application/json',
+    ])
+    if mime_type != 'text/html':
+        mime_type = 'application/json'
+    return mime_type
+
+
+def send_rendering(rendering, mime_type):
+    """Send a stored rendering in the best accepted content encoding."""
+    encoding = request.accept_encodings.best_match(ENCODINGS)
+    if encoding is None:
+        response = make_response(gzip.decompress(body(rendering, "gzip")))
+        response.set_etag(rendering["etag"].decode())
+    else:
+        response = make_response(body(rendering, encoding))
+        response.headers["Content-Encoding"] = encoding
+        # Differently encoded bodies need different strong entity tags.
+        response.set_etag(f"{rendering['etag'].decode()}-{encoding}")
+    response.mimetype = mime_type
+    response.headers["Last-Modified"] = rendering["last_modified"].decode()
+    response.vary.update(("Accept", "Accept-Encoding"))
+    return response.make_conditional(request)
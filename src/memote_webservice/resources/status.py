@@ -15,16 +15,20 @@
 
 """Provide a resource for retrieving test results."""
 
+import json
 import logging
 
-from celery.result import AsyncResult
-from flask_apispec import MethodResource, doc, marshal_with
+from celery import states
+from flask import abort, current_app
+from flask_apispec import MethodResource, doc, marshal_with, use_kwargs
 
-from memote_webservice.celery import celery_app
-from memote_webservice.schemas import StatusResponse
+from memote_webservice import events, jobs, scheduling
+from memote_webservice.exceptions import SBMLValidationError
+from memote_webservice.schemas import (
+    StatusesRequest, StatusesResponse, StatusResponse)
 
 
-__all__ = ("Status",)
+__all__ = ("Status", "Statuses", "status", "statuses", "describe")
 
 LOGGER = logging.getLogger(__name__)
 
@@ -35,8 +39,119 @@ class Status(MethodResource):
     @doc(description="Return queue information about a task.")
     @marshal_with(StatusResponse, code=200)
     def get(self, uuid):
-        result = AsyncResult(id=uuid, app=celery_app)
-        return {
-            "finished": result.ready(),
-            "status": result.state,
+        return status(*jobs.resolve(uuid))
+
+
+class Statuses(MethodResource):
+    """Query the queue for the status of many results at once."""
+
+    @doc(description="Return queue information about many tasks at once, "
+                     "e.g., for a dashboard, instead of one request per task.")
+    @use_kwargs(StatusesRequest, locations=("json",))
+    @marshal_with(StatusesResponse, code=200)
+    @marshal_with(None, code=400)
+    def post(self, uuids):
+        limit = current_app.config["STATUS_MAX_JOBS"]
+        if len(uuids) > limit:
+            abort(400, f"At most {limit} jobs can be queried at once.")
+        return {"jobs": [{"uuid": uuid, **response}
+                         for uuid, response in zip(uuids, statuses(uuids))]}
+
+
+def status(task_id, record):
+    """Describe the current state of a job from its task and record."""
+    task_ids = [task_id]
+    if "validation" in record:
+        task_ids.append(record["validation"])
+    # The states of the job's task and its validation are read at once.
+    metas = jobs.task_metas(task_ids)
+    return describe(task_id, record, *metas,
+                    position=scheduling.position(task_id, record))
+
+
+def statuses(job_ids):
+    """
+    Describe the current state of many jobs like ``status``.
+
+    Regardless of the number of jobs, their records, the states of their tasks,
+    and their queue positions are read in three round trips.
+    """
+    resolved = jobs.resolve_many(job_ids)
+    validations = [record["validation"] for _, record in resolved
+                   if "validation" in record]
+    metas = jobs.task_metas(
+        [task_id for task_id, _ in resolved] + validations)
+    validation_metas = dict(zip(validations, metas[len(resolved):]))
+    return [
+        describe(task_id, record, meta,
+                 validation_metas.get(record.get("validation")), position)
+        for (task_id, record), meta, position in zip(
+            resolved, metas, scheduling.positions(resolved))
+    ]
+
+
+def describe(task_id, record, meta, validation=None, position=None):
+    """
+    Describe the current state of a job from its task's state and record.
+
+    Parameters
+    ----------
+    task_id : str
+        The ID of the task implementing the job.
+    record : dict
+        The job record.
+    meta : dict
+        The stored state and result of the task.
+    validation : dict, optional
+        The stored state and result of the job's validation task if any.
+    position : int, optional
+        The position of the job in its queue while it is waiting.
+
+    """
+    state = meta["status"]
+    response = {
+        "finished": state in states.READY_STATES,
+        "status": state,
+        "cached": "cached" in record,
+    }
+    if "cached" in record:
+        response["source"] = task_id
+    if "parent" in record:
+        response["parent"] = record["parent"]
+    if "queue" in record:
+        response["queue"] = {
+            "name": record["queue"],
+            "priority": int(record["priority"]),
+            "position": position,
         }
+    if "predicted" in record:
+        response["estimate"] = {
+            "predicted": float(record["predicted"]),
+            "soft_time_limit": int(record["soft_time_limit"]),
+            "time_limit": int(record["time_limit"]),
+            "solver_timeout": int(record["solver_timeout"]),
+        }
+    if state == events.PROGRESS:
+        response["progress"] = meta["result"]
+    if "groups_total" in record:
+        response["groups"] = {
+            "done": int(record["groups_done"]),
+            "total": int(record["groups_total"]),
+        }
+    if "timings" in record:
+        response["timings"] = json.loads(record["timings"])
+    if validation is not None:
+        response["validation"] = _validation(validation)
+    return response
+
+
+def _validation(meta):
+    """Summarize the state and notifications of a validation task."""
+    validation = {"status": meta["status"]}
+    if meta["status"] == states.SUCCESS:
+        validation.update(meta["result"])
+    elif meta["status"] == states.FAILURE and \
+            isinstance(meta["result"], SBMLValidationError):
+        validation["warnings"] = meta["result"].warnings
+        validation["errors"] = meta["result"].errors
+    return validation
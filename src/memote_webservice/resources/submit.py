@@ -15,132 +15,267 @@
 
 """Provide a resource to submit models for testing."""
 
+import itertools
 import logging
-import tempfile
-from bz2 import BZ2File
-from gzip import GzipFile
-from io import BytesIO
-from itertools import chain
+import os
+from contextlib import contextmanager
 from uuid import uuid4
 
-import memote
-from cobra.io import load_json_model
+from celery import chain, chord
 from cobra.io.sbml import CobraSBMLError
-from flask import abort
+from flask import abort, current_app, request
 from flask_apispec import MethodResource, doc, marshal_with, use_kwargs
 from werkzeug.utils import secure_filename
 
-from memote_webservice.exceptions import SBMLValidationError
+from memote_webservice import (
+    cache, estimates, history, interchange, jobs, loading, metrics, parallel,
+    parsing, scheduling, storage)
+from memote_webservice.exceptions import DecompressionLimitError
 from memote_webservice.schemas import SubmitRequest, SubmitResponse
-from memote_webservice.tasks import model_snapshot
+from memote_webservice.tasks import (
+    assemble_snapshot, model_snapshot, module_snapshot, upload_snapshot,
+    validate_upload)
 
 
-__all__ = ("Submit",)
+__all__ = ("Submission", "Submit")
 
 LOGGER = logging.getLogger(__name__)
 
 
-class Submit(MethodResource):
+class Submission:
+    """Provide the submission of stored models shared by resources."""
+
+    def _cached(self, checksum, path):
+        """Return a new job answered from the result cache if possible."""
+        if current_app.config["RESULT_CACHE_EXPIRES"] <= 0:
+            return None
+        task_id = cache.lookup(cache.digest(checksum))
+        if task_id is None:
+            return None
+        job_id = str(uuid4())
+        jobs.register(job_id, task=task_id, cached=1)
+        LOGGER.info(f"Job ID {job_id} was answered from the result cache by "
+                    f"job {task_id} for model file: {path}")
+        return job_id
+
+    def _save(self, path, checksum):
+        """Store an upload and return the name by which tasks refer to it."""
+        storage.save_file(storage.MODELS, path, checksum,
+                          level=storage.UPLOAD_ZSTD_LEVEL)
+        # Working copies are named by a UUID and the upload's file name.
+        _, filename = os.path.basename(path).split("_", 1)
+        return storage.upload_name(checksum, filename)
+
+    def _remember(self, checksum, job_id):
+        """Let the job answer later submissions of the same model."""
+        timeout = current_app.config["RESULT_CACHE_EXPIRES"]
+        if timeout > 0:
+            cache.store(cache.digest(checksum), job_id, timeout)
+
+    def _route(self, job_id, cost, bulk=False):
+        """
+        Route and limit a job by its cost and client.
+
+        Returns the options for sending the job's tasks.
+        """
+        config = current_app.config
+        # Clients may identify themselves, e.g., per user of a web
+        # application. Otherwise their address identifies them.
+        client = request.headers.get("X-Client-Id", request.remote_addr)
+        return {
+            **scheduling.route(job_id, cost, client, config["BULK_COST"],
+                               bulk),
+            **estimates.limit(job_id, cost, config["TIME_LIMIT_FACTOR"],
+                              config["MIN_TIME_LIMIT"],
+                              config["MAX_TIME_LIMIT"]),
+        }
+
+    @contextmanager
+    def _sending(self, job_id):
+        """Withdraw a routed job from its queue if sending it fails."""
+        try:
+            yield
+        except Exception:
+            scheduling.dequeue(job_id)
+            raise
+
+    def _submit(self, job_id, model, routing):
+        model_snapshot.apply_async((model,), task_id=job_id, **routing)
+        LOGGER.debug(f"Successfully submitted job '{job_id}'.")
+
+    def _submit_interchange(self, job_id, model, routing):
+        # The model is stored in the interchange format rather than pickled
+        # into the message. It is stored uncompressed such that workers read
+        # its arrays from the stored bytes without decompressing them first.
+        stored = storage.save(storage.INTERCHANGE, interchange.dumps(model),
+                              compress=False)
+        model_snapshot.apply_async((stored,), task_id=job_id, **routing)
+        LOGGER.debug(f"Successfully submitted job '{job_id}'.")
+
+    def _submit_reference(self, job_id, upload, mimetype, routing):
+        self._snapshot(upload, mimetype, job_id, routing).apply_async(
+            task_id=job_id)
+        LOGGER.debug(f"Successfully submitted job '{job_id}'.")
+
+    def _submit_deferred(self, job_id, upload, mimetype, routing):
+        validation_id = str(uuid4())
+        jobs.register(job_id, validation=validation_id)
+        chain(
+            validate_upload.si(upload, mimetype, job_id=job_id).set(
+                task_id=validation_id, **routing),
+            self._snapshot(upload, mimetype, job_id, routing),
+        ).apply_async(task_id=job_id)
+        LOGGER.debug(f"Successfully submitted job '{job_id}' after validation "
+                     f"'{validation_id}'.")
+
+    def _snapshot(self, upload, mimetype, job_id, routing=None):
+        """
+        Return the signature of testing a stored model.
+
+        The job ID is assigned when applying the signature. With fan-out, every
+        memote test module is a task of its own and the job is the chord
+        callback assembling the report. All tasks are sent with the routing
+        options of the job.
+        """
+        routing = routing or {}
+        if not current_app.config["FAN_OUT"]:
+            return upload_snapshot.si(upload, mimetype).set(**routing)
+        modules = [parallel.module_name(module)
+                   for module in parallel.test_modules()]
+        jobs.register(job_id, groups_total=len(modules), groups_done=0)
+        return chord(
+            [module_snapshot.si(upload, mimetype, module, job_id=job_id).set(
+                **routing) for module in modules],
+            assemble_snapshot.s(modules, upload).set(**routing),
+        )
+
+
+class Submit(Submission, MethodResource):
     """Submit a metabolic model for testing."""
 
-    JSON_TYPES = {
-        "application/json",
-        "text/json"
-    }
-    XML_TYPES = {
-        "application/xml",
-        "text/xml"
-    }
+    JSON_TYPES = loading.JSON_TYPES
+    XML_TYPES = loading.XML_TYPES
 
     @doc(description="Load a metabolic model and submit it for testing by "
                      "memote.")
-    @use_kwargs(SubmitRequest, locations=('files',))
+    @use_kwargs(SubmitRequest, locations=('files', 'form'))
     @marshal_with(SubmitResponse, code=202)
     @marshal_with(None, code=400)
+    @marshal_with(None, code=404)
+    @marshal_with(None, code=413)
     @marshal_with(None, code=415)
-    def post(self, model):
-        # Save the uploaded models on the local filesystem, for easier debugging
-        # of any potential issues with testing the model.
-        filename = secure_filename(model.filename)
-        path = f"models/{str(uuid4())}_{filename}"
-        LOGGER.info(f"Dumping uploaded model to: {path}")
-        with open(path, "wb") as file_:
-            file_.write(model.read())
-            model.stream.seek(0)
-
-        LOGGER.debug(f"Loading Model from file {path}.")
-        model = self._load_model(model)
-
-        LOGGER.debug("Submitting model to job queue.")
-        job_id = self._submit(model)
-        LOGGER.info(f"Job ID {job_id} was queued from model file: {path}")
-
-        return {"uuid": job_id}, 202
-
-    def _submit(self, model):
-        result = model_snapshot.delay(model)
-        LOGGER.debug(f"Successfully submitted job '{result.id}'.")
-        return result.id
-
-    def _load_model(self, file_storage):
+    def post(self, model, parent=None):
+        # The upload was received while parsing the request.
+        metrics.SUBMIT_DURATION.labels("upload").observe(metrics.elapsed())
+        if parent is not None:
+            parent = self._parent(str(parent))
+        filename = loading.decompressed_name(model.filename.lower())
+        mimetype = model.mimetype
+        model_format = self._detect_format(mimetype, filename)
+        # The decompressed upload is a working copy for loading the model in
+        # this request. Workers restore it from the storage.
+        with metrics.SUBMIT_DURATION.labels("decompress").time():
+            path, checksum = self._store(model)
         try:
-            filename, content = self._decompress(file_storage.filename.lower(),
-                                                 file_storage)
-        except IOError as err:
+            return self._submit_upload(
+                path, checksum, mimetype, model_format, parent)
+        finally:
+            os.remove(path)
+
+    def _submit_upload(self, path, checksum, mimetype, model_format, parent):
+        job_id = self._cached(checksum, path)
+        if job_id is not None:
+            return {"uuid": job_id, "cached": True}, 202
+
+        upload = self._save(path, checksum)
+        mode = current_app.config["SUBMIT_MODE"]
+        job_id = str(uuid4())
+        if parent is not None:
+            # Results are reused if the parent was tested successfully by
+            # the time the workers test this job.
+            jobs.register(job_id, parent=parent)
+        if mode == "deferred":
+            # Leave loading and validating the model to the workers such that
+            # this request is not blocked by CPU bound work.
+            LOGGER.debug("Submitting model validation and testing to job "
+                         "queue.")
+            with metrics.SUBMIT_DURATION.labels("count").time():
+                cost = loading.count_entities(path, model_format)
+            routing = self._route(job_id, cost)
+            with self._sending(job_id):
+                self._submit_deferred(job_id, upload, mimetype, routing)
+        else:
+            LOGGER.debug(f"Loading Model from file {path}.")
+            with metrics.SUBMIT_DURATION.labels("parse").time():
+                model = self._parse_model(path, model_format, checksum)
+            LOGGER.debug("Submitting model to job queue.")
+            routing = self._route(job_id, history.cost(model))
+            with self._sending(job_id):
+                if mode == "reference":
+                    # The model was validated but the worker loads it again
+                    # from the stored upload such that no model object is
+                    # pickled.
+                    self._submit_reference(job_id, upload, mimetype, routing)
+                elif mode == "interchange":
+                    self._submit_interchange(job_id, model, routing)
+                else:
+                    self._submit(job_id, model, routing)
+        LOGGER.info(f"Job ID {job_id} was queued from model file: {upload}")
+        self._remember(checksum, job_id)
+
+        return {"uuid": job_id, "cached": False}, 202
+
+    def _parent(self, job_id):
+        """Return a known parent job or abort."""
+        if not jobs.get(job_id):
+            msg = f"Unknown parent job '{job_id}'."
+            LOGGER.warning(msg)
+            abort(404, msg)
+        return job_id
+
+    def _store(self, file_storage):
+        """Stream the decompressed upload to a file and return its checksum."""
+        filename = secure_filename(
+            loading.decompressed_name(file_storage.filename))
+        path = os.path.join(current_app.config["MODEL_DIRECTORY"],
+                            f"{str(uuid4())}_{filename}")
+        LOGGER.info(f"Storing uploaded model in: {path}")
+        try:
+            checksum = loading.store(
+                file_storage.filename.lower(), file_storage.stream, path,
+                current_app.config["MAX_DECOMPRESSED_LENGTH"])
+        except loading.DECOMPRESSION_ERRORS as err:
             msg = f"Failed to decompress file: {str(err)}"
             LOGGER.exception(msg)
             abort(400, msg)
+        except DecompressionLimitError as err:
+            LOGGER.warning(str(err))
+            abort(413, str(err))
+        finally:
+            file_storage.close()
+        return path, checksum
+
+    def _parse_model(self, path, model_format, checksum):
         try:
-            if file_storage.mimetype in self.JSON_TYPES or \
-                    filename.endswith("json"):
-                LOGGER.debug("Loading model from JSON using cobrapy.")
-                model = load_json_model(content)
-            elif file_storage.mimetype in self.XML_TYPES or \
-                    filename.endswith("xml") or filename.endswith("sbml"):
-                LOGGER.debug("Loading model from SBML using memote.")
-                # Memote accepts only a file path, so write to a temporary file.
-                with tempfile.NamedTemporaryFile() as file_:
-                    file_.write(content.getvalue())
-                    file_.seek(0)
-                    model, sbml_ver, notifications = memote.validate_model(
-                        file_.name,
-                    )
-                if model is None:
-                    LOGGER.info("SBML validation failure")
-                    raise SBMLValidationError(
-                        code=400,
-                        warnings=notifications['warnings'],
-                        errors=notifications['errors'],
-                    )
-            else:
-                mime_types = ', '.join((chain(self.JSON_TYPES, self.XML_TYPES)))
-                msg = (
-                    f"'{file_storage.mimetype}' is an unhandled MIME type. "
-                    f"Recognized MIME types are: {mime_types}"
-                )
-                LOGGER.warning(msg)
-                abort(415, msg)
+            # Workers load the model of the same upload from the cache.
+            model, _ = parsing.load(
+                checksum, model_format,
+                lambda: loading.load_model(path, model_format))
         except (CobraSBMLError, ValueError) as err:
             msg = f"Failed to parse model: {str(err)}"
             LOGGER.exception(msg)
             abort(400, msg)
-        finally:
-            content.close()
-            file_storage.close()
         return model
 
-    @staticmethod
-    def _decompress(filename, content):
-        if filename.endswith(".gz"):
-            filename = filename[:-3]
-            LOGGER.debug("Unpacking gzip compressed file.")
-            with GzipFile(fileobj=content, mode="rb") as zipped:
-                content = BytesIO(zipped.read())
-        elif filename.endswith(".bz2"):
-            filename = filename[:-4]
-            LOGGER.debug("Unpacking bzip2 compressed file.")
-            with BZ2File(content, mode="rb") as zipped:
-                content = BytesIO(zipped.read())
-        else:
-            content = BytesIO(content.read())
-        return filename, content
+    def _detect_format(self, mimetype, filename):
+        model_format = loading.detect_format(filename, mimetype)
+        if model_format is None:
+            mime_types = ', '.join((
+                itertools.chain(self.JSON_TYPES, self.XML_TYPES)))
+            msg = (
+                f"'{mimetype}' is an unhandled MIME type. "
+                f"Recognized MIME types are: {mime_types}"
+            )
+            LOGGER.warning(msg)
+            abort(415, msg)
+        return model_format
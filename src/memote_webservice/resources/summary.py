@@ -0,0 +1,90 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Provide resources for retrieving the scores of jobs."""
+
+import logging
+
+from celery import states
+from flask import abort, current_app
+from flask_apispec import MethodResource, doc, marshal_with, use_kwargs
+
+from memote_webservice import jobs, summaries
+from memote_webservice.reporting import load_result
+from memote_webservice.schemas import (
+    SummariesRequest, SummariesResponse, SummaryResponse)
+
+
+__all__ = ("Summary", "Summaries", "summarize")
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Summary(MethodResource):
+    """Return the scores of a job without its report."""
+
+    @doc(description="Return the total and section scores, the failed tests, "
+                     "the size of the model, and the runtime of a finished "
+                     "job.")
+    @marshal_with(SummaryResponse, code=200)
+    @marshal_with(None, code=404)
+    def get(self, uuid):
+        (response,) = summarize([uuid])
+        if response["status"] != states.SUCCESS:
+            msg = f"Job '{uuid}' has no report ({response['status']})."
+            LOGGER.info(msg)
+            abort(404, msg)
+        return response
+
+
+class Summaries(MethodResource):
+    """Return the scores of many jobs at once."""
+
+    @doc(description="Return the state of many jobs at once and the summary "
+                     "of those that finished successfully, e.g., for a "
+                     "scoreboard of a collection of models.")
+    @use_kwargs(SummariesRequest, locations=("json",))
+    @marshal_with(SummariesResponse, code=200)
+    @marshal_with(None, code=400)
+    def post(self, uuids):
+        limit = current_app.config["STATUS_MAX_JOBS"]
+        if len(uuids) > limit:
+            abort(400, f"At most {limit} jobs can be queried at once.")
+        return {"jobs": [{"uuid": uuid, **response}
+                         for uuid, response in zip(uuids, summarize(uuids))]}
+
+
+def summarize(job_ids):
+    """
+    Return the state and, if successful, the summary of many jobs.
+
+    The records of the jobs, the states of their tasks, and the summaries are
+    read in three round trips. Successful jobs without a summary, which
+    finished before summaries were recorded, are summarized from their report.
+    """
+    resolved = jobs.resolve_many(job_ids)
+    task_ids = [task_id for task_id, _ in resolved]
+    responses = []
+    for task_id, meta, summary in zip(
+            task_ids, jobs.task_metas(task_ids),
+            summaries.get_many(task_ids)):
+        if meta["status"] != states.SUCCESS:
+            responses.append({"status": meta["status"]})
+            continue
+        if summary is None:
+            LOGGER.debug(f"Summarizing the result of task {task_id}.")
+            summary = summaries.record(task_id, load_result(meta["result"]))
+        responses.append({"status": meta["status"], **summary})
+    return responses
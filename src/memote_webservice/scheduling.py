@@ -0,0 +1,206 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Route jobs to queues by cost and client and track their queue position.
+
+Cheap jobs go to the ``interactive`` queue and expensive ones, as well as all
+jobs of batch submissions, go to the ``bulk`` queue. Workers that consume both
+queues prefer interactive jobs but take a bulk job after ``INTERACTIVE_WEIGHT``
+interactive jobs in a row such that bulk jobs are not starved. Within a queue,
+a job's priority declines with the number of jobs that its client already has
+waiting. That way, a
+client's first job overtakes the backlog of a client that bulk submitted
+hundreds of models.
+
+Waiting jobs are kept in a sorted set per queue in the same order in which
+the broker hands them out such that their rank is their queue position.
+Workers remove jobs when their tasks start or are revoked. Jobs that waited
+longer than results are kept, e.g., since their tasks were lost, are trimmed
+whenever a job is routed.
+"""
+
+import logging
+import math
+import os
+import time
+
+from kombu.utils.scheduling import priority_cycle
+
+from memote_webservice import jobs
+from memote_webservice.celery import celery_app
+from memote_webservice.redis import redis_client
+
+
+__all__ = ("INTERACTIVE", "BULK", "QUEUES", "WeightedCycle", "route",
+           "dequeue", "position", "positions", "depths")
+
+LOGGER = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+QUEUES = (INTERACTIVE, BULK)
+# The lowest priority, the highest number, for the redis broker.
+MAX_PRIORITY = 9
+QUEUE_KEY = "memote:queue:{}"
+# The time at which waiting jobs were routed, per queue.
+ROUTED_KEY = "memote:queue:{}:routed"
+CLIENT_KEY = "memote:client:{}"
+SEQUENCE_KEY = "memote:queue:sequence"
+# Workers that consume both queues take at most this many interactive jobs in
+# a row while bulk jobs wait.
+INTERACTIVE_WEIGHT = int(os.environ.get("INTERACTIVE_WEIGHT", 4))
+
+
+class WeightedCycle(priority_cycle):
+    """
+    Order the queues that a worker polls such that bulk jobs get a share.
+
+    The redis broker pops jobs by priority first and by the order of queues
+    returned by ``consume`` second. Strictly polling the interactive queue
+    first would starve bulk jobs while interactive jobs keep arriving, so
+    every ``INTERACTIVE_WEIGHT`` interactive jobs, a worker polls the bulk
+    queue alone once. If no bulk job is waiting, that poll delays the next
+    interactive job by at most the broker's poll timeout of one second.
+    """
+
+    def __init__(self, it=None):
+        """Start with interactive jobs."""
+        super().__init__(it)
+        self._streak = 0
+
+    def consume(self, n):
+        """Return the queues to poll in order."""
+        queues = self.items[:n]
+        if BULK in queues and self._streak >= INTERACTIVE_WEIGHT:
+            # The turn is taken whether or not a bulk job is waiting.
+            self._streak = 0
+            return [BULK]
+        return queues
+
+    def rotate(self, last_used):
+        """Count the interactive jobs taken in a row."""
+        if last_used == INTERACTIVE:
+            self._streak += 1
+        else:
+            self._streak = 0
+
+
+def route(job_id, cost, client, bulk_cost, bulk=False):
+    """
+    Place a job in a queue with a priority before submitting it.
+
+    A job that cannot be sent must be removed again with ``dequeue``.
+
+    Parameters
+    ----------
+    job_id : str
+        The job to route.
+    cost : int
+        The number of reactions and metabolites of the model.
+    client : str
+        Identifies who submitted the job.
+    bulk_cost : int
+        The cost from which on a job is routed to the bulk queue.
+    bulk : bool, optional
+        Whether the job is part of a bulk submission irrespective of its cost.
+
+    Returns
+    -------
+    dict
+        The ``queue`` and ``priority`` options for sending the job's tasks.
+
+    """
+    queue = BULK if bulk or cost >= bulk_cost else INTERACTIVE
+    client_key = CLIENT_KEY.format(client)
+    waiting = redis_client.scard(client_key)
+    priority = min(MAX_PRIORITY, int(math.log2(waiting + 1)))
+    # Jobs are handed out by priority first and in order of submission second.
+    order = priority * 2 ** 40 + redis_client.incr(SEQUENCE_KEY)
+    now = time.time()
+    with redis_client.pipeline() as pipe:
+        pipe.zadd(QUEUE_KEY.format(queue), {job_id: order})
+        pipe.zadd(ROUTED_KEY.format(queue), {job_id: now})
+        pipe.zrangebyscore(ROUTED_KEY.format(queue), "-inf",
+                           now - celery_app.conf.result_expires)
+        pipe.sadd(client_key, job_id)
+        pipe.expire(client_key, celery_app.conf.result_expires)
+        stale = pipe.execute()[2]
+    if stale:
+        _trim(queue, [job_id.decode() for job_id in stale])
+    jobs.register(job_id, queue=queue, priority=priority, client=client,
+                  cost=cost, queued=now)
+    LOGGER.debug(f"Routed job {job_id} of cost {cost} from {client} to queue "
+                 f"'{queue}' with priority {priority}.")
+    return {"queue": queue, "priority": priority}
+
+
+def _trim(queue, stale):
+    """Remove jobs that waited longer than results are kept from a queue."""
+    LOGGER.warning(f"Removing {len(stale)} jobs that waited longer than "
+                   f"results are kept from queue '{queue}'.")
+    records = jobs.resolve_many(stale)
+    with redis_client.pipeline() as pipe:
+        pipe.zrem(QUEUE_KEY.format(queue), *stale)
+        pipe.zrem(ROUTED_KEY.format(queue), *stale)
+        for job_id, (_, record) in zip(stale, records):
+            if "client" in record:
+                pipe.srem(CLIENT_KEY.format(record["client"]), job_id)
+        pipe.execute()
+
+
+def dequeue(job_id):
+    """
+    Remove a job that started, was revoked, or failed to be sent.
+
+    Returns the job record if the job was waiting and ``None`` otherwise, e.g.,
+    when an earlier task of the job started already.
+    """
+    record = jobs.get(job_id)
+    if "queue" not in record:
+        return None
+    with redis_client.pipeline() as pipe:
+        pipe.zrem(QUEUE_KEY.format(record["queue"]), job_id)
+        pipe.zrem(ROUTED_KEY.format(record["queue"]), job_id)
+        pipe.srem(CLIENT_KEY.format(record["client"]), job_id)
+        removed, *_ = pipe.execute()
+    return record if removed else None
+
+
+def position(job_id, record):
+    """Return the zero-based position of a waiting job in its queue."""
+    if "queue" not in record:
+        return None
+    return redis_client.zrank(QUEUE_KEY.format(record["queue"]), job_id)
+
+
+def positions(resolved):
+    """Return the positions of many resolved jobs in a single round trip."""
+    waiting = [(job_id, record) for job_id, record in resolved
+               if "queue" in record]
+    with redis_client.pipeline(transaction=False) as pipe:
+        for job_id, record in waiting:
+            pipe.zrank(QUEUE_KEY.format(record["queue"]), job_id)
+        ranks = dict(zip((job_id for job_id, _ in waiting), pipe.execute()))
+    return [ranks.get(job_id) for job_id, _ in resolved]
+
+
+def depths():
+    """Return the number of waiting jobs per queue."""
+    with redis_client.pipeline(transaction=False) as pipe:
+        for queue in QUEUES:
+            pipe.zcard(QUEUE_KEY.format(queue))
+        return dict(zip(QUEUES, pipe.execute()))
@@ -13,11 +13,80 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, validate
+from webargs.fields import DelimitedList
+
+from memote_webservice.indexing import FIELDS
 
 
 class SubmitRequest(Schema):
     model = fields.Field(description="Metabolic model file", required=True)
+    parent = fields.UUID(
+        description="Job of an earlier version of the model whose results are "
+                    "reused for tests unaffected by the changes")
+
+    class Meta:
+        strict = True
+
+
+class BatchRequest(Schema):
+    models = fields.List(
+        fields.Field(), required=True,
+        description="Metabolic model files or tar or zip archives of them")
+
+    class Meta:
+        strict = True
+
+
+class BatchResponse(Schema):
+    uuid = fields.String()
+    models = fields.List(
+        fields.Dict(),
+        description="The name and either the job UUID or the reason for "
+                    "rejection of every submitted file.")
+
+
+class BatchStatusResponse(Schema):
+    total = fields.Integer()
+    finished = fields.Integer()
+    counts = fields.Dict(description="Number of models per status.")
+    models = fields.List(
+        fields.Dict(),
+        description="Name, job UUID, status, whether it is finished or was "
+                    "answered from the cache, and the error type of a failure "
+                    "or the reason for rejection per submitted file.")
+
+
+class EventsRequest(Schema):
+    timeout = fields.Float(
+        description="Seconds after which to end the stream (capped by the "
+                    "server).")
+
+    class Meta:
+        strict = True
+
+
+class ReportRequest(Schema):
+    tests = DelimitedList(
+        fields.String(), description="Comma separated tests to return.")
+    sections = DelimitedList(
+        fields.String(),
+        description="Comma separated sections of the report whose tests to "
+                    "return.")
+    include = DelimitedList(
+        fields.String(validate=validate.OneOf(FIELDS)), data_key="fields",
+        description="Comma separated fields of every test to return, e.g., "
+                    "without the bulky data.")
+    page = fields.Integer(
+        validate=validate.Range(min=1),
+        description="The page of identifiers listed by every test.")
+    per_page = fields.Integer(
+        validate=validate.Range(min=1),
+        description="The number of identifiers per page (capped by the "
+                    "server).")
+    summary = fields.Boolean(
+        description="Return only the meta data, the score, and the tests per "
+                    "section of the report.")
 
     class Meta:
         strict = True
@@ -25,8 +94,98 @@ class SubmitRequest(Schema):
 
 class SubmitResponse(Schema):
     uuid = fields.String()
+    cached = fields.Boolean(
+        description="Whether the result of an identical submission is reused.")
 
 
 class StatusResponse(Schema):
     finished = fields.String()
     status = fields.String()
+    cached = fields.Boolean()
+    source = fields.String(
+        description="The job whose cached result answers this one.")
+    parent = fields.String(
+        description="The job of the earlier version of the model.")
+    queue = fields.Dict(
+        description="The queue and priority of the job and its zero-based "
+                    "position among the waiting jobs (null once started).")
+    estimate = fields.Dict(
+        description="The predicted runtime, the soft and hard time limits, and "
+                    "the solver timeout of the job in seconds.")
+    progress = fields.Dict(
+        description="Tests done out of the total, the current test, elapsed "
+                    "seconds, and the estimated seconds remaining (null "
+                    "without a history of models of similar size).")
+    groups = fields.Dict(
+        description="Number of memote test modules done out of the total when "
+                    "they are tested by separate tasks.")
+    timings = fields.Dict(
+        description="Wall time in seconds of the memote run, per test module "
+                    "when run in parallel, and per test. Jobs whose modules "
+                    "run as separate tasks also report the sum of the module "
+                    "times as 'cpu'.")
+    validation = fields.Dict(
+        description="State, warnings, and errors of validating the model in a "
+                    "worker.")
+
+
+class StatusesRequest(Schema):
+    uuids = fields.List(
+        fields.String(), required=True, validate=validate.Length(min=1),
+        description="The jobs whose status to return.")
+
+    class Meta:
+        strict = True
+
+
+class JobStatusResponse(StatusResponse):
+    uuid = fields.String()
+
+
+class StatusesResponse(Schema):
+    jobs = fields.List(
+        fields.Nested(JobStatusResponse),
+        description="The UUID and status of every requested job in order.")
+
+
+class SummaryResponse(Schema):
+    status = fields.String()
+    score = fields.Float(allow_none=True, description="The total score.")
+    sections = fields.Dict(description="The score per section of the report.")
+    failed = fields.List(fields.String(), description="The failed tests.")
+    size = fields.Dict(
+        description="The number of reactions, metabolites, and genes of the "
+                    "model.")
+    runtime = fields.Float(
+        allow_none=True, description="Wall time in seconds of the memote run.")
+
+
+class SummariesRequest(Schema):
+    uuids = fields.List(
+        fields.String(), required=True, validate=validate.Length(min=1),
+        description="The jobs whose summary to return.")
+
+    class Meta:
+        strict = True
+
+
+class JobSummaryResponse(SummaryResponse):
+    uuid = fields.String()
+
+
+class SummariesResponse(Schema):
+    jobs = fields.List(
+        fields.Nested(JobSummaryResponse),
+        description="The UUID, status, and summary, if finished successfully, "
+                    "of every requested job in order.")
+
+
+class EstimatesResponse(Schema):
+    summary = fields.Dict(
+        description="Per size class, the number of jobs, the median ratio of "
+                    "actual to predicted runtime, and the mean absolute error "
+                    "in seconds.")
+    jobs = fields.List(
+        fields.Dict(),
+        description="Cost, size class, and predicted and actual runtime in "
+                    "seconds of the latest finished jobs.")
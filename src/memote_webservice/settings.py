@@ -41,6 +41,51 @@ class Default:
         # 25 MB default limit (size of Recon3D).
         self.MAX_CONTENT_LENGTH = int(os.environ.get(
             "MAX_CONTENT_LENGTH", 25 * 1024 * 1024))
+        # Reject compressed uploads that inflate beyond this size in order to
+        # guard against decompression bombs.
+        self.MAX_DECOMPRESSED_LENGTH = int(os.environ.get(
+            "MAX_DECOMPRESSED_LENGTH", 10 * self.MAX_CONTENT_LENGTH))
+        # Time after which a cached result no longer answers identical
+        # submissions. Keep it below the celery result expiry; zero disables
+        # the cache.
+        self.RESULT_CACHE_EXPIRES = int(os.environ.get(
+            "RESULT_CACHE_EXPIRES", 24 * 60 * 60))
+        # Directory where uploads are written while they are submitted. It
+        # holds the local storage unless `STORAGE_URL` is set.
+        self.MODEL_DIRECTORY = os.environ.get("MODEL_DIRECTORY", "models")
+        # How models are handed to workers: 'model' pickles the parsed model,
+        # 'interchange' stores it in the interchange format, 'reference' only
+        # sends the stored upload, and 'deferred' additionally leaves
+        # validation to a worker.
+        self.SUBMIT_MODE = os.environ.get("SUBMIT_MODE", "model")
+        # In the latter two modes, optionally test every memote test module in
+        # a task of its own such that a job can use all available workers.
+        self.FAN_OUT = os.environ.get("FAN_OUT", "0") == "1"
+        # Jobs for models with at least this many reactions and metabolites go
+        # to the bulk queue (see `scheduling.py`).
+        self.BULK_COST = int(os.environ.get("BULK_COST", 5000))
+        # The soft time limit of a job is this multiple of its predicted runtime
+        # within the given bounds in seconds (see `estimates.py`).
+        self.TIME_LIMIT_FACTOR = float(os.environ.get("TIME_LIMIT_FACTOR", 4))
+        self.MIN_TIME_LIMIT = int(os.environ.get("MIN_TIME_LIMIT", 600))
+        self.MAX_TIME_LIMIT = int(os.environ.get("MAX_TIME_LIMIT", 6 * 3600))
+        # Maximum number of models in a single batch submission.
+        self.BATCH_MAX_MODELS = int(os.environ.get("BATCH_MAX_MODELS", 5000))
+        # Seconds after which a stream of job events ends, which must be below
+        # the proxy read timeout, and seconds between heartbeats that keep it
+        # alive.
+        self.EVENTS_TIMEOUT = float(os.environ.get("EVENTS_TIMEOUT", 300))
+        self.EVENTS_HEARTBEAT = float(os.environ.get("EVENTS_HEARTBEAT", 15))
+        # Maximum number of identifiers per test in a page of a partial
+        # report.
+        self.REPORT_PAGE_SIZE = int(os.environ.get("REPORT_PAGE_SIZE", 1000))
+        # Maximum number of jobs whose status or summary is queried in a single
+        # request.
+        self.STATUS_MAX_JOBS = int(os.environ.get("STATUS_MAX_JOBS", 1000))
+        # Threads in which the ASGI entry point handles the requests that are
+        # not served natively, that is, all but job states and their events
+        # (see `asgi.py`).
+        self.ASGI_THREADS = int(os.environ.get("ASGI_THREADS", 32))
         self.SECRET_KEY = os.urandom(24)
         self.BUNDLE_ERRORS = True
         self.CORS_ORIGINS = os.environ['ALLOWED_ORIGINS'].split(',')
@@ -0,0 +1,365 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Store uploads and results durably outside of redis.
+
+Objects are stored under their kind and the SHA-256 digest of their content
+such that identical models, reports, and renderings are stored once. Storing
+an object that exists only refreshes its modification time, from which the
+retention sweep removes objects that nothing has stored in a while. Redis and
+the result backend keep only the keys of stored objects.
+
+``STORAGE_URL`` selects the backend: a local directory, which the web service
+and the workers must share (default ``storage`` in the model directory), or an
+S3 bucket like ``s3://bucket/prefix``. The S3 backend requires the ``boto3``
+package and ``S3_ENDPOINT_URL`` points it at a compatible service such as
+MinIO. Objects are compressed with zstd by means of the ``zstandard`` package.
+Processes without it fall back to gzip but cannot read zstd objects, so the
+web service and the workers should share an image.
+"""
+
+import gzip
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+
+from memote_webservice.exceptions import StorageCodecError
+
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+__all__ = ("LocalStorage", "S3Storage", "from_url", "storage", "save",
+           "save_file", "load", "upload_name", "restored", "sweep")
+
+LOGGER = logging.getLogger(__name__)
+
+# The kinds of stored objects, each under a prefix of its own.
+MODELS = "models"
+RESULTS = "results"
+RENDERINGS = "renderings"
+DATA = "data"
+PARSED = "parsed"
+INTERCHANGE = "interchange"
+KINDS = (MODELS, RESULTS, RENDERINGS, DATA, PARSED, INTERCHANGE)
+# Objects are written once and read many times, so a higher level than zstd's
+# default pays off where workers store them.
+ZSTD_LEVEL = 9
+# Uploads are stored while the client waits for its job ID, where a fast level
+# keeps the request short.
+UPLOAD_ZSTD_LEVEL = 1
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+class LocalStorage:
+    """Store objects as files in a directory."""
+
+    def __init__(self, root):
+        """Store objects below the given directory."""
+        self.root = root
+
+    def _path(self, key):
+        return os.path.join(self.root, *key.split("/"))
+
+    def put(self, key, data):
+        """Write an object atomically."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+                dir=os.path.dirname(path), delete=False) as file_:
+            file_.write(data)
+        os.replace(file_.name, path)
+
+    def put_file(self, key, source):
+        """Write an object from a file-like source chunk by chunk."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+                dir=os.path.dirname(path), delete=False) as file_:
+            try:
+                shutil.copyfileobj(source, file_)
+            except Exception:
+                os.remove(file_.name)
+                raise
+        os.replace(file_.name, path)
+
+    def get(self, key):
+        """Read an object or raise a ``KeyError``."""
+        try:
+            with open(self._path(key), "rb") as file_:
+                return file_.read()
+        except FileNotFoundError:
+            raise KeyError(key) from None
+
+    def touch(self, key):
+        """Refresh the modification time of an object if it exists."""
+        try:
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def delete(self, key):
+        """Delete an object if it exists."""
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def list(self, prefix):
+        """Iterate over the keys and modification times of objects."""
+        directory = self._path(prefix)
+        for base, _, names in os.walk(directory):
+            for name in names:
+                path = os.path.join(base, name)
+                key = os.path.relpath(path, self.root).replace(os.sep, "/")
+                try:
+                    yield key, os.path.getmtime(path)
+                except FileNotFoundError:
+                    continue
+
+
+class S3Storage:
+    """Store objects in a bucket of S3 or a compatible service."""
+
+    def __init__(self, bucket, prefix="", endpoint_url=None):
+        """Store objects in a bucket below a prefix of keys."""
+        import boto3
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+
+    def _key(self, key):
+        return f"{self.prefix}{key}"
+
+    @staticmethod
+    def _missing(error):
+        return error.response.get("Error", {}).get("Code") in (
+            "404", "NoSuchKey")
+
+    def put(self, key, data):
+        """Write an object."""
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key),
+                               Body=data)
+
+    def put_file(self, key, source):
+        """Write an object from a file-like source in parts."""
+        self.client.upload_fileobj(source, self.bucket, self._key(key))
+
+    def get(self, key):
+        """Read an object or raise a ``KeyError``."""
+        try:
+            response = self.client.get_object(Bucket=self.bucket,
+                                              Key=self._key(key))
+        except self.client.exceptions.ClientError as error:
+            if self._missing(error):
+                raise KeyError(key) from None
+            raise
+        return response["Body"].read()
+
+    def touch(self, key):
+        """Refresh the modification time of an object if it exists."""
+        try:
+            # Copying an object onto itself renews its modification time.
+            self.client.copy_object(
+                Bucket=self.bucket, Key=self._key(key),
+                CopySource={"Bucket": self.bucket, "Key": self._key(key)},
+                MetadataDirective="REPLACE")
+        except self.client.exceptions.ClientError as error:
+            if self._missing(error):
+                return False
+            raise
+        return True
+
+    def delete(self, key):
+        """Delete an object if it exists."""
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def list(self, prefix):
+        """Iterate over the keys and modification times of objects."""
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket,
+                                       Prefix=self._key(prefix)):
+            for item in page.get("Contents", ()):
+                yield (item["Key"][len(self.prefix):],
+                       item["LastModified"].timestamp())
+
+
+def from_url(url):
+    """Return the storage backend for a directory or an S3 URL."""
+    if url.startswith("s3://"):
+        bucket, _, prefix = url[len("s3://"):].partition("/")
+        if prefix and not prefix.endswith("/"):
+            prefix += "/"
+        return S3Storage(bucket, prefix, os.environ.get("S3_ENDPOINT_URL"))
+    if url.startswith("file://"):
+        url = url[len("file://"):]
+    return LocalStorage(url)
+
+
+storage = from_url(os.environ.get("STORAGE_URL", os.path.join(
+    os.environ.get("MODEL_DIRECTORY", "models"), "storage")))
+
+
+def _compress(data):
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return gzip.compress(data)
+
+
+@contextmanager
+def _compressing(path, level):
+    """Provide the compressed content of a file as a file-like object."""
+    with open(path, "rb") as source:
+        if zstandard is not None:
+            # Record the content size such that the object decompresses in
+            # one step.
+            compressor = zstandard.ZstdCompressor(level=level)
+            with compressor.stream_reader(
+                    source, size=os.fstat(source.fileno()).st_size) as reader:
+                yield reader
+            return
+        with tempfile.TemporaryFile() as buffer:
+            with gzip.GzipFile(fileobj=buffer, mode="wb",
+                               compresslevel=min(level, 9)) as file_:
+                shutil.copyfileobj(source, file_)
+            buffer.seek(0)
+            yield buffer
+
+
+def _decompress(data):
+    if data.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise StorageCodecError(
+                "The object is zstd compressed but the 'zstandard' package is "
+                "not installed.")
+        # Objects stored with a content size decompress in one step.
+        return zstandard.ZstdDecompressor().decompress(data)
+    if data.startswith(GZIP_MAGIC):
+        return gzip.decompress(data)
+    raise StorageCodecError(
+        "The object is neither zstd nor gzip compressed.")
+
+
+def save(kind, data, compress=True):
+    """
+    Store an object once per content and return its key.
+
+    Parameters
+    ----------
+    kind : str
+        The kind of object (see ``KINDS``).
+    data : bytes
+        The content of the object.
+    compress : bool, optional
+        Whether to compress the content, which is not worthwhile for content
+        that is compressed already.
+
+    Returns
+    -------
+    str
+        The key under which the object is stored.
+
+    """
+    key = f"{kind}/{hashlib.sha256(data).hexdigest()}"
+    if not storage.touch(key):
+        storage.put(key, _compress(data) if compress else data)
+    return key
+
+
+def save_file(kind, path, checksum, level=ZSTD_LEVEL):
+    """
+    Store a file once per content without reading it into memory.
+
+    Parameters
+    ----------
+    kind : str
+        The kind of object (see ``KINDS``).
+    path : str
+        The file to store.
+    checksum : str
+        The SHA-256 hex digest of the file's content, e.g., as computed while
+        it was written.
+    level : int, optional
+        The zstd compression level.
+
+    Returns
+    -------
+    str
+        The key under which the object is stored.
+
+    """
+    key = f"{kind}/{checksum}"
+    if not storage.touch(key):
+        with _compressing(path, level) as source:
+            storage.put_file(key, source)
+    return key
+
+
+def load(key, decompress=True):
+    """Return the content of a stored object or raise a ``KeyError``."""
+    data = storage.get(key)
+    return _decompress(data) if decompress else data
+
+
+def upload_name(checksum, filename):
+    """Return the name by which tasks refer to a stored upload."""
+    return f"{checksum}_{filename}"
+
+
+@contextmanager
+def restored(name):
+    """
+    Provide a temporary copy of a stored upload.
+
+    The copy has the file name of the upload from which its format is
+    detected.
+    """
+    checksum, _ = name.split("_", 1)
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, name)
+        with open(path, "wb") as file_:
+            file_.write(load(f"{MODELS}/{checksum}"))
+        yield path
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def sweep(retention, now=None):
+    """
+    Delete all objects that were not stored within the retention period.
+
+    Returns the number of deleted objects.
+    """
+    now = time.time() if now is None else now
+    deleted = 0
+    for kind in KINDS:
+        for key, modified in storage.list(kind):
+            if now - modified > retention:
+                storage.delete(key)
+                deleted += 1
+    LOGGER.info(f"Deleted {deleted} objects older than {retention} seconds.")
+    return deleted
@@ -0,0 +1,112 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Keep a summary of the result of every job for scoreboards and dashboards.
+
+A summary holds the total and section scores, the failed tests, the size of
+the model, and the wall time of the memote run. The task that creates the
+report records it such that clients get the scores of many jobs without
+loading a single report. Summaries of results from before their introduction
+are recorded on their first retrieval.
+"""
+
+import json
+import logging
+
+from memote_webservice import jobs
+from memote_webservice.celery import celery_app
+from memote_webservice.redis import redis_client
+
+
+__all__ = ("summarize", "record", "get_many")
+
+LOGGER = logging.getLogger(__name__)
+
+SUMMARY_KEY = "memote:summary:{}"
+# The tests listing all entities of a model by kind.
+SIZE_TESTS = {
+    "reactions": "test_reactions_presence",
+    "metabolites": "test_metabolites_presence",
+    "genes": "test_genes_presence",
+}
+
+
+def _failed(outcome):
+    """Return whether a (parametrized) test failed for any parameter."""
+    if isinstance(outcome, dict):
+        return "failed" in outcome.values()
+    return outcome == "failed"
+
+
+def _score(value):
+    return None if value is None else float(value)
+
+
+def summarize(result, runtime=None):
+    """
+    Summarize the result of a snapshot report.
+
+    Parameters
+    ----------
+    result : dict
+        The result of a snapshot report as rendered in its JSON.
+    runtime : float, optional
+        The wall time of the memote run in seconds.
+
+    Returns
+    -------
+    dict
+        The total score and the score per section, the IDs of the failed
+        tests, the number of reactions, metabolites, and genes of the model,
+        and the runtime.
+
+    """
+    score = result.get("score") or {}
+    tests = result["tests"]
+
+    def count(test):
+        data = tests.get(test, {}).get("data")
+        return len(data) if isinstance(data, list) else None
+
+    return {
+        "score": _score(score.get("total_score")),
+        "sections": {section["section"]: _score(section["score"])
+                     for section in score.get("sections", [])},
+        "failed": sorted(test for test, case in tests.items()
+                         if _failed(case.get("result"))),
+        "size": {kind: count(test) for kind, test in SIZE_TESTS.items()},
+        "runtime": runtime,
+    }
+
+
+def record(task_id, result):
+    """Record and return the summary of a task's result."""
+    timings = jobs.get(task_id).get("timings")
+    summary = summarize(
+        result, json.loads(timings)["total"] if timings else None)
+    redis_client.set(SUMMARY_KEY.format(task_id), json.dumps(summary),
+                     ex=celery_app.conf.result_expires)
+    return summary
+
+
+def get_many(task_ids):
+    """Return the summaries of many tasks (``None`` for unknown ones)."""
+    if not task_ids:
+        return []
+    values = redis_client.mget([SUMMARY_KEY.format(task_id)
+                                for task_id in task_ids])
+    return [None if value is None else json.loads(value) for value in values]
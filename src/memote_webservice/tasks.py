@@ -15,20 +15,384 @@
 
 """Define individual jobs."""
 
+import json
+import logging
+import os
+import time
+
 import cobra
 import memote
+from celery import states
+from celery.exceptions import SoftTimeLimitExceeded
+from celery.signals import (
+    task_failure, task_postrun, task_prerun, task_revoked, worker_init,
+    worker_process_init)
+from memote.utils import jsonify
 
+from . import (
+    estimates, events, history, incremental, interchange, jobs, metrics,
+    parallel, parsing, progress, scheduling, storage, summaries)
 from .celery import celery_app
+from .loading import detect_format, load_file, load_model
+from .prewarm import prewarm
+from .reporting import migrate, store_report
 
 
-@celery_app.task
-def model_snapshot(model):
-    """Run memote on the given model and create a snapshot report."""
+LOGGER = logging.getLogger(__name__)
+
+PYTEST_ARGS = ("-vv", "--tb", "long", "-p", progress.__name__, "-p",
+               incremental.__name__)
+# Stored objects are kept for a day longer than results and job records refer
+# to them.
+STORAGE_RETENTION = int(os.environ.get(
+    "STORAGE_RETENTION", celery_app.conf.result_expires + 24 * 60 * 60))
+# The port on which a worker serves its metrics, `0` disables them.
+WORKER_METRICS_PORT = int(os.environ.get("WORKER_METRICS_PORT", 9540))
+
+
+@worker_init.connect
+def prewarm_worker(**kwargs):
+    """Pre-warm the main worker process that forks the job processes."""
+    if os.environ.get("WORKER_PREWARM", "0") == "1":
+        prewarm()
+
+
+@worker_init.connect
+def export_metrics(**kwargs):
+    """Serve the metrics of all processes of a worker (see ``metrics``)."""
+    if WORKER_METRICS_PORT:
+        try:
+            metrics.start_exporter(WORKER_METRICS_PORT)
+        except OSError as error:
+            LOGGER.warning(f"Failed to serve worker metrics on port "
+                           f"{WORKER_METRICS_PORT}: {error}")
+
+
+@worker_process_init.connect
+def identify_metrics(**kwargs):
+    """Let processes forked by a pool process keep metrics in its slot."""
+    metrics.remember_pool_process()
+
+
+@task_prerun.connect
+def publish_started(task_id, **kwargs):
+    """Notify followers of a job that its task started."""
+    events.publish(task_id, states.STARTED)
+
+
+@task_prerun.connect
+def leave_queue(task_id, kwargs, **_):
+    """Remove the job of a task that started from the waiting jobs."""
+    # Tasks that are part of a job receive its ID.
+    record = scheduling.dequeue(kwargs.get("job_id", task_id))
+    if record is not None and "queued" in record:
+        metrics.JOB_WAIT.labels(record["queue"]).observe(
+            time.time() - float(record["queued"]))
+
+
+@task_revoked.connect
+def leave_queue_revoked(request, **kwargs):
+    """Remove the job of a revoked task from the waiting jobs."""
+    scheduling.dequeue(request.kwargs.get("job_id", request.id))
+
+
+@task_failure.connect
+def leave_queue_failed(task_id, kwargs, **_):
+    """Remove the job of a failed task in case it is still waiting."""
+    scheduling.dequeue(kwargs.get("job_id", task_id))
+
+
+@task_postrun.connect
+def publish_finished(task_id, state, **kwargs):
+    """Notify followers of a job that its task finished."""
+    events.publish(task_id, state)
+
+
+@task_postrun.connect
+def observe_peak_rss(task, **kwargs):
+    """Observe the peak memory of the process that ran a task."""
+    # Every process runs a single task (see `celery.py`).
+    metrics.PEAK_RSS.labels(task.name.rsplit(".", 1)[-1]).observe(
+        metrics.peak_rss())
+
+
+def _snapshot(task, model):
+    """
+    Run memote on the given model and create a snapshot report.
+
+    Test modules run in parallel when the worker environment sets
+    ``MEMOTE_PROCESSES`` to more than one. Either way, the progress is reported
+    as task state and the wall time of the run and the duration of every test
+    are recorded with the job. Revisions of a parent job only run the tests
+    affected by their changes (see ``incremental``).
+    """
+    configuration = cobra.Configuration()
+    configuration.processes = 1
+    processes = int(os.environ.get("MEMOTE_PROCESSES", "1"))
+    job_id = task.request.id
+    record = jobs.get(job_id)
+    solver_timeout = _solver_timeout(record)
+    parent, changed = _reuse(job_id, record, _fingerprint(job_id, model))
+    start = time.perf_counter()
+    with progress.reporting(
+            _progress(task, job_id, model, record, processes)) as reporter, \
+            incremental.reusing(changed):
+        if processes > 1:
+            result, modules = parallel.test_model(
+                model, processes, PYTEST_ARGS, solver_timeout)
+        else:
+            _, result = memote.test_model(model, results=True,
+                                          pytest_args=list(PYTEST_ARGS),
+                                          solver_timeout=solver_timeout)
+            modules = {}
+    if reporter.stopped:
+        raise SoftTimeLimitExceeded()
+    if changed is not None:
+        incremental.carry_over(result, record["parent"], parent, changed)
+    _record_timings(job_id, result, processes=processes,
+                    total=time.perf_counter() - start, modules=modules)
+    return _report(job_id, result)
+
+
+def _report(job_id, result):
+    """Create the snapshot report of a job and record its summary."""
+    report = memote.SnapshotReport(
+        result=result, configuration=memote.ReportConfiguration.load())
+    summaries.record(job_id, report.result)
+    return report
+
+
+def _solver_timeout(record):
+    """Return the solver timeout of a job (see ``estimates``)."""
+    return int(record.get("solver_timeout", estimates.SOLVER_TIMEOUT))
+
+
+def _fingerprint(job_id, model):
+    """Record the fingerprint of a job's model for its revisions."""
+    current = incremental.fingerprint(model)
+    jobs.register(job_id, fingerprint=json.dumps(current))
+    return current
+
+
+def _reuse(job_id, record, current):
+    """
+    Compare the fingerprint of a job's model to that of its parent.
+
+    Returns the task of the parent and the changed aspects of the model, both
+    ``None`` unless the job is a revision whose parent's results can be
+    reused.
+    """
+    if "parent" not in record:
+        return None, None
+    found = incremental.parent(record["parent"])
+    if found is None:
+        return None, None
+    task_id, previous = found
+    changed = incremental.changes(previous, current)
+    if changed is None:
+        LOGGER.info(f"Job {job_id} was tested by another version of memote "
+                    f"than its parent.")
+        return None, None
+    LOGGER.info(f"Job {job_id} changed {sorted(changed)} since its parent.")
+    return task_id, changed
+
+
+def _progress(task, job_id, model, record, processes=1):
+    """Report the progress of a job as task state and as events."""
+    size = history.size_class(history.cost(model))
+    jobs.register(job_id, size=size)
+    predicted = record.get("predicted")
+
+    def update(meta):
+        task.update_state(task_id=job_id, state=events.PROGRESS, meta=meta)
+        events.publish(job_id, events.PROGRESS, progress=meta)
+
+    return progress.Progress(
+        job_id, update, history.expected(size), processes,
+        None if predicted is None else float(predicted))
+
+
+def _record_timings(job_id, result, **timings):
+    """
+    Record the given timings and the duration of every test with a job.
+
+    The test durations and the total runtime are also added to the history of
+    the model's size class from which the ETA and the limits of later jobs are
+    estimated, and to the metrics. Results reused from a parent job are left
+    out and so is the runtime of a job that did not run all tests.
+    """
+    timings["tests"] = {
+        test: _total_duration(case.get("duration"))
+        for test, case in result["tests"].items()
+        if "reused_from" not in case
+    }
+    LOGGER.info(f"Tested the model of job {job_id} in "
+                f"{timings['total']:.1f} seconds.")
+    jobs.register(job_id, timings=json.dumps(timings))
+    size = jobs.get(job_id).get("size")
+    if size is not None:
+        history.record(size, timings["tests"])
+    for test, duration in timings["tests"].items():
+        metrics.TEST_DURATION.labels(test).observe(duration)
+    if len(timings["tests"]) == len(result["tests"]):
+        estimates.record(job_id, timings["total"])
+        metrics.JOB_DURATION.labels(size or "unknown").observe(
+            timings["total"])
+
+
+def _total_duration(duration):
+    """Sum the durations of a (parametrized) test case."""
+    if isinstance(duration, dict):
+        return sum(duration.values())
+    return duration or 0.0
+
+
+def _load_upload(upload, mimetype):
+    """
+    Load a model from a stored upload (see ``storage.restored``).
+
+    Uploads are parsed once and then loaded from the cache of parsed models by
+    every further task (see ``parsing``).
+    """
+    if os.path.exists(upload):
+        # Uploads were referred to by their path before they were stored.
+        return load_file(upload, mimetype)
+    model_format = detect_format(upload.lower(), mimetype)
+    if model_format is None:
+        raise ValueError(f"Unhandled model format of file '{upload}'.")
+    checksum, _ = upload.split("_", 1)
+
+    def parse():
+        with storage.restored(upload) as path:
+            return load_model(path, model_format)
+
+    return parsing.load(checksum, model_format, parse)
+
+
+@celery_app.task(bind=True)
+def model_snapshot(self, model):
+    """
+    Run memote on the given model and create a snapshot report.
+
+    The model arrives pickled or, in the 'interchange' submit mode, as the
+    key of its stored, uncompressed interchange format (see ``interchange``).
+    The result points to the parts of the report in the storage (see
+    ``reporting.store_report``).
+    """
+    stored = None
+    if isinstance(model, str):
+        stored = model
+        data = storage.load(stored, decompress=False)
+        if not data.startswith(interchange.MAGIC):
+            # Models stored before were compressed.
+            data = storage.load(stored)
+        model = interchange.loads(data)
+    return store_report(_snapshot(self, model), stored)
+
+
+@celery_app.task(bind=True)
+def upload_snapshot(self, upload, mimetype=None):
+    """
+    Run memote on an uploaded model file and create a snapshot report.
+
+    Only the name of the stored upload is sent through the broker and the
+    result points to the stored parts of the report such that no model object
+    is ever pickled.
+    """
+    model, _ = _load_upload(upload, mimetype)
+    return store_report(_snapshot(self, model), upload)
+
+
+@celery_app.task(bind=True)
+def module_snapshot(self, upload, mimetype, module, job_id):
+    """
+    Run a single memote test module on an uploaded model file.
+
+    This is one of the parallel parts of a job that is assembled by
+    ``assemble_snapshot``. The partial result is stored and the task returns
+    its key.
+    """
+    # The job's wall time runs from the start of its first module.
+    started = time.time()
     configuration = cobra.Configuration()
     configuration.processes = 1
-    _, result = memote.test_model(model, results=True,
-                                  pytest_args=["-vv", "--tb", "long"],
-                                  solver_timeout=20)
-    config = memote.ReportConfiguration.load()
-    report = memote.SnapshotReport(result=result, configuration=config)
-    return model, report
+    model, _ = _load_upload(upload, mimetype)
+    record = jobs.get(job_id)
+    _, changed = _reuse(job_id, record, _fingerprint(job_id, model))
+    with progress.reporting(
+            _progress(self, job_id, model, record)) as reporter, \
+            incremental.reusing(changed):
+        result, duration = parallel.test_module(
+            model, parallel.module_path(module), PYTEST_ARGS,
+            _solver_timeout(record))
+    if reporter.stopped:
+        raise SoftTimeLimitExceeded()
+    done = jobs.increment(job_id, "groups_done")
+    total = int(jobs.get(job_id)["groups_total"])
+    events.publish(job_id, events.PROGRESS,
+                   groups={"done": done, "total": total})
+    part = {"meta": result.meta, "tests": result.cases, "duration": duration,
+            "started": started}
+    return storage.save(storage.RESULTS, jsonify(part).encode("utf-8"))
+
+
+@celery_app.task(bind=True)
+def assemble_snapshot(self, parts, modules, upload=None):
+    """
+    Merge the results of separately tested modules into a snapshot report.
+
+    The keys of the stored partial results arrive in the order of the given
+    module names. Like ``upload_snapshot``, the result points to the stored
+    parts of the report and the upload.
+    """
+    results = [json.loads(storage.load(part)) for part in parts]
+    result = parallel.merge(results)
+    record = jobs.get(self.request.id)
+    parent, changed = _reuse(
+        self.request.id, record, json.loads(record["fingerprint"]))
+    if changed is not None:
+        incremental.carry_over(result, record["parent"], parent, changed)
+    durations = [part["duration"] for part in results]
+    # Modules run concurrently on several workers, so the sum of their
+    # durations is the compute time and not the wall time of the job.
+    started = [part["started"] for part in results if "started" in part]
+    total = time.time() - min(started) if started else sum(durations)
+    _record_timings(self.request.id, result, groups=len(modules),
+                    total=total, cpu=sum(durations),
+                    modules=dict(zip(modules, durations)))
+    return store_report(_report(self.request.id, result), upload)
+
+
+@celery_app.task(bind=True)
+def validate_upload(self, upload, mimetype=None, job_id=None):
+    """
+    Validate an uploaded model file and return the notifications.
+
+    This is a fast first stage before testing the model. When validation
+    fails, the job testing the model is marked as failed with the same error
+    since it will never run.
+    """
+    try:
+        _, notifications = _load_upload(upload, mimetype)
+    except Exception as error:
+        if job_id is not None:
+            self.backend.mark_as_failure(job_id, error)
+            events.publish(job_id, states.FAILURE,
+                           validation={"status": states.FAILURE})
+        raise
+    if job_id is not None:
+        events.publish(job_id, events.PROGRESS,
+                       validation={"status": states.SUCCESS, **notifications})
+    return notifications
+
+
+@celery_app.task
+def migrate_results():
+    """Store the reports of earlier versions in parts (see ``reporting``)."""
+    return migrate()
+
+
+@celery_app.task
+def sweep_storage():
+    """Delete stored objects beyond the retention period (see ``storage``)."""
+    return storage.sweep(STORAGE_RETENTION)
@@ -17,6 +17,7 @@
 
 import pytest
 
+from memote_webservice import storage
 from memote_webservice.app import app as app_
 from memote_webservice.app import init_app
 
@@ -33,3 +34,11 @@ def client(app):
     """Provide a Flask test client to be used by almost all test cases."""
     with app.test_client() as client:
         yield client
+
+
+@pytest.fixture(autouse=True)
+def local_storage(tmpdir, monkeypatch):
+    """Keep the objects stored by every test in a temporary directory."""
+    backend = storage.LocalStorage(str(tmpdir.join("storage")))
+    monkeypatch.setattr(storage, "storage", backend)
+    return backend
@@ -0,0 +1,52 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Ensure that results are migrated by the redis server of the deployment."""
+
+import json
+from uuid import uuid4
+
+import pytest
+from celery import states
+
+from memote_webservice import jobs, storage
+from memote_webservice.celery import celery_app
+from memote_webservice.redis import redis_client
+from memote_webservice.reporting import StoredReport, StoredResult, migrate
+
+
+@pytest.fixture
+def task_key():
+    """Provide the result key of a task and remove it afterwards."""
+    key = jobs.task_key(str(uuid4()))
+    yield key
+    redis_client.delete(key)
+
+
+@pytest.mark.parametrize("expires", [3600, None])
+def test_migrate(task_key, expires):
+    """Expect a migrated result to keep its expiry."""
+    report = storage.save(storage.RESULTS, json.dumps({
+        "meta": {}, "score": {}, "cards": {"scored": {"sections": {}}},
+        "tests": {}}).encode())
+    meta = {"status": states.SUCCESS, "result": StoredReport(report)}
+    redis_client.set(task_key, celery_app.backend.encode(meta), ex=expires)
+    assert migrate() >= 1
+    meta = jobs.decode_meta(redis_client.get(task_key))
+    assert isinstance(meta["result"], StoredResult)
+    if expires is None:
+        assert redis_client.ttl(task_key) == -1
+    else:
+        assert 3590 < redis_client.ttl(task_key) <= expires
@@ -0,0 +1,61 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Ensure that running test modules in parallel does not change results."""
+
+from os.path import dirname, join, pardir
+
+import memote
+import pytest
+from cobra.io import read_sbml_model
+
+from memote_webservice import parallel
+
+
+DATA_PATH = join(dirname(__file__), pardir, "data")
+
+
+@pytest.fixture(scope="module")
+def model():
+    """Provide a model for testing."""
+    return read_sbml_model(join(DATA_PATH, "EcoliCore.xml"))
+
+
+def outcomes(cases):
+    """
+    Extract the deterministic parts of test cases.
+
+    Even two serial runs differ in the order of unordered data and in solver
+    noise of the last digits, so compare outcomes and rounded metrics.
+    """
+    def rounded(metric):
+        if isinstance(metric, dict):
+            return {key: rounded(value) for key, value in metric.items()}
+        return round(metric, 6) if isinstance(metric, float) else metric
+    return {
+        test: (case.get("result"), rounded(case.get("metric")))
+        for test, case in cases.items()
+    }
+
+
+def test_parallel_equals_serial(model):
+    """Expect the same test cases in the same order as a serial run."""
+    _, serial = memote.test_model(model, results=True,
+                                  pytest_args=["--tb", "no"])
+    result, timings = parallel.test_model(model, 2, ["--tb", "no"], 10)
+    assert list(result.cases) == list(serial.cases)
+    assert outcomes(result.cases) == outcomes(serial.cases)
+    assert set(timings) == {
+        parallel.module_name(path) for path in parallel.test_modules()}
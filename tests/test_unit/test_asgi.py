@@ -0,0 +1,200 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test serving the application over ASGI."""
+
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+import pytest
+
+
+@pytest.fixture
+def asgi(app, mocker):
+    # The application of the test session is initialized already.
+    mocker.patch("memote_webservice.app.init_app")
+    from memote_webservice import asgi
+    return asgi
+
+
+async def call(asgi, path, method="GET", headers=(), chunks=(b"",),
+               query_string=b"", disconnect=None):
+    """Send a request to the ASGI application and return its response."""
+    messages = [{"type": "http.request", "body": chunk, "more_body": True}
+                for chunk in chunks]
+    messages[-1]["more_body"] = False
+    disconnect = disconnect or asyncio.Event()
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "root_path": "",
+        "query_string": query_string,
+        "headers": list(headers),
+        "client": ("127.0.0.1", 1234),
+        "server": ("localhost", 8000),
+    }
+    await asgi.app(scope, receive, send)
+    start, *body = sent
+    return start, b"".join(message.get("body", b"") for message in body)
+
+
+def request(asgi, path, **kwargs):
+    """Send a request like ``call`` outside of an event loop."""
+    return asyncio.run(call(asgi, path, **kwargs))
+
+
+def returning(mocker, value):
+    """Mock a coroutine function that returns the given value."""
+    # `AsyncMock` requires Python 3.8.
+    async def coroutine(*args, **kwargs):
+        return value
+    return mocker.Mock(side_effect=coroutine)
+
+
+def mock_redis(asgi, mocker, record, values):
+    """Mock reading a job record and then the given pipeline results."""
+    client = mocker.patch.object(asgi, "redis_client")
+    client.hgetall = returning(mocker, record)
+    pipe = mocker.MagicMock()
+    pipe.execute = returning(mocker, values)
+
+    @asynccontextmanager
+    async def pipeline(*args, **kwargs):
+        yield pipe
+    client.pipeline = pipeline
+    return pipe
+
+
+def mock_pubsub(asgi, mocker, messages):
+    """Mock a subscription that receives the given messages."""
+    # The async client is awaitable, which would make it an `AsyncMock`.
+    client = mocker.patch.object(asgi, "pubsub_client", new=mocker.Mock())
+    pubsub = client.pubsub.return_value
+    pubsub.subscribe = returning(mocker, None)
+    pubsub.reset = returning(mocker, None)
+
+    async def get_message(**kwargs):
+        await asyncio.sleep(0.01)
+        if messages:
+            return {"data": json.dumps(messages.pop(0))}
+        return None
+    pubsub.get_message = get_message
+    return pubsub
+
+
+def test_status(asgi, mocker):
+    """Expect job states to be read with async redis commands."""
+    pipe = mock_redis(asgi, mocker, {
+        b"queue": b"interactive", b"priority": b"1",
+        b"validation": b"validation"}, [[None, None], 3])
+    start, body = request(asgi, "/status/job", headers=[(b"origin", b"x")])
+    assert start["status"] == 200
+    assert (b"access-control-allow-origin", b"*") in start["headers"]
+    status = json.loads(body)
+    assert status["status"] == "PENDING"
+    assert status["queue"]["position"] == 3
+    assert status["validation"] == {"status": "PENDING"}
+    pipe.mget.assert_called_once_with([
+        b"celery-task-meta-job", b"celery-task-meta-validation"])
+    pipe.zrank.assert_called_once_with("memote:queue:interactive", "job")
+
+
+def test_events(asgi, mocker):
+    """Expect job events to be streamed from a native subscription."""
+    mock_redis(asgi, mocker, {b"task": b"task"}, [[None]])
+    pubsub = mock_pubsub(asgi, mocker, [
+        {"status": "STARTED", "finished": False},
+        {"status": "SUCCESS", "finished": True},
+    ])
+    start, body = request(asgi, "/status/job/events",
+                          query_string=b"timeout=10")
+    assert start["status"] == 200
+    assert (b"x-accel-buffering", b"no") in start["headers"]
+    events = [json.loads(line[len("data: "):])
+              for line in body.decode().splitlines()
+              if line.startswith("data: ")]
+    assert [event["status"] for event in events] == [
+        "PENDING", "STARTED", "SUCCESS"]
+    pubsub.subscribe.assert_called_once_with("memote:events:task")
+    pubsub.reset.assert_called_once_with()
+
+
+def test_events_invalid_timeout(asgi):
+    """Expect the Flask application to reject an invalid timeout."""
+    start, _ = request(asgi, "/status/job/events", query_string=b"timeout=x")
+    assert start["status"] == 422
+
+
+def test_events_without_threads(asgi, app, mocker):
+    """Expect more open streams than threads not to block other requests."""
+    mock_redis(asgi, mocker, {}, [[None]])
+    mock_pubsub(asgi, mocker, [])
+
+    async def scenario():
+        disconnect = asyncio.Event()
+        streams = [
+            asyncio.ensure_future(call(asgi, "/status/job/events",
+                                       disconnect=disconnect))
+            for _ in range(app.config["ASGI_THREADS"] + 1)]
+        await asyncio.sleep(0.1)
+        start, _ = await asyncio.wait_for(
+            call(asgi, "/submit", method="POST"), timeout=10)
+        assert not any(stream.done() for stream in streams)
+        disconnect.set()
+        await asyncio.wait_for(asyncio.gather(*streams), timeout=10)
+        return start
+
+    assert asyncio.run(scenario())["status"] == 422
+
+
+def test_wsgi(asgi, client):
+    """Expect other requests to be handled by the Flask application."""
+    start, body = request(asgi, "/swagger/")
+    assert start["status"] == 200
+    assert body == client.get("/swagger/").data
+
+
+def test_wsgi_too_large(asgi, app, monkeypatch):
+    """Expect a streamed body beyond the limit to be rejected."""
+    monkeypatch.setitem(app.config, "MAX_CONTENT_LENGTH", 10)
+    start, _ = request(
+        asgi, "/submit", method="POST",
+        headers=[(b"content-type", b"multipart/form-data; boundary=x"),
+                 (b"transfer-encoding", b"chunked")],
+        chunks=[b"0123456789", b"0123456789"])
+    assert start["status"] == 413
+
+
+@pytest.mark.parametrize("path, root_path, expected", [
+    ("/status/job", "", "/status/job"),
+    ("/memote-webservice/status/job", "/memote-webservice", "/status/job"),
+])
+def test_path_info(asgi, path, root_path, expected):
+    assert asgi._path_info({"path": path, "root_path": root_path}) == expected
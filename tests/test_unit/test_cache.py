@@ -0,0 +1,49 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test the content-addressed result cache."""
+
+import pytest
+
+from memote_webservice import cache
+
+
+def test_digest():
+    """Expect identical content to map to the same key."""
+    assert cache.digest("abc") == cache.digest("abc")
+    assert cache.digest("abc") != cache.digest("abd")
+
+
+@pytest.mark.parametrize("state, expected", [
+    ("PENDING", "task"),
+    ("STARTED", "task"),
+    ("SUCCESS", "task"),
+    ("FAILURE", None),
+])
+def test_lookup(mocker, state, expected):
+    """Expect only tasks that did not fail to answer from the cache."""
+    client = mocker.patch("memote_webservice.cache.redis_client")
+    client.get.return_value = b"task"
+    result = mocker.patch("memote_webservice.cache.AsyncResult")
+    result.return_value.state = state
+    assert cache.lookup("key") == expected
+    assert client.delete.called == (expected is None)
+
+
+def test_lookup_miss(mocker):
+    """Expect no task for an unknown key."""
+    client = mocker.patch("memote_webservice.cache.redis_client")
+    client.get.return_value = None
+    assert cache.lookup("key") is None
@@ -0,0 +1,77 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Test the estimation of runtimes and limits."""
+
+import pytest
+
+from memote_webservice import estimates
+
+
+@pytest.fixture
+def client(mocker):
+    return mocker.patch("memote_webservice.estimates.redis_client")
+
+
+def test_predict(client):
+    """Expect the history or else an extrapolation from the reference."""
+    client.hget.return_value = None
+    assert estimates.predict(estimates.REFERENCE_COST) == pytest.approx(
+        estimates.REFERENCE_RUNTIME)
+    assert estimates.predict(10 * estimates.REFERENCE_COST) > \
+        10 * estimates.REFERENCE_RUNTIME
+    client.hget.return_value = b"42.0"
+    assert estimates.predict(estimates.REFERENCE_COST) == 42.0
+
+
+@pytest.mark.parametrize("predicted, soft, hard", [
+    (10.0, 600, 660),
+    (1000.0, 4000, 4400),
+    (1e6, 19636, 21600),
+])
+def test_limit(mocker, predicted, soft, hard):
+    """Expect limits proportional to the prediction within bounds."""
+    mocker.patch("memote_webservice.estimates.predict",
+                 return_value=predicted)
+    register = mocker.patch("memote_webservice.estimates.jobs.register")
+    limits = estimates.limit("job", 100, 4, 600, 6 * 3600)
+    assert limits == {"soft_time_limit": soft, "time_limit": hard}
+    assert register.call_args[1]["predicted"] == predicted
+
+
+@pytest.mark.parametrize("cost, timeout", [
+    (100, estimates.SOLVER_TIMEOUT),
+    (20000, 200),
+    (10 ** 6, estimates.MAX_SOLVER_TIMEOUT),
+])
+def test_limit_solver_timeout(mocker, cost, timeout):
+    """Expect solver timeouts to grow with the model size."""
+    mocker.patch("memote_webservice.estimates.predict", return_value=1.0)
+    register = mocker.patch("memote_webservice.estimates.jobs.register")
+    estimates.limit("job", cost, 4, 600, 6 * 3600)
+    assert register.call_args[1]["solver_timeout"] == timeout
+
+
+def test_summarize():
+    """Expect the accuracy of predictions per size class."""
+    summary = estimates.summarize([
+        {"size_class": 7, "predicted": 10.0, "actual": 5.0},
+        {"size_class": 7, "predicted": 10.0, "actual": 20.0},
+        {"size_class": 9, "predicted": 10.0, "actual": 10.0},
+    ])
+    assert summary[7] == {"jobs": 2, "median_ratio": 1.25,
+                          "mean_absolute_error": 7.5}
+    assert summary[9]["median_ratio"] == 1.0
@@ -0,0 +1,71 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Test following the state transitions of jobs."""
+
+import json
+
+from memote_webservice import events
+
+
+def message(status):
+    return {"data": json.dumps(
+        {"status": status, "finished": status == "SUCCESS"}).encode()}
+
+
+def test_follow(mocker):
+    """Expect the current and all following events until the job finished."""
+    client = mocker.patch("memote_webservice.events.pubsub_client")
+    pubsub = client.pubsub.return_value
+    pubsub.get_message.side_effect = [
+        message("STARTED"), None, message("SUCCESS")]
+    stream = events.follow(
+        "job", lambda: {"status": "PENDING", "finished": False}, 60, 0)
+    stream = list(stream)
+    assert None in stream
+    assert [event["status"] for event in stream if event is not None] == [
+        "PENDING", "STARTED", "SUCCESS"]
+    pubsub.subscribe.assert_called_once_with("memote:events:job")
+    assert pubsub.close.called
+
+
+def test_follow_finished(mocker):
+    """Expect no waiting for events of a finished job."""
+    client = mocker.patch("memote_webservice.events.pubsub_client")
+    stream = events.follow(
+        "job", lambda: {"status": "SUCCESS", "finished": True}, 60, 15)
+    assert len(list(stream)) == 1
+    assert not client.pubsub.return_value.get_message.called
+
+
+def test_follow_timeout(mocker):
+    """Expect the events to end after the timeout."""
+    mocker.patch("memote_webservice.events.pubsub_client")
+    stream = events.follow(
+        "job", lambda: {"status": "PENDING", "finished": False}, 0, 15)
+    assert len(list(stream)) == 1
+
+
+def test_stream(client, mocker):
+    """Expect server-sent events and comments as heartbeats."""
+    mocker.patch("memote_webservice.resources.events.jobs.resolve",
+                 return_value=("job", {}))
+    mocker.patch("memote_webservice.resources.events.events.follow",
+                 return_value=iter([{"status": "PENDING"}, None]))
+    response = client.get("/status/job/events")
+    assert response.mimetype == "text/event-stream"
+    assert response.data.decode() == (
+        'event: status\ndata: {"status": "PENDING"}\n\n:\n\n')
@@ -0,0 +1,41 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Test the history of test durations."""
+
+import cobra
+import pytest
+
+from memote_webservice import history
+
+
+def test_size_class():
+    """Expect models to be grouped by the magnitude of their size."""
+    model = cobra.Model()
+    model.add_reactions([cobra.Reaction(f"R{i}") for i in range(100)])
+    assert history.cost(model) == 100
+    assert history.size_class(history.cost(model)) == 6
+    assert history.size_class(history.cost(cobra.Model())) == 0
+
+
+def test_record(mocker):
+    """Expect a moving average of known and the duration of new tests."""
+    client = mocker.patch("memote_webservice.history.redis_client")
+    client.hgetall.return_value = {b"test_a": b"10.0"}
+    history.record(6, {"test_a": 20.0, "test_b": 1.0})
+    mapping = client.hset.call_args[1]["mapping"]
+    assert mapping["test_a"] == pytest.approx(13.0)
+    assert mapping["test_b"] == pytest.approx(1.0)
@@ -0,0 +1,87 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Test the incremental re-testing of model revisions."""
+
+import cobra
+import pytest
+
+from memote_webservice import incremental
+
+
+@pytest.fixture
+def model():
+    model = cobra.Model()
+    reaction = cobra.Reaction("R1")
+    model.add_reactions([reaction])
+    reaction.add_metabolites({cobra.Metabolite("a_c"): -1,
+                              cobra.Metabolite("b_c"): 1})
+    return model
+
+
+def test_changes(model):
+    """Expect the aspects of a model that were changed."""
+    parent = incremental.fingerprint(model)
+    assert incremental.changes(parent, incremental.fingerprint(model)) == set()
+    model.reactions.R1.upper_bound = 10
+    assert incremental.changes(parent, incremental.fingerprint(model)) == {
+        "reactions.constraints"}
+    model.metabolites.a_c.annotation["kegg.compound"] = "C00001"
+    assert incremental.changes(parent, incremental.fingerprint(model)) == {
+        "reactions.constraints", "metabolites.annotation"}
+    model.reactions.R1.add_metabolites({cobra.Metabolite("c_c"): 1})
+    assert {"metabolites", "reactions"} <= incremental.changes(
+        parent, incremental.fingerprint(model))
+
+
+def test_changes_memote(model):
+    """Expect no reuse of results of another memote version."""
+    parent = {**incremental.fingerprint(model), "memote": "0.0.1"}
+    assert incremental.changes(parent, incremental.fingerprint(model)) is None
+
+
+@pytest.mark.parametrize("module, test, changed, expected", [
+    ("test_annotation", "test_gene_product_annotation_presence",
+     {"reactions.annotation"}, True),
+    ("test_annotation", "test_reaction_annotation_overview",
+     {"reactions.annotation"}, False),
+    ("test_matrix", "test_matrix_rank", {"reactions.constraints"}, True),
+    ("test_matrix", "test_matrix_rank", {"reactions"}, False),
+    ("test_consistency", "test_stoichiometric_consistency", set(), False),
+])
+def test_reusable(module, test, changed, expected):
+    """Expect only tests unaffected by the changes to be reused."""
+    assert incremental.reusable(module, test, changed) is expected
+
+
+def test_pytest_collection_modifyitems(mocker):
+    """Expect the reusable tests to be deselected."""
+    config = mocker.Mock()
+    items = [
+        mocker.Mock(location=(path, 1, name)) for path, name in [
+            ("tests/test_annotation.py", "test_metabolite_annotation_overview"
+                                         "[kegg.compound]"),
+            ("tests/test_annotation.py", "test_reaction_annotation_presence"),
+            ("tests/test_basic.py", "test_model_id_presence"),
+        ]
+    ]
+    selected = list(items)
+    with incremental.reusing({"reactions.annotation"}):
+        incremental.pytest_collection_modifyitems(config, selected)
+    assert selected == items[1:]
+    config.hook.pytest_deselected.assert_called_once_with(items=items[:1])
+    incremental.pytest_collection_modifyitems(config, selected)
+    assert selected == items[1:]
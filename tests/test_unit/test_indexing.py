@@ -0,0 +1,123 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Test retrieving parts of indexed results."""
+
+import json
+
+import pytest
+
+from memote_webservice import indexing
+from memote_webservice.reporting import store_parts
+
+
+class Redis:
+    """Keep hashes like redis including pipelines of commands."""
+
+    def __init__(self):
+        self.hashes = {}
+        self.commands = []
+
+    def exists(self, key):
+        return key in self.hashes
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(
+            (field, value.encode()) for field, value in mapping.items())
+
+    def hmget(self, key, fields):
+        return [self.hashes[key].get(field) for field in fields]
+
+    def expire(self, key, seconds):
+        pass
+
+    def pipeline(self, transaction=True):
+        return Pipeline(self)
+
+
+class Pipeline:
+    """Queue commands and execute them against a fake redis."""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.queued = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def __getattr__(self, name):
+        command = getattr(self.redis, name)
+        return lambda *args, **kwargs: self.queued.append(
+            lambda: command(*args, **kwargs))
+
+    def execute(self):
+        return [command() for command in self.queued]
+
+
+@pytest.fixture
+def result(mocker):
+    mocker.patch("memote_webservice.indexing.redis_client", Redis())
+    result = {
+        "meta": {"python": "3"},
+        "score": {"total_score": 0.5},
+        "cards": {
+            "scored": {"sections": {"annotation": {"cases": ["test_b"]}}},
+            "basic": {"cases": ["test_a", "test_unknown"]},
+        },
+        "tests": {
+            "test_a": {"title": "A", "metric": 0.1, "data": list(range(5))},
+            "test_b": {"title": "B", "metric": {"x": 0.5},
+                       "data": {"x": ["M1", "M2", "M3"]}},
+        },
+    }
+    return mocker.Mock(
+        return_value=store_parts(json.dumps(result).encode("utf-8")))
+
+
+def test_select(result):
+    """Expect all tests with paged data and an index built only once."""
+    selected = indexing.select("task", result, page=2, per_page=2)
+    assert selected["meta"] == {"python": "3"}
+    assert selected["score"] == {"total_score": 0.5}
+    assert selected["tests"]["test_a"]["data"] == [2, 3]
+    assert selected["tests"]["test_a"]["data_total"] == 5
+    assert selected["tests"]["test_b"]["data"] == {"x": ["M3"]}
+    assert selected["tests"]["test_b"]["data_total"] == {"x": 3}
+    indexing.select("task", result)
+    result.assert_called_once_with()
+
+
+def test_select_parts(result):
+    """Expect only the selected tests and fields."""
+    selected = indexing.select("task", result, tests=["test_b"],
+                               sections=["basic"], fields=["metric"])
+    assert selected["tests"] == {
+        "test_b": {"metric": {"x": 0.5}},
+        "test_a": {"metric": 0.1},
+    }
+
+
+@pytest.mark.parametrize("selection", [
+    {"tests": ["test_c"]},
+    {"sections": ["unknown"]},
+])
+def test_select_unknown(result, selection):
+    """Expect an error for tests and sections not in the report."""
+    with pytest.raises(indexing.UnknownSelection):
+        indexing.select("task", result, **selection)
@@ -0,0 +1,89 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test the interchange format of models."""
+
+import mmap
+from os.path import dirname, join
+
+import pytest
+from cobra import Metabolite
+from cobra.io import read_sbml_model
+
+from memote_webservice import incremental, interchange
+
+
+DATA_PATH = join(dirname(__file__), "..", "data")
+
+
+@pytest.fixture(scope="module")
+def model():
+    """Provide a model with a few unusual attributes."""
+    model = read_sbml_model(join(DATA_PATH, "EcoliCore.xml"))
+    model.add_metabolites([Metabolite("orphan", compartment="c")])
+    model.metabolites.get_by_id("orphan").notes = {"note": "Ω"}
+    model.metabolites[0].charge = None
+    model.reactions[0].subsystem = None
+    model.objective_direction = "min"
+    return model
+
+
+def test_round_trip(model):
+    """Expect every aspect of a model to be restored."""
+    restored = interchange.loads(interchange.dumps(model))
+    assert incremental.fingerprint(restored) == \
+        incremental.fingerprint(model)
+    assert [met.id for met in restored.metabolites] == \
+        [met.id for met in model.metabolites]
+    assert [rxn.id for rxn in restored.reactions] == \
+        [rxn.id for rxn in model.reactions]
+    assert restored.metabolites.get_by_id("orphan").notes == {"note": "Ω"}
+    assert restored.metabolites[0].charge is None
+    assert restored.reactions[0].subsystem is None
+    assert isinstance(restored.metabolites[1].charge, int)
+    # Reactions refer to the genes of the model.
+    assert all(restored.genes.get_by_id(gene.id) is gene
+               for rxn in restored.reactions for gene in rxn.genes)
+    assert restored.id == model.id
+    assert restored.compartments == model.compartments
+    assert restored.slim_optimize() == pytest.approx(model.slim_optimize())
+
+
+def test_memory_map(model, tmpdir):
+    """Expect a model to load from a memory-mapped file."""
+    path = tmpdir.join("model.bin")
+    path.write_binary(interchange.dumps(model))
+    with path.open("rb") as file_, \
+            mmap.mmap(file_.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        restored = interchange.loads(buffer)
+    assert len(restored.reactions) == len(model.reactions)
+
+
+def test_alignment(model):
+    """Expect every array to start at a multiple of eight bytes."""
+    header, start = interchange._header(interchange.dumps(model))
+    assert start % 8 == 0
+    assert all(offset % 8 == 0
+               for _, _, offset in header["arrays"].values())
+
+
+def test_unknown(model):
+    """Expect other content and versions to be rejected."""
+    with pytest.raises(ValueError):
+        interchange.loads(b"\x80\x04" + bytes(14))
+    data = interchange.dumps(model).replace(
+        b'"version": 1', b'"version": 9', 1)
+    with pytest.raises(ValueError):
+        interchange.loads(data)
@@ -0,0 +1,66 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test the metrics of the web service and the workers."""
+
+from prometheus_client.parser import text_string_to_metric_families
+
+from memote_webservice import metrics, tasks
+
+
+def scrape(client):
+    """Return the samples of all metrics by name and labels."""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    return {
+        (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+        for family in text_string_to_metric_families(response.data.decode())
+        for sample in family.samples
+    }
+
+
+def test_request_duration(client, mocker):
+    mocker.patch("memote_webservice.scheduling.depths",
+                 return_value={"interactive": 2, "bulk": 0})
+    scrape(client)
+    samples = scrape(client)
+    key = ("memote_request_duration_seconds_count",
+           (("method", "GET"), ("resource", "metrics"), ("status", "200")))
+    assert samples[key] >= 1
+    assert samples[("memote_queue_depth", (("queue", "interactive"),))] == 2
+
+
+def test_job_wait(client, mocker):
+    mocker.patch("memote_webservice.scheduling.depths", return_value={})
+    mocker.patch("memote_webservice.tasks.scheduling.dequeue", return_value={
+        "queue": "bulk", "queued": "0"})
+    tasks.leave_queue("job", {})
+    samples = scrape(client)
+    assert samples[("memote_job_wait_seconds_count", (("queue", "bulk"),))] \
+        >= 1
+
+
+def test_process_identifier(mocker):
+    """Expect pools within pool processes to be identified by slots."""
+    process = mocker.patch("memote_webservice.metrics.current_process")
+    mocker.patch("memote_webservice.metrics.os.getppid", return_value=1)
+    mocker.patch.object(metrics, "_pool_process", None)
+    process.return_value.index = 2
+    metrics.remember_pool_process()
+    assert metrics._process_identifier() == "1-2"
+    # A process forked by the pool process.
+    mocker.patch("memote_webservice.metrics.os.getpid", return_value=-1)
+    process.return_value.index = 0
+    assert metrics._process_identifier() == "1-2-0"
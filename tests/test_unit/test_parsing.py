@@ -0,0 +1,127 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test the cache of parsed models."""
+
+import pytest
+from cobra import Metabolite, Model, Reaction
+
+from memote_webservice import parsing, storage
+
+
+NOTIFICATIONS = {"warnings": ["A warning."], "errors": []}
+
+
+@pytest.fixture
+def client(mocker):
+    """Mock the redis client."""
+    client = mocker.patch("memote_webservice.parsing.redis_client")
+    client.hget.return_value = None
+    client.hsetnx.return_value = 1
+    pipe = client.pipeline.return_value.__enter__.return_value
+    pipe.execute.return_value = [1, 1, 100]
+    return client
+
+
+@pytest.fixture
+def model():
+    """Provide a small model that is minimized."""
+    model = Model("small")
+    reaction = Reaction("EX_a", lower_bound=-10)
+    reaction.add_metabolites({Metabolite("a", compartment="c"): -1})
+    model.add_reactions([reaction])
+    model.objective = "EX_a"
+    model.objective_direction = "min"
+    return model
+
+
+def test_digest():
+    """Expect distinct keys per upload and format."""
+    key = parsing.digest("0" * 64, "sbml")
+    assert key == parsing.digest("0" * 64, "sbml")
+    assert key != parsing.digest("0" * 64, "json")
+    assert key != parsing.digest("1" * 64, "sbml")
+
+
+def test_load_miss(client, local_storage, mocker, model):
+    """Expect a parsed model to be cached."""
+    parse = mocker.Mock(return_value=(model, NOTIFICATIONS))
+    assert parsing.load("0" * 64, "sbml", parse) == (model, NOTIFICATIONS)
+    parse.assert_called_once_with()
+    key = parsing.digest("0" * 64, "sbml")
+    name = client.hsetnx.call_args[0][2]
+    client.hsetnx.assert_called_once_with(
+        f"memote:parsed:{key}", "object", name)
+    assert name.startswith(f"{storage.PARSED}/")
+    assert not client.zrange.called
+
+
+def test_load_hit(client, local_storage, mocker, model):
+    """Expect a cached model to be loaded without parsing."""
+    key = parsing.digest("0" * 64, "sbml")
+    parsing.put(key, model, NOTIFICATIONS)
+    client.hget.return_value = client.hsetnx.call_args[0][2].encode()
+    parse = mocker.Mock()
+    cached, notifications = parsing.load("0" * 64, "sbml", parse)
+    assert not parse.called
+    assert notifications == NOTIFICATIONS
+    assert cached.objective_direction == "min"
+    assert [r.id for r in cached.reactions] == ["EX_a"]
+    assert cached.reactions.EX_a.lower_bound == -10
+    assert cached.reactions.EX_a.objective_coefficient == 1
+    client.zadd.assert_called_once_with(
+        "memote:parsed", {key: mocker.ANY}, xx=True)
+
+
+def test_get_missing(client):
+    """Expect a model missing from the storage to be evicted."""
+    client.hget.return_value = b"parsed/missing"
+    client.zrem.return_value = 0
+    client.get.return_value = b"0"
+    assert parsing.get("key") is None
+    client.zrem.assert_called_once_with("memote:parsed", "key")
+
+
+def test_put_concurrent(client, model):
+    """Expect a model cached by another process to be kept."""
+    client.hsetnx.return_value = 0
+    parsing.put("key", model, NOTIFICATIONS)
+    assert not client.pipeline.called
+
+
+def test_put_evict(client, local_storage, monkeypatch, model):
+    """Expect the least recently used models to be evicted."""
+    monkeypatch.setattr(parsing, "SIZE", 10 ** 4)
+    local_storage.put("parsed/old", b"content")
+    pipe = client.pipeline.return_value.__enter__.return_value
+    pipe.execute.return_value = [1, 1, 10 ** 4 + 1]
+    client.zrange.return_value = [b"old"]
+    client.zrem.return_value = 1
+    client.hgetall.return_value = {b"object": b"parsed/old", b"size": b"100"}
+    client.decrby.return_value = 10 ** 4 - 99
+    parsing.put("key", model, NOTIFICATIONS)
+    client.zrem.assert_called_once_with("memote:parsed", "old")
+    client.delete.assert_called_once_with("memote:parsed:old")
+    client.decrby.assert_called_once_with("memote:parsed:size", 100)
+    with pytest.raises(KeyError):
+        local_storage.get("parsed/old")
+
+
+def test_load_disabled(client, monkeypatch, mocker, model):
+    """Expect no caching when the cache has no size."""
+    monkeypatch.setattr(parsing, "SIZE", 0)
+    parse = mocker.Mock(return_value=(model, NOTIFICATIONS))
+    assert parsing.load("0" * 64, "sbml", parse) == (model, NOTIFICATIONS)
+    assert not client.method_calls
@@ -0,0 +1,106 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Test reporting the progress of memote runs."""
+
+import pytest
+
+from memote_webservice import progress
+
+
+@pytest.fixture
+def record(mocker):
+    """Keep a job record in memory."""
+    record = {}
+
+    def increment(job_id, field, amount=1):
+        record[field] = record.get(field, 0) + amount
+        return record[field]
+
+    def increment_many(job_id, **amounts):
+        for field, amount in amounts.items():
+            increment(job_id, field, amount)
+        return {k: str(v) for k, v in record.items()}
+
+    def setdefault(job_id, field, value):
+        return str(record.setdefault(field, value))
+
+    mocker.patch("memote_webservice.progress.jobs.increment", increment)
+    mocker.patch("memote_webservice.progress.jobs.increment_many",
+                 increment_many)
+    mocker.patch("memote_webservice.progress.jobs.setdefault", setdefault)
+    return record
+
+
+def test_progress(record):
+    """Expect counts and an ETA from the expected durations."""
+    updates = []
+    reporter = progress.Progress(
+        "job", updates.append, {"test_a": 2.0, "test_b": 4.0}, processes=2)
+    reporter.collected(["test_a", "test_b[x]", "test_b[y]"])
+    reporter.finished("test_b[x]")
+    reporter.finished("test_a")
+    assert [update["done"] for update in updates] == [1, 2]
+    assert updates[-1]["total"] == 3
+    assert updates[-1]["current"] == "test_a"
+    assert updates[0]["eta"] == pytest.approx(2.0)
+    assert updates[-1]["eta"] == pytest.approx(1.0)
+
+
+def test_progress_fan_out(record, mocker):
+    """Expect the ETA of a fanned-out job from its finished modules."""
+    mocker.patch("memote_webservice.progress.time.time", return_value=100.0)
+    record.update(started=90.0, groups_total=4)
+    updates = []
+    reporter = progress.Progress(
+        "job", updates.append, {"test_a": 2.0, "test_b": 4.0})
+    reporter.collected(["test_a", "test_b"])
+    reporter.finished("test_a")
+    record["groups_done"] = 1
+    reporter.finished("test_b")
+    assert updates[0]["eta"] is None
+    assert updates[1]["elapsed"] == pytest.approx(10.0)
+    assert updates[1]["eta"] == pytest.approx(30.0)
+
+
+def test_progress_without_history(record):
+    """Expect no ETA without expected durations."""
+    updates = []
+    reporter = progress.Progress("job", updates.append, {})
+    reporter.collected(["test_a"])
+    reporter.finished("test_a")
+    assert updates[0]["eta"] is None
+
+
+def test_progress_failure(record):
+    """Expect a failing update not to break the run."""
+    def update(meta):
+        raise ConnectionError("gone")
+
+    reporter = progress.Progress("job", update, {})
+    reporter.collected(["test_a"])
+    reporter.finished("test_a")
+
+
+def test_reporting(record):
+    """Expect the plugin to forward events only while reporting."""
+    updates = []
+    reporter = progress.Progress("job", updates.append, {})
+    reporter.collected(["test_a"])
+    with progress.reporting(reporter):
+        progress.pytest_runtest_logfinish("a.py::test_a", ("a.py", 1, "test_a"))
+    progress.pytest_runtest_logfinish("a.py::test_a", ("a.py", 1, "test_a"))
+    assert len(updates) == 1
@@ -0,0 +1,177 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test rendering reports from stored task results."""
+
+import gzip
+import hashlib
+import json
+
+import memote
+import pytest
+from celery import states
+
+from memote_webservice import storage
+from memote_webservice.celery import celery_app
+from memote_webservice.reporting import (
+    StoredReport, StoredResult, body, deltas, load_parts, load_report,
+    load_result, load_summary, migrate, rendered, store_parts)
+
+
+REPORT = {
+    "meta": {"model": "m"},
+    "score": {"total_score": 0.5},
+    "cards": {
+        "scored": {"sections": {"annotation": {"cases": ["test_b"]}}},
+        "basic": {"cases": ["test_a"]},
+    },
+    "tests": {
+        "test_a": {"title": "A", "metric": 0.1, "data": ["M1", "M2"]},
+        "test_b": {"title": "B", "metric": {"x": 0.5}, "data": {"x": []}},
+    },
+}
+
+
+def _result(presence, overview):
+    """Return the results of an annotation test and a parametrized one."""
+    def case(title, metric, result):
+        return {"title": title, "summary": "", "format_type": "percent",
+                "metric": metric, "result": result, "data": None,
+                "duration": None, "message": None}
+
+    return memote.MemoteResult({"meta": {}, "tests": {
+        "test_metabolite_annotation_presence": case(
+            "Presence", presence, "passed" if presence == 0 else "failed"),
+        "test_metabolite_annotation_overview": {
+            **case("Overview", {"kegg": overview, "chebi": 0.5},
+                   {"kegg": "failed", "chebi": "failed"}),
+            "data": {}, "duration": {}, "message": {}},
+    }})
+
+
+def test_load_compressed_report():
+    """Expect compressed JSON results to render without a model."""
+    report = load_report(gzip.compress(b'{"tests": {}}'))
+    assert report.render_json() == '{"tests": {}}'
+    assert '{"tests": {}}' in report.render_html()
+
+
+def test_load_legacy_report():
+    """Expect the report of a pickled (model, report) result."""
+    report = object()
+    assert load_report((None, report)) is report
+
+
+def test_load_result():
+    """Expect the results of a compressed JSON report."""
+    result = load_result(gzip.compress(json.dumps(_result(0.0, 0.5)).encode()))
+    assert result.cases["test_metabolite_annotation_presence"]["metric"] == 0
+
+
+def test_store_parts():
+    """Expect the report, its summary, and its test cases to be stored."""
+    data = json.dumps(REPORT).encode()
+    parts = store_parts(data, "model.xml")
+    assert storage.load(parts.report) == data
+    assert json.loads(storage.load(parts.summary)) == {
+        "meta": {"model": "m"},
+        "score": {"total_score": 0.5},
+        "sections": {"annotation": ["test_b"], "basic": ["test_a"]},
+        "tests": ["test_a", "test_b"],
+    }
+    tests = json.loads(storage.load(parts.tests))
+    assert tests["cases"]["test_a"] == {"title": "A", "metric": 0.1}
+    assert json.loads(storage.load(tests["data"]["test_a"])) == ["M1", "M2"]
+    assert parts.model == "model.xml"
+    assert load_parts(parts) is parts
+    assert load_report(parts).render_json() == data.decode()
+
+
+def test_load_summary_earlier():
+    """Expect results of earlier versions to be stored in parts."""
+    summary, key = load_summary(gzip.compress(json.dumps(REPORT).encode()))
+    assert summary["score"] == {"total_score": 0.5}
+    assert key.startswith(f"{storage.RESULTS}/")
+
+
+def test_migrate(mocker):
+    """Expect earlier reports to be rewritten in parts, nothing else."""
+    report = storage.save(storage.RESULTS, json.dumps(REPORT).encode())
+    metas = {
+        b"celery-task-meta-a": {"status": states.SUCCESS,
+                                "result": StoredReport(report),
+                                "date_done": "2020-01-01T00:00:00"},
+        b"celery-task-meta-b": {"status": states.SUCCESS,
+                                "result": {"warnings": [], "errors": []}},
+        b"celery-task-meta-c": {"status": states.SUCCESS,
+                                "result": "results/part"},
+    }
+    client = mocker.patch("memote_webservice.reporting.redis_client")
+    client.scan_iter.return_value = list(metas)
+    pipeline = client.pipeline.return_value
+    pipeline.get.return_value.pttl.return_value.execute.side_effect = [
+        (celery_app.backend.encode(meta), 1000) for meta in metas.values()]
+    assert migrate() == 1
+    key, value = client.set.call_args[0]
+    assert key == b"celery-task-meta-a"
+    assert client.set.call_args[1] == {"xx": True, "px": 1000}
+    meta = celery_app.backend.decode(value)
+    assert isinstance(meta["result"], StoredResult)
+    assert meta["date_done"] == "2020-01-01T00:00:00"
+    assert storage.load(meta["result"].report) == storage.load(report)
+
+
+def test_deltas():
+    """Expect score and metric deltas per test from a diff report."""
+    report = memote.DiffReport(
+        {"a": _result(0.0, 0.5), "b": _result(0.25, 0.5)},
+        memote.ReportConfiguration.load())
+    comparison = deltas(report.result, "a", "b")
+    assert comparison["changed"] == ["test_metabolite_annotation_presence"]
+    presence = comparison["tests"]["test_metabolite_annotation_presence"]
+    assert presence["metric"] == {"a": 0.0, "b": 0.25, "delta": 0.25}
+    assert presence["score"]["delta"] == pytest.approx(-0.25)
+    assert presence["result"] == {"a": "passed", "b": "failed", "delta": None}
+    overview = comparison["tests"]["test_metabolite_annotation_overview"]
+    assert overview["metric"]["kegg"]["delta"] == 0.0
+    assert overview["score"]["a"] == pytest.approx(0.5)
+    assert comparison["score"]["total"]["delta"] < 0
+
+
+def test_rendered(mocker):
+    """Expect a rendering to be compressed and stored once."""
+    client = mocker.patch("memote_webservice.reporting.redis_client")
+    client.hgetall.return_value = {}
+    objects = {}
+
+    def save(kind, data, compress=True):
+        objects[f"{kind}/{len(objects)}"] = data
+        return f"{kind}/{len(objects) - 1}"
+
+    storage = mocker.patch("memote_webservice.reporting.storage")
+    storage.RENDERINGS = "renderings"
+    storage.save.side_effect = save
+    storage.load.side_effect = lambda key, decompress: objects[key]
+    render = mocker.Mock(return_value="{}")
+    rendering = rendered("task", "application/json", render)
+    assert rendering["gzip"].startswith(b"renderings/")
+    assert gzip.decompress(body(rendering, "gzip")) == b"{}"
+    assert rendering["etag"] == hashlib.sha256(b"{}").hexdigest().encode()
+    stored = client.pipeline.return_value.__enter__.return_value.hset
+    assert stored.call_args[1]["mapping"] == rendering
+    client.hgetall.return_value = {
+        key.encode(): value for key, value in rendering.items()}
+    assert rendered("task", "application/json", render) == rendering
+    render.assert_called_once_with()
@@ -0,0 +1,162 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Test submitting and following batches of models."""
+
+import io
+import shutil
+import tarfile
+import tempfile
+import zipfile
+from os.path import dirname, join
+
+import pytest
+
+from memote_webservice import loading
+
+
+DATA_PATH = join(dirname(__file__), "..", "..", "data")
+
+
+def tar_archive():
+    """Return a gzip compressed tar archive of test models."""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        archive.add(join(DATA_PATH, "EcoliCore.xml.gz"), "set/EcoliCore.xml.gz")
+        archive.add(join(DATA_PATH, "notgzip.xml.gz"), "set/notgzip.xml.gz")
+        archive.add(join(DATA_PATH, "half.xml"), "set/.hidden.xml")
+    buffer.seek(0)
+    return buffer
+
+
+def zip_archive():
+    """Return a zip archive of test models."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, mode="w") as archive:
+        archive.write(join(DATA_PATH, "half.xml"), "half.xml")
+        archive.writestr("README.md", "Models")
+        archive.write(join(DATA_PATH, "half.xml"), "__MACOSX/._half.xml")
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.mark.parametrize("filename, archive, expected", [
+    ("set.tar.gz", tar_archive, ["set/EcoliCore.xml.gz", "set/notgzip.xml.gz"]),
+    ("SET.ZIP", zip_archive, ["half.xml", "README.md"]),
+    ("half.xml", zip_archive, ["half.xml"]),
+])
+def test_unpack(filename, archive, expected):
+    """Expect the visible files of an archive or the file itself."""
+    names = [name for name, stream in loading.unpack(filename, archive())
+             if stream.read(1)]
+    assert names == expected
+
+
+def test_unpack_spooled():
+    """Expect zip archives to be read from spooled uploads."""
+    with tempfile.SpooledTemporaryFile() as stream:
+        shutil.copyfileobj(zip_archive(), stream)
+        stream.seek(0)
+        names = [name for name, _ in loading.unpack("set.zip", stream)]
+    assert names == ["half.xml", "README.md"]
+
+
+def test_batch(client, app, tmpdir, mocker, monkeypatch):
+    """Expect rejected files to be reported without failing the batch."""
+    monkeypatch.setitem(app.config, "MODEL_DIRECTORY", str(tmpdir))
+    monkeypatch.setitem(app.config, "RESULT_CACHE_EXPIRES", 0)
+    route = mocker.patch("memote_webservice.resources.batch.Batch._route",
+                         return_value={"queue": "bulk", "priority": 0})
+    submit = mocker.patch(
+        "memote_webservice.resources.batch.Batch._submit_deferred")
+    register = mocker.patch("memote_webservice.resources.batch.batches."
+                            "register")
+    response = client.post("/batch", data={"models": [
+        (tar_archive(), "set.tar.gz"),
+        (zip_archive(), "set.zip"),
+        (io.BytesIO(b"garbage"), "broken.tar"),
+    ]})
+    assert response.status_code == 202
+    models = response.json["models"]
+    submitted = [call[0][0] for call in submit.call_args_list]
+    assert [model.get("uuid") for model in models] == [
+        submitted[0], None, submitted[1], None, None]
+    assert all(call[1]["bulk"] for call in route.call_args_list)
+    assert "error" in models[1]
+    assert models[3]["error"] == "Unhandled model format."
+    assert models[4]["name"] == "broken.tar"
+    assert submit.call_count == 2
+    register.assert_called_once_with(response.json["uuid"], models)
+
+
+def test_batch_limit(client, app, tmpdir, mocker, monkeypatch):
+    """Expect files beyond the limit to be left alone with a single error."""
+    monkeypatch.setitem(app.config, "MODEL_DIRECTORY", str(tmpdir))
+    monkeypatch.setitem(app.config, "BATCH_MAX_MODELS", 2)
+    mocker.patch("memote_webservice.resources.batch.Batch._submit_file",
+                 side_effect=lambda name, stream: {"name": name})
+    mocker.patch("memote_webservice.resources.batch.batches.register")
+    unpack = mocker.spy(loading, "unpack")
+    response = client.post("/batch", data={"models": [
+        (zip_archive(), "set.zip"),
+        (zip_archive(), "other.zip"),
+        (zip_archive(), "last.zip"),
+    ]})
+    assert response.status_code == 202
+    models = response.json["models"]
+    assert [model["name"] for model in models] == [
+        "half.xml", "README.md", "other.zip"]
+    assert models[2]["error"] == "The batch exceeds the limit of 2 models."
+    assert unpack.call_count == 1
+
+
+def test_batch_corrupt(client, app, tmpdir, mocker, monkeypatch):
+    """Expect a damaged compressed file to be reported as such."""
+    monkeypatch.setitem(app.config, "MODEL_DIRECTORY", str(tmpdir))
+    mocker.patch("memote_webservice.resources.batch.batches.register")
+    with open(join(DATA_PATH, "corrupt.xml.gz"), "rb") as file_handle:
+        response = client.post("/batch", data={"models": [
+            (file_handle, "corrupt.xml.gz")]})
+    assert response.status_code == 202
+    error = response.json["models"][0]["error"]
+    assert error.startswith("Failed to decompress file")
+    assert tmpdir.listdir() == []
+
+
+def test_batch_status(client, mocker):
+    """Expect an aggregate state and a summary per file."""
+    mocker.patch("memote_webservice.resources.batch.batches.get",
+                 return_value=[{"name": "a.xml", "uuid": "job-1"},
+                               {"name": "b.xml", "uuid": "job-2"},
+                               {"name": "c.txt", "error": "Unhandled."}])
+    mocker.patch("memote_webservice.resources.batch.jobs.resolve_many",
+                 return_value=[("job-1", {}), ("task", {"cached": "1"})])
+    mocker.patch("memote_webservice.resources.batch.jobs.task_metas",
+                 return_value=[{"status": "FAILURE", "result": ValueError()},
+                               {"status": "STARTED", "result": None}])
+    status = client.get("/batch/batch").json
+    assert status["total"] == 3
+    assert status["finished"] == 2
+    assert status["counts"] == {"FAILURE": 1, "STARTED": 1, "REJECTED": 1}
+    assert status["models"][0]["error"] == "ValueError"
+    assert status["models"][1]["cached"] is True
+
+
+def test_batch_status_unknown(client, mocker):
+    """Expect unknown batches not to be found."""
+    mocker.patch("memote_webservice.resources.batch.batches.get",
+                 return_value=None)
+    assert client.get("/batch/batch").status_code == 404
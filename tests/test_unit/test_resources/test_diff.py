@@ -0,0 +1,49 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test comparing the results of two jobs."""
+
+import gzip
+
+
+def test_diff(client, mocker):
+    """Expect a stored comparison per pair of tasks."""
+    mocker.patch("memote_webservice.resources.diff.jobs.resolve_many",
+                 return_value=[("task_a", {}), ("task_b", {})])
+    result = mocker.patch("memote_webservice.resources.diff.AsyncResult")
+    result.return_value.successful.return_value = True
+    result.return_value.date_done = None
+    rendered = mocker.patch("memote_webservice.resources.diff.rendered",
+                            return_value={
+                                "etag": b"abc",
+                                "last_modified": b"Thu, 01 Jan 2015 "
+                                                 b"00:00:00 GMT",
+                                "gzip": gzip.compress(b"{}"),
+                            })
+    response = client.get("/diff/a/b", headers={"Accept": "application/json"})
+    assert response.status_code == 200
+    assert response.data == b"{}"
+    assert rendered.call_args[0][:2] == (
+        "diff:task_a:task_b", "application/json")
+
+
+def test_diff_unfinished(client, mocker):
+    """Expect only finished jobs to be compared."""
+    mocker.patch("memote_webservice.resources.diff.jobs.resolve_many",
+                 return_value=[("task_a", {}), ("task_b", {})])
+    result = mocker.patch("memote_webservice.resources.diff.AsyncResult")
+    result.return_value.successful.return_value = False
+    assert client.get("/diff/a/b").status_code == 404
+    assert client.get("/diff/a/a").status_code == 400
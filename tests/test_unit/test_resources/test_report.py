@@ -0,0 +1,97 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Test serving rendered reports."""
+
+import gzip
+
+import pytest
+
+
+@pytest.fixture
+def rendering(mocker):
+    """Provide a finished job with a stored JSON rendering."""
+    mocker.patch("memote_webservice.resources.report.jobs.resolve",
+                 return_value=("task", {}))
+    result = mocker.patch("memote_webservice.resources.report.AsyncResult")
+    result.return_value.ready.return_value = True
+    result.return_value.failed.return_value = False
+    rendering = {
+        "etag": b"abc",
+        "last_modified": b"Thu, 01 Jan 2015 00:00:00 GMT",
+        "gzip": gzip.compress(b"{}"),
+    }
+    mocker.patch("memote_webservice.resources.report.rendered",
+                 return_value=rendering)
+    return rendering
+
+
+@pytest.mark.parametrize("encoding, expected", [
+    ("gzip", "gzip"),
+    ("identity", None),
+])
+def test_encoding(client, rendering, encoding, expected):
+    """Expect pre-compressed or decompressed bodies by Accept-Encoding."""
+    response = client.get("/report/job", headers={
+        "Accept": "application/json", "Accept-Encoding": encoding})
+    assert response.status_code == 200
+    assert response.headers.get("Content-Encoding") == expected
+    assert response.mimetype == "application/json"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    body = response.data if expected is None else gzip.decompress(
+        response.data)
+    assert body == b"{}"
+
+
+@pytest.mark.parametrize("headers", [
+    {"If-None-Match": '"abc-gzip"'},
+    {"If-Modified-Since": "Thu, 01 Jan 2015 00:00:00 GMT"},
+])
+def test_not_modified(client, rendering, headers):
+    """Expect conditional requests to be answered without a body."""
+    response = client.get("/report/job", headers={
+        "Accept": "application/json", "Accept-Encoding": "gzip", **headers})
+    assert response.status_code == 304
+    assert response.data == b""
+
+
+def test_selection(client, rendering, mocker):
+    """Expect selections to be answered from the indexed result."""
+    select = mocker.patch(
+        "memote_webservice.resources.report.indexing.select",
+        return_value={"tests": {}})
+    response = client.get(
+        "/report/job?sections=annotation_met,basic_info&fields=metric,result"
+        "&per_page=100000")
+    assert response.status_code == 200
+    assert response.json == {"tests": {}}
+    args = select.call_args[0]
+    assert args[0] == "task"
+    assert args[2:] == (None, ["annotation_met", "basic_info"],
+                        ["metric", "result"], 1, 1000)
+
+
+def test_summary(client, rendering, mocker):
+    """Expect only the summary part with its digest as entity tag."""
+    mocker.patch("memote_webservice.resources.report.load_summary",
+                 return_value=({"score": {"total_score": 0.5}}, "results/d1"))
+    response = client.get("/report/job?summary=1")
+    assert response.status_code == 200
+    assert response.json == {"score": {"total_score": 0.5}}
+    assert response.headers["ETag"] == '"d1"'
+    response = client.get("/report/job?summary=true",
+                          headers={"If-None-Match": '"d1"'})
+    assert response.status_code == 304
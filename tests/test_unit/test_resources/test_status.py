@@ -0,0 +1,77 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test retrieving the status of jobs."""
+
+from memote_webservice.exceptions import SBMLValidationError
+
+
+def test_status(client, mocker):
+    mocker.patch("memote_webservice.jobs.get", return_value={
+        "queue": "interactive", "priority": "1", "validation": "validation"})
+    metas = mocker.patch("memote_webservice.jobs.task_metas", return_value=[
+        {"status": "PENDING", "result": None},
+        {"status": "SUCCESS", "result": {"warnings": ["w"], "errors": []}},
+    ])
+    mocker.patch("memote_webservice.scheduling.position", return_value=3)
+    status = client.get("/status/job").json
+    metas.assert_called_once_with(["job", "validation"])
+    assert status["status"] == "PENDING"
+    assert status["queue"] == {
+        "name": "interactive", "priority": 1, "position": 3}
+    assert status["validation"] == {
+        "status": "SUCCESS", "warnings": ["w"], "errors": []}
+
+
+def test_status_invalid(client, mocker):
+    mocker.patch("memote_webservice.jobs.get", return_value={
+        "validation": "validation"})
+    mocker.patch("memote_webservice.jobs.task_metas", return_value=[
+        {"status": "FAILURE", "result": None},
+        {"status": "FAILURE",
+         "result": SBMLValidationError(400, ["w"], ["e"])},
+    ])
+    status = client.get("/status/job").json
+    assert status["status"] == "FAILURE"
+    assert status["validation"] == {
+        "status": "FAILURE", "warnings": ["w"], "errors": ["e"]}
+
+
+def test_statuses(client, mocker):
+    mocker.patch("memote_webservice.jobs.resolve_many", return_value=[
+        ("a", {}), ("source", {"cached": "1", "validation": "validation"})])
+    metas = mocker.patch("memote_webservice.jobs.task_metas", return_value=[
+        {"status": "STARTED", "result": None},
+        {"status": "SUCCESS", "result": None},
+        {"status": "SUCCESS", "result": {"warnings": [], "errors": []}},
+    ])
+    mocker.patch("memote_webservice.scheduling.positions",
+                 return_value=[None, None])
+    response = client.post("/status", json={"uuids": ["a", "b"]})
+    assert response.status_code == 200
+    metas.assert_called_once_with(["a", "source", "validation"])
+    a, b = response.json["jobs"]
+    assert a["uuid"] == "a"
+    assert a["status"] == "STARTED"
+    assert "validation" not in a
+    assert b["uuid"] == "b"
+    assert b["source"] == "source"
+    assert b["validation"]["status"] == "SUCCESS"
+
+
+def test_statuses_too_many(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, "STATUS_MAX_JOBS", 1)
+    response = client.post("/status", json={"uuids": ["a", "b"]})
+    assert response.status_code == 400
@@ -15,51 +15,129 @@
 
 """Test expected functioning of the resources."""
 
+from hashlib import sha256
+from os import listdir
 from os.path import dirname, join
 
 import pytest
-# from cobra.io.sbml import CobraSBMLError
+from cobra import Metabolite, Model, Reaction
 from werkzeug.datastructures import FileStorage
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge
 
+from memote_webservice import interchange, parallel, parsing, storage
 from memote_webservice.resources.submit import Submit
 
 
 DATA_PATH = join(dirname(__file__), "..", "..", "data")
 
 
+@pytest.fixture
+def store(app, tmpdir, monkeypatch):
+    """Provide a function that stores an upload in a temporary directory."""
+    monkeypatch.setitem(app.config, "MODEL_DIRECTORY", str(tmpdir))
+
+    def _store(filename):
+        file_storage = FileStorage(stream=open(filename, mode="rb"),
+                                   filename=filename, name="model")
+        with app.test_request_context():
+            try:
+                return Submit()._store(file_storage)
+            finally:
+                assert file_storage.closed
+    return _store
+
+
 @pytest.mark.parametrize("filename", [
     join(DATA_PATH, "EcoliCore.xml"),
     join(DATA_PATH, "EcoliCore.xml.gz"),
     join(DATA_PATH, "EcoliCore.xml.bz2"),
-    # pytest.mark.raises(join(DATA_PATH, "half.xml"), exception=CobraSBMLError),
-    # pytest.mark.raises(join(DATA_PATH, "notgzip.xml.gz"),
-    #                    exception=ValueError),
-    # pytest.mark.raises(join(DATA_PATH, "notbzip2.xml.bz2"),
-    #                    exception=ValueError),
 ])
-def test__decompress(filename):
-    """Ensure that the app is in testing mode."""
-    with open(filename, mode="rb") as file_handle:
-        name, content = Submit._decompress(filename, file_handle)
-    assert name.endswith("EcoliCore.xml")
-    assert len(content.read()) >= 494226
+def test__store(store, filename):
+    """Expect the decompressed upload in a single file."""
+    path, checksum = store(filename)
+    assert path.endswith("EcoliCore.xml")
+    with open(path, mode="rb") as file_handle:
+        content = file_handle.read()
+    assert len(content) >= 494226
+    assert checksum == sha256(content).hexdigest()
+
+
+@pytest.mark.parametrize("filename", [
+    join(DATA_PATH, "notgzip.xml.gz"),
+    join(DATA_PATH, "notbzip2.xml.bz2"),
+    join(DATA_PATH, "corrupt.xml.gz"),
+])
+def test__store_corrupt(store, tmpdir, filename):
+    """Expect corrupt compressed files to be rejected."""
+    with pytest.raises(BadRequest):
+        store(filename)
+    assert listdir(str(tmpdir)) == []
+
+
+def test__store_limit(app, store, tmpdir, monkeypatch):
+    """Expect decompression bombs to be rejected."""
+    monkeypatch.setitem(app.config, "MAX_DECOMPRESSED_LENGTH", 1024)
+    with pytest.raises(RequestEntityTooLarge):
+        store(join(DATA_PATH, "EcoliCore.xml.gz"))
+    assert listdir(str(tmpdir)) == []
 
 
 @pytest.mark.parametrize("filename", [
     join(DATA_PATH, "EcoliCore.xml"),
     join(DATA_PATH, "EcoliCore.xml.gz"),
     join(DATA_PATH, "EcoliCore.xml.bz2"),
-    # pytest.mark.raises(join(DATA_PATH, "half.xml"), exception=CobraSBMLError),
-    # pytest.mark.raises(join(DATA_PATH, "notgzip.xml.gz"),
-    #                    exception=ValueError),
-    # pytest.mark.raises(join(DATA_PATH, "notbzip2.xml.bz2"),
-    #                    exception=ValueError),
 ])
-def test__load_model(filename):
-    """Ensure that the app is in testing mode."""
-    file_storage = FileStorage(stream=open(filename, mode="rb"),
-                               filename=filename, name="model")
-    model = Submit()._load_model(file_storage)
+def test__load_model(store, monkeypatch, filename):
+    """Expect the stored model to load."""
+    monkeypatch.setattr(parsing, "SIZE", 0)
+    path, checksum = store(filename)
+    model = Submit()._parse_model(path, "sbml", checksum)
     assert len(model.reactions) == 95
     assert len(model.metabolites) == 72
-    assert file_storage.closed
+
+
+@pytest.mark.parametrize("fan_out", [False, True])
+def test__snapshot(app, mocker, monkeypatch, fan_out):
+    """Expect one task per memote test module with fan-out."""
+    register = mocker.patch("memote_webservice.resources.submit.jobs.register")
+    monkeypatch.setitem(app.config, "FAN_OUT", fan_out)
+    with app.test_request_context():
+        signature = Submit()._snapshot("model.xml", None, "job")
+    if fan_out:
+        modules = signature.kwargs["header"]
+        assert len(modules) == len(parallel.test_modules())
+        register.assert_called_once_with(
+            "job", groups_total=len(modules), groups_done=0)
+    else:
+        assert signature.task == "memote_webservice.tasks.upload_snapshot"
+        assert not register.called
+
+
+def test__submit_interchange(mocker):
+    """Expect only the key of the stored model in the message."""
+    apply_async = mocker.patch(
+        "memote_webservice.resources.submit.model_snapshot.apply_async")
+    model = Model("m")
+    reaction = Reaction("R")
+    reaction.add_metabolites({Metabolite("A"): -1, Metabolite("B"): 1})
+    model.add_reactions([reaction])
+    Submit()._submit_interchange("job", model, {"queue": "interactive"})
+    (key,), = apply_async.call_args[0]
+    assert key.startswith(f"{storage.INTERCHANGE}/")
+    assert apply_async.call_args[1] == {"task_id": "job",
+                                        "queue": "interactive"}
+    data = storage.load(key, decompress=False)
+    assert data.startswith(interchange.MAGIC)
+    loaded = interchange.loads(data)
+    assert loaded.reactions.R.reaction == "A --> B"
+
+
+def test_post_unknown_parent(client, mocker):
+    """Expect revisions of unknown jobs to be rejected."""
+    mocker.patch("memote_webservice.resources.submit.jobs.get",
+                 return_value={})
+    response = client.post("/submit", data={
+        "model": (open(join(DATA_PATH, "EcoliCore.xml"), "rb"), "m.xml"),
+        "parent": "00000000-0000-0000-0000-000000000000",
+    })
+    assert response.status_code == 404
@@ -0,0 +1,72 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test retrieving the summaries of jobs."""
+
+SUMMARY = {"score": 0.5, "sections": {"consistency": 0.9}, "failed": ["t"],
+           "size": {"reactions": 2, "metabolites": 3, "genes": 1},
+           "runtime": 10.0}
+
+
+def test_summary(client, mocker):
+    mocker.patch("memote_webservice.jobs.resolve_many",
+                 return_value=[("source", {"cached": "1"})])
+    metas = mocker.patch("memote_webservice.jobs.task_metas", return_value=[
+        {"status": "SUCCESS", "result": None}])
+    mocker.patch("memote_webservice.summaries.get_many",
+                 return_value=[SUMMARY])
+    response = client.get("/summary/job")
+    assert response.status_code == 200
+    assert response.json == {"status": "SUCCESS", **SUMMARY}
+    metas.assert_called_once_with(["source"])
+
+
+def test_summary_unfinished(client, mocker):
+    mocker.patch("memote_webservice.jobs.resolve_many",
+                 return_value=[("job", {})])
+    mocker.patch("memote_webservice.jobs.task_metas", return_value=[
+        {"status": "STARTED", "result": None}])
+    mocker.patch("memote_webservice.summaries.get_many", return_value=[None])
+    assert client.get("/summary/job").status_code == 404
+
+
+def test_summaries(client, mocker):
+    """Expect results without a summary to be summarized once."""
+    mocker.patch("memote_webservice.jobs.resolve_many",
+                 return_value=[("a", {}), ("b", {}), ("c", {})])
+    mocker.patch("memote_webservice.jobs.task_metas", return_value=[
+        {"status": "SUCCESS", "result": None},
+        {"status": "SUCCESS", "result": "earlier"},
+        {"status": "FAILURE", "result": ValueError()},
+    ])
+    mocker.patch("memote_webservice.summaries.get_many",
+                 return_value=[SUMMARY, None, None])
+    load = mocker.patch("memote_webservice.resources.summary.load_result")
+    record = mocker.patch("memote_webservice.summaries.record",
+                          return_value=SUMMARY)
+    response = client.post("/summary", json={"uuids": ["a", "b", "c"]})
+    assert response.status_code == 200
+    a, b, c = response.json["jobs"]
+    assert a == {"uuid": "a", "status": "SUCCESS", **SUMMARY}
+    assert b == {"uuid": "b", "status": "SUCCESS", **SUMMARY}
+    assert c == {"uuid": "c", "status": "FAILURE"}
+    load.assert_called_once_with("earlier")
+    record.assert_called_once_with("b", load.return_value)
+
+
+def test_summaries_too_many(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, "STATUS_MAX_JOBS", 1)
+    response = client.post("/summary", json={"uuids": ["a", "b"]})
+    assert response.status_code == 400
@@ -0,0 +1,118 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Test routing jobs to queues."""
+
+import pytest
+
+from memote_webservice import scheduling
+
+
+@pytest.fixture
+def client(mocker):
+    """Mock the redis client and the job records."""
+    mocker.patch("memote_webservice.scheduling.jobs")
+    client = mocker.patch("memote_webservice.scheduling.redis_client")
+    client.incr.return_value = 7
+    return client
+
+
+@pytest.mark.parametrize("cost, bulk, waiting, queue, priority", [
+    (100, False, 0, "interactive", 0),
+    (100, True, 0, "bulk", 0),
+    (10000, False, 1, "bulk", 1),
+    (100, False, 3, "interactive", 2),
+    (100, False, 5000, "interactive", 9),
+])
+def test_route(client, cost, bulk, waiting, queue, priority):
+    """Expect routing by cost and declining priority per waiting job."""
+    client.scard.return_value = waiting
+    pipe = client.pipeline.return_value.__enter__.return_value
+    pipe.execute.return_value = [1, 1, [], 1, True]
+    routing = scheduling.route("job", cost, "client", 5000, bulk)
+    assert routing == {"queue": queue, "priority": priority}
+    pipe.zadd.assert_any_call(
+        f"memote:queue:{queue}", {"job": priority * 2 ** 40 + 7})
+    pipe.zrem.assert_not_called()
+
+
+def test_route_trim(client):
+    """Expect jobs that waited longer than results are kept to be removed."""
+    scheduling.jobs.resolve_many.return_value = [
+        ("lost", {"client": "a"}), ("gone", {})]
+    pipe = client.pipeline.return_value.__enter__.return_value
+    pipe.execute.return_value = [1, 1, [b"lost", b"gone"], 1, True]
+    scheduling.route("job", 100, "client", 5000)
+    pipe.zrem.assert_any_call("memote:queue:interactive", "lost", "gone")
+    pipe.zrem.assert_any_call("memote:queue:interactive:routed", "lost",
+                              "gone")
+    pipe.srem.assert_called_once_with("memote:client:a", "lost")
+
+
+def test_dequeue(client):
+    """Expect a started job to leave its queue and its client's jobs."""
+    scheduling.jobs.get.return_value = {"queue": "bulk", "client": "a"}
+    pipe = client.pipeline.return_value.__enter__.return_value
+    pipe.execute.return_value = [1, 1, 1]
+    assert scheduling.dequeue("job") == {"queue": "bulk", "client": "a"}
+    pipe.zrem.assert_any_call("memote:queue:bulk", "job")
+    pipe.zrem.assert_any_call("memote:queue:bulk:routed", "job")
+    pipe.srem.assert_called_once_with("memote:client:a", "job")
+
+
+def test_position(client):
+    """Expect no position of jobs that were never routed."""
+    assert scheduling.position("job", {}) is None
+    client.zrank.return_value = 3
+    assert scheduling.position("job", {"queue": "bulk"}) == 3
+
+
+def test_positions(client):
+    """Expect the positions of waiting jobs in a single pipeline."""
+    pipe = client.pipeline.return_value.__enter__.return_value
+    pipe.execute.return_value = [3]
+    assert scheduling.positions([("a", {}), ("b", {"queue": "bulk"})]) == [
+        None, 3]
+    pipe.zrank.assert_called_once_with("memote:queue:bulk", "b")
+
+
+def test_depths(client):
+    """Expect the number of waiting jobs of every queue."""
+    pipe = client.pipeline.return_value.__enter__.return_value
+    pipe.execute.return_value = [2, 0]
+    assert scheduling.depths() == {"interactive": 2, "bulk": 0}
+
+
+def test_weighted_cycle(mocker):
+    """Expect a bulk turn after the given number of interactive jobs."""
+    mocker.patch("memote_webservice.scheduling.INTERACTIVE_WEIGHT", 2)
+    cycle = scheduling.WeightedCycle()
+    cycle.update(["interactive", "bulk"])
+    polled = []
+    for _ in range(4):
+        queues = cycle.consume(2)
+        polled.append(queues)
+        cycle.rotate(queues[0])
+    assert polled == [["interactive", "bulk"], ["interactive", "bulk"],
+                      ["bulk"], ["interactive", "bulk"]]
+
+
+def test_weighted_cycle_single_queue(mocker):
+    """Expect workers of the interactive queue alone to never wait."""
+    mocker.patch("memote_webservice.scheduling.INTERACTIVE_WEIGHT", 0)
+    cycle = scheduling.WeightedCycle()
+    cycle.update(["interactive"])
+    assert cycle.consume(1) == ["interactive"]
@@ -0,0 +1,129 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test the storage of uploads and results."""
+
+import gzip
+import hashlib
+import os
+
+import pytest
+
+from memote_webservice import storage
+from memote_webservice.exceptions import StorageCodecError
+
+
+def test_save_once(local_storage):
+    key = storage.save(storage.RESULTS, b"{}")
+    assert key.startswith("results/")
+    path = local_storage._path(key)
+    os.utime(path, (0, 0))
+    assert storage.save(storage.RESULTS, b"{}") == key
+    assert os.path.getmtime(path) > 0
+    assert len(list(local_storage.list(storage.RESULTS))) == 1
+
+
+@pytest.mark.parametrize("zstandard", [storage.zstandard, None])
+def test_load(mocker, zstandard):
+    if zstandard is None:
+        mocker.patch.object(storage, "zstandard", None)
+    elif storage.zstandard is None:
+        pytest.skip("zstandard is not installed")
+    data = b"<sbml/>" * 100
+    key = storage.save(storage.MODELS, data)
+    assert storage.load(key) == data
+    stored = storage.load(key, decompress=False)
+    assert len(stored) < len(data)
+    if zstandard is None:
+        assert gzip.decompress(stored) == data
+
+
+@pytest.mark.parametrize("zstandard", [storage.zstandard, None])
+def test_save_file(mocker, tmpdir, local_storage, zstandard):
+    """Expect a streamed file to be stored like its content."""
+    if zstandard is None:
+        mocker.patch.object(storage, "zstandard", None)
+    elif storage.zstandard is None:
+        pytest.skip("zstandard is not installed")
+    data = b"<sbml/>" * 100000
+    path = tmpdir.join("model.xml")
+    path.write_binary(data)
+    checksum = hashlib.sha256(data).hexdigest()
+    key = storage.save_file(storage.MODELS, str(path), checksum, level=1)
+    assert key == f"models/{checksum}"
+    assert storage.load(key) == data
+    assert len(storage.load(key, decompress=False)) < len(data)
+    put_file = mocker.spy(local_storage, "put_file")
+    assert storage.save_file(storage.MODELS, str(path), checksum) == key
+    put_file.assert_not_called()
+
+
+@pytest.mark.parametrize("data", [
+    storage.ZSTD_MAGIC + b"content",
+    b"plain",
+])
+def test_load_unknown_codec(mocker, local_storage, data):
+    """Expect a clear error for objects that cannot be decompressed."""
+    mocker.patch.object(storage, "zstandard", None)
+    local_storage.put("models/key", data)
+    with pytest.raises(StorageCodecError):
+        storage.load("models/key")
+
+
+def test_load_uncompressed():
+    key = storage.save(storage.RENDERINGS, b"html", compress=False)
+    assert storage.load(key, decompress=False) == b"html"
+
+
+def test_load_missing():
+    with pytest.raises(KeyError):
+        storage.load("results/missing")
+
+
+def test_restored():
+    key = storage.save(storage.MODELS, b"<sbml/>")
+    name = storage.upload_name(key.split("/")[1], "e_coli_core.xml")
+    with storage.restored(name) as path:
+        assert os.path.basename(path) == name
+        with open(path, "rb") as file_:
+            assert file_.read() == b"<sbml/>"
+    assert not os.path.exists(path)
+
+
+def test_sweep(local_storage):
+    old = storage.save(storage.MODELS, b"old")
+    new = storage.save(storage.DATA, b"new")
+    os.utime(local_storage._path(old), (1000, 1000))
+    os.utime(local_storage._path(new), (2000, 2000))
+    assert storage.sweep(1500, now=3000) == 1
+    with pytest.raises(KeyError):
+        storage.load(old)
+    assert storage.load(new) == b"new"
+
+
+@pytest.mark.parametrize("url, root", [
+    ("storage", "storage"),
+    ("file:///data/storage", "/data/storage"),
+])
+def test_from_url_local(url, root):
+    backend = storage.from_url(url)
+    assert isinstance(backend, storage.LocalStorage)
+    assert backend.root == root
+
+
+def test_from_url_s3(mocker):
+    backend = mocker.patch.object(storage, "S3Storage")
+    storage.from_url("s3://bucket/memote")
+    backend.assert_called_once_with("bucket", "memote/", None)
@@ -0,0 +1,80 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test summarizing the results of jobs."""
+
+import json
+
+import numpy as np
+import pytest
+
+from memote_webservice import summaries
+
+
+RESULT = {
+    "score": {
+        "total_score": np.float64(0.5),
+        "sections": [{"section": "consistency", "score": np.float64(0.9)}],
+    },
+    "tests": {
+        "test_reactions_presence": {"result": "passed", "data": ["R1", "R2"]},
+        "test_metabolites_presence": {"result": "passed", "data": ["M1"]},
+        "test_annotation": {"result": {"kegg": "passed", "chebi": "failed"}},
+        "test_consistency": {"result": "failed", "data": None},
+        "test_skipped": {"result": "skipped"},
+    },
+}
+
+
+def test_summarize():
+    summary = summaries.summarize(RESULT, 12.5)
+    assert summary == {
+        "score": 0.5,
+        "sections": {"consistency": 0.9},
+        "failed": ["test_annotation", "test_consistency"],
+        "size": {"reactions": 2, "metabolites": 1, "genes": None},
+        "runtime": 12.5,
+    }
+    json.dumps(summary)
+
+
+def test_summarize_unscored():
+    summary = summaries.summarize({"tests": {}})
+    assert summary["score"] is None
+    assert summary["sections"] == {}
+
+
+@pytest.fixture
+def client(mocker):
+    """Mock the redis client and the job records."""
+    mocker.patch("memote_webservice.summaries.jobs.get",
+                 return_value={"timings": json.dumps({"total": 3.0})})
+    return mocker.patch("memote_webservice.summaries.redis_client")
+
+
+def test_record(client):
+    summary = summaries.record("task", RESULT)
+    assert summary["runtime"] == 3.0
+    key, value = client.set.call_args[0]
+    assert key == "memote:summary:task"
+    assert json.loads(value) == summary
+
+
+def test_get_many(client):
+    client.mget.return_value = [json.dumps({"score": 0.5}), None]
+    assert summaries.get_many(["a", "b"]) == [{"score": 0.5}, None]
+    client.mget.assert_called_once_with(
+        ["memote:summary:a", "memote:summary:b"])
+    assert summaries.get_many([]) == []
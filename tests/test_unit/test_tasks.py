@@ -0,0 +1,103 @@
+# Copyright (c) 2018, Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Test the jobs run by workers."""
+
+import json
+import pickle
+from os.path import dirname, join
+
+import pytest
+from cobra import Model
+
+from memote_webservice import interchange, storage
+from memote_webservice.exceptions import SBMLValidationError
+from memote_webservice.tasks import (
+    assemble_snapshot, leave_queue_revoked, model_snapshot, validate_upload)
+
+
+DATA_PATH = join(dirname(__file__), "..", "data")
+
+
+@pytest.fixture
+def backend(mocker):
+    """Replace the result backend of the validation task."""
+    task = type(validate_upload._get_current_object())
+    return mocker.patch.object(task, "backend", new=mocker.MagicMock())
+
+
+def test_validate_upload(backend):
+    """Expect the notifications of a valid model."""
+    notifications = validate_upload(join(DATA_PATH, "EcoliCore.xml"),
+                                    job_id="job")
+    assert notifications["errors"] == []
+    assert not backend.mark_as_failure.called
+
+
+def test_validate_upload_failure(backend):
+    """Expect an invalid model to fail the job that would test it."""
+    with pytest.raises(SBMLValidationError) as error:
+        validate_upload(join(DATA_PATH, "half.xml"), job_id="job")
+    assert len(error.value.errors) > 0
+    backend.mark_as_failure.assert_called_once_with("job", error.value)
+
+
+def test_pickle_validation_error():
+    """Expect validation errors to survive the celery result backend."""
+    error = pickle.loads(pickle.dumps(SBMLValidationError(400, ["w"], ["e"])))
+    assert error.code == 400
+    assert error.warnings == ["w"]
+    assert error.errors == ["e"]
+
+
+def test_assemble_snapshot_timings(mocker):
+    """Expect the wall time of a job besides the sum of its module times."""
+    parts = {"a": {"duration": 30.0, "started": 100.0},
+             "b": {"duration": 20.0, "started": 105.0}}
+    mocker.patch("memote_webservice.tasks.storage.load",
+                 side_effect=lambda key: json.dumps(parts[key]))
+    mocker.patch("memote_webservice.tasks.parallel.merge")
+    mocker.patch("memote_webservice.tasks.jobs.get",
+                 return_value={"fingerprint": "null"})
+    mocker.patch("memote_webservice.tasks._reuse", return_value=(None, None))
+    mocker.patch("memote_webservice.tasks._report")
+    mocker.patch("memote_webservice.tasks.store_report")
+    mocker.patch("memote_webservice.tasks.time.time", return_value=135.0)
+    record = mocker.patch("memote_webservice.tasks._record_timings")
+    assemble_snapshot(["a", "b"], ["test_a", "test_b"])
+    timings = record.call_args[1]
+    assert timings["total"] == 35.0
+    assert timings["cpu"] == 50.0
+    assert timings["modules"] == {"test_a": 30.0, "test_b": 20.0}
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_model_snapshot_interchange(mocker, local_storage, compress):
+    """Expect stored interchange models to be loaded either way."""
+    snapshot = mocker.patch("memote_webservice.tasks._snapshot")
+    store_report = mocker.patch("memote_webservice.tasks.store_report")
+    key = storage.save(storage.INTERCHANGE, interchange.dumps(Model("m")),
+                       compress=compress)
+    model_snapshot(key)
+    assert snapshot.call_args[0][1].id == "m"
+    assert store_report.call_args[0][1] == key
+
+
+def test_leave_queue_revoked(mocker):
+    """Expect the job of a revoked part to leave the waiting jobs."""
+    dequeue = mocker.patch("memote_webservice.tasks.scheduling.dequeue")
+    request = mocker.Mock(id="part", kwargs={"job_id": "job"})
+    leave_queue_revoked(request=request, terminated=False, expired=False)
+    dequeue.assert_called_once_with("job")